@@ -0,0 +1,73 @@
+"""
+Import-time regression check for the entry points
+
+    python benchmarks/import_time.py [--repeat 5]
+
+Imports each entry point in a fresh interpreter with -X importtime and
+reports the best cumulative time. Exits non-zero if one goes over its
+budget or pulls in a module that must stay off the startup path.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+HEAVY = ('matplotlib', 'networkx', 'netmiko', 'paramiko', 'numpy', 'requests')
+
+# Entry point -> (budget in ms, modules it must not import)
+ENTRY_POINTS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    'src.gui.main_window': (250.0, HEAVY),
+    'src.cli': (250.0, HEAVY + ('tkinter',)),
+}
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """
+    Import module in a new interpreter
+    Returns: (cumulative import time in ms, names of all modules imported)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    total = 0.0
+    imported = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imported.append(name.strip())
+        if name.strip() == module:
+            total = int(cumulative) / 1000
+    return total, imported
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check entry point import times")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per entry point, best is kept")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, (budget, forbidden) in ENTRY_POINTS.items():
+        timings = []
+        for _ in range(args.repeat):
+            elapsed, imported = measure(module)
+            timings.append(elapsed)
+        best = min(timings)
+        heavy = sorted({name.split('.')[0] for name in imported} & set(forbidden))
+        status = "ok"
+        if best > budget:
+            status, failed = f"over budget ({budget:.0f} ms)", True
+        if heavy:
+            status, failed = f"imports {', '.join(heavy)}", True
+        print(f"{module:<24} {best:8.1f} ms  {status}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
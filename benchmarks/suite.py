@@ -0,0 +1,466 @@
+"""
+End-to-end benchmarks of the device workflows
+
+    python benchmarks/suite.py run [--sizes 10,100,1000] [--backend fake|simulator] [--output base.json]
+    python benchmarks/suite.py compare base.json new.json [--threshold 0.1]
+
+Every scenario runs once per fleet size in a fresh interpreter, against
+fake netmiko connections answering in-process (with optional --latency)
+or against the SSH simulator on loopback. Each run reports wall time,
+devices per second, peak RSS, peak and still-open sessions and the
+connect/command latency quantiles. Results are JSON tagged with the git
+commit; compare exits non-zero when a scenario got slower than the
+threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from ipaddress import IPv4Network
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+SCENARIOS = ('load_csv', 'connect', 'custom_command', 'audit', 'crawl', 'route_validation', 'reports')
+DEFAULT_SIZES = (10, 100, 1000)
+
+# Commands fanned out by the custom_command scenario
+COMMANDS = ('show version', 'show running-config', 'show ip route')
+# Prefixes in the core routers' tables per device in the fleet
+ROUTES_PER_DEVICE = 10
+CORE_ROUTER_COUNT = 6
+CREDENTIALS = ('bench', 'bench')
+
+# ---------------------------------------------------------------- fleet data
+
+def prepare_fleet(size: int, directory: Path) -> Tuple[Path, Path]:
+    """
+    Synthetic network of size devices: a binary tree below the core
+    routers, which carry ROUTES_PER_DEVICE * size prefixes
+    Returns: (inventory CSV, fixtures directory)
+    """
+    from src.simulator.generator import NetworkSpec, SyntheticNetwork
+
+    spec = NetworkSpec(devices=size, topology='tree', fanout=2, core_routers=min(CORE_ROUTER_COUNT, size),
+                       routes=size * ROUTES_PER_DEVICE)
+    SyntheticNetwork(spec).write(str(directory))
+    return directory / 'inventory.csv', directory / 'fixtures'
+
+def load_ipam(directory: Path) -> Tuple[List[IPv4Network], List[str]]:
+    """Networks in the generated Micetro ranges and the supernets"""
+    from src.utils.route_validation import load_supernets
+
+    ranges = json.loads((directory / 'micetro_ranges.json').read_text())['result']['ranges']
+    supernets = load_supernets(directory / 'supernets.yaml')
+    return [IPv4Network(f"{record['from']}/{record['netmask']}") for record in ranges], supernets
+
+# ---------------------------------------------------------------- fake backend
+
+class FakeConnection:
+    """
+    Stands in for netmiko's ConnectHandler: answers from the simulator's
+    fixtures without SSH, after latency seconds per login and command
+    """
+    devices: Dict = {}
+    fixtures = None
+    latency = 0.0
+    open_sessions = 0
+    peak_sessions = 0
+    _lock = threading.Lock()
+
+    def __init__(self, host: str, device_type: str = 'cisco_ios', **kwargs):
+        device = self.devices.get(host)
+        if device is None:
+            raise ConnectionError(f"TCP connection to device failed: {host}")
+        self.device = device
+        self.device_type = device_type
+        time.sleep(self.latency)
+        with FakeConnection._lock:
+            FakeConnection.open_sessions += 1
+            FakeConnection.peak_sessions = max(FakeConnection.peak_sessions, FakeConnection.open_sessions)
+
+    def enable(self):
+        return ""
+
+    def send_command(self, command: str, **kwargs) -> str:
+        time.sleep(self.latency)
+        output = self.fixtures.output(self.device, command)
+        return output if output is not None else "% Invalid input detected at '^' marker.\n"
+
+    def disconnect(self):
+        with FakeConnection._lock:
+            FakeConnection.open_sessions -= 1
+
+def use_fake_connections(inventory: Path, fixtures: Path, latency: float):
+    """Route every connection the app makes (connector.create_connection) to FakeConnection"""
+    import netmiko
+    from src.simulator.devices import FixtureStore, load_inventory
+
+    FakeConnection.devices = {device.ip: device for device in load_inventory(str(inventory))}
+    FakeConnection.fixtures = FixtureStore(str(fixtures))
+    FakeConnection.latency = latency
+    netmiko.ConnectHandler = FakeConnection
+
+# ---------------------------------------------------------------- scenarios
+
+class Bench:
+    """State for one scenario run in the worker process"""
+
+    def __init__(self, inventory: Path, workers: int):
+        from src.core.device_manager import DeviceManager
+        from src.utils.threader import Job
+
+        self.inventory = inventory
+        self.workers = workers
+        self.device_manager = DeviceManager()
+        self.job = Job(feature='benchmark')
+        self.elapsed = 0.0
+        self.rss_before = peak_rss_mib()
+        # Drain job events as the GUI would, so the queue does not grow with the fleet
+        threading.Thread(target=self._drain, daemon=True).start()
+
+    def _drain(self):
+        while True:
+            self.job.events.get()
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        self.rss_before = peak_rss_mib()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def load(self):
+        devices = self.device_manager.load_from_csv(str(self.inventory))
+        for device in devices:
+            device.username, device.password = CREDENTIALS
+        return devices
+
+    def connect(self, devices=None) -> List:
+        devices = self.load() if devices is None else devices
+        self.device_manager.connect_devices(devices, job=self.job, max_workers=self.workers)
+        return [device for device in devices if device.connection]
+
+    def open_sessions(self) -> int:
+        return sum(1 for device in self.device_manager.devices if device.connection)
+
+    def disconnect(self):
+        def close(device):
+            try:
+                device.connection.disconnect()
+            except Exception:
+                pass
+            device.connection = None
+        connected = [device for device in self.device_manager.devices if device.connection]
+        self.job.map(close, connected, max_workers=self.workers, report_progress=False)
+
+def scenario_load_csv(bench: Bench) -> Dict:
+    with bench.measure():
+        devices = bench.load()
+    return {'devices': len(devices)}
+
+def scenario_connect(bench: Bench) -> Dict:
+    devices = bench.load()
+    with bench.measure():
+        connected = bench.connect(devices)
+    return {'devices': len(devices), 'connected': len(connected)}
+
+def scenario_custom_command(bench: Bench) -> Dict:
+    from src.core.operations import collect_outputs
+
+    connected = bench.connect()
+    with bench.measure():
+        store, index, fingerprints = collect_outputs(bench.job, connected, list(COMMANDS))
+        index.search('Loopback0')
+    outputs = len(store)
+    store.close()
+    return {'devices': len(connected), 'outputs': outputs}
+
+def scenario_audit(bench: Bench) -> Dict:
+    from src.core.operations import audit_device
+    from src.utils.audit_rules import AuditRuleManager
+
+    connected = bench.connect()
+    rules = AuditRuleManager().get_all_rules()
+    with bench.measure():
+        reports = bench.job.map(lambda device: audit_device(bench.job, device, rules), connected,
+                                max_workers=bench.workers)
+    return {'devices': len(connected), 'rules': len(rules), 'reports': len([r for r in reports if r])}
+
+def scenario_crawl(bench: Bench) -> Dict:
+    from src.core.operations import crawl_topology
+    from src.utils.network_validator import NetworkValidator
+
+    devices = bench.load()
+    root = bench.connect(devices[:1])[0]
+    validator = NetworkValidator()
+    # The fleet lives on loopback addresses
+    validator.allowed_subnets = [IPv4Network('127.0.0.0/8')]
+    with bench.measure():
+        edges = crawl_topology(bench.job, bench.device_manager, root, max_depth=64, validator=validator)
+    return {'devices': len(edges) + 1, 'edges': len(edges)}
+
+def scenario_route_validation(bench: Bench) -> Dict:
+    from src.core.operations import collect_core_routes
+    from src.utils.route_validation import RouteValidationState
+
+    devices = bench.load()
+    routers = bench.connect(devices[:CORE_ROUTER_COUNT])
+    micetro, supernets = load_ipam(bench.inventory.parent)
+    state = RouteValidationState()
+    with bench.measure():
+        routes = collect_core_routes(bench.job, bench.device_manager,
+                                     [router.hostname for router in routers])
+        state.update(micetro, routes, supernets)
+    return {'devices': len(routers), 'prefixes': sum(len(networks) for networks in routes.values()),
+            'rows': len(state.rows())}
+
+def scenario_reports(bench: Bench) -> Dict:
+    from src.utils.report_manager import Report, ReportManager
+
+    devices = bench.load()
+    manager = ReportManager()
+    with bench.measure():
+        for device in devices:
+            manager.save_report(Report(
+                report_type='benchmark',
+                device_hostname=device.hostname,
+                timestamp=datetime.now(),
+                results=f"show version\n{'-' * 40}\n" * 20,
+                device_info={'ip': device.ip, 'device_type': device.device_type}
+            ))
+        reports = manager.get_reports('benchmark')
+    return {'devices': len(devices), 'reports': len(reports)}
+
+SCENARIO_FUNCTIONS: Dict[str, Callable[[Bench], Dict]] = {
+    name: globals()[f'scenario_{name}'] for name in SCENARIOS
+}
+
+def peak_rss_mib() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    # KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+def latency_quantiles() -> Dict[str, Dict[str, float]]:
+    """p50/p95/max of the recorded connect, command and parse timings"""
+    from src.utils.metrics import Histogram, metrics
+
+    histograms, _ = metrics.snapshot()
+    merged: Dict[str, Histogram] = {}
+    for (name, _labels), histogram in histograms.items():
+        merged.setdefault(name, Histogram(histogram.buckets)).merge(histogram)
+    return {name: {'count': histogram.count,
+                   'p50_seconds': round(histogram.quantile(0.5), 4),
+                   'p95_seconds': round(histogram.quantile(0.95), 4),
+                   'max_seconds': round(histogram.max, 4)}
+            for name, histogram in sorted(merged.items())}
+
+def run_worker(args) -> int:
+    """Run one scenario in this process and write its result to args.result"""
+    if args.backend == 'fake':
+        use_fake_connections(args.inventory, args.fixtures, args.latency)
+
+    # connect_devices prints per-device progress; keep it out of the results
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            bench = Bench(args.inventory, args.workers)
+            result = SCENARIO_FUNCTIONS[args.scenario](bench)
+            open_sessions = bench.open_sessions()
+            peak_rss = peak_rss_mib()
+            bench.disconnect()
+        finally:
+            sys.stdout = stdout
+
+    devices = result.pop('devices')
+    record = {
+        'scenario': args.scenario,
+        'fleet': args.size,
+        'devices': devices,
+        'wall_seconds': round(bench.elapsed, 4),
+        'devices_per_second': round(devices / bench.elapsed, 2) if bench.elapsed else None,
+        'rss_before_mib': bench.rss_before,
+        'peak_rss_mib': peak_rss,
+        'open_sessions': open_sessions,
+        'peak_sessions': FakeConnection.peak_sessions if args.backend == 'fake' else None,
+        'latency': latency_quantiles(),
+        **result
+    }
+    Path(args.result).write_text(json.dumps(record))
+    return 0
+
+# ---------------------------------------------------------------- harness
+
+def git_revision() -> Dict[str, object]:
+    def git(*command: str) -> str:
+        result = subprocess.run(['git', *command], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ''
+    return {'commit': git('rev-parse', 'HEAD') or None,
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+def run_scenario(args, scenario: str, size: int, inventory: Path, fixtures: Path, workdir: Path) -> Dict:
+    """One scenario in a fresh interpreter, behind a simulator when that is the backend"""
+    result_file = workdir / f'{scenario}.json'
+    env = {**os.environ, 'NETWORKTOOLS_REPORTS_DIR': str(workdir / 'reports'),
+           'NETWORKTOOLS_METRICS_DIR': str(workdir / 'metrics'), 'PYTHONDONTWRITEBYTECODE': '1'}
+    env.pop('NETWORKTOOLS_PROFILE', None)
+    env['NETWORKTOOLS_SESSION_SHARDS'] = str(args.shards)
+    command = [sys.executable, __file__, 'worker', scenario, str(size), str(inventory), str(fixtures),
+               str(result_file), '--backend', args.backend, '--workers', str(args.workers),
+               '--latency', str(args.latency)]
+
+    server = None
+    if args.backend == 'simulator':
+        from src.simulator.devices import FixtureStore, load_inventory
+        from src.simulator.server import FaultSettings, SimulatorServer
+
+        server = SimulatorServer(load_inventory(str(inventory)), port=0, fixtures=FixtureStore(str(fixtures)),
+                                 faults=FaultSettings(latency=args.latency, login_latency=args.latency))
+        server.start()
+        env['NETWORKTOOLS_SSH_PORT'] = str(server.port)
+    try:
+        completed = subprocess.run(command, cwd=PROJECT_ROOT, env=env, timeout=args.timeout,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0 or not result_file.exists():
+            return {'scenario': scenario, 'fleet': size, 'error': completed.stderr.strip()[-2000:]}
+        record = json.loads(result_file.read_text())
+    except subprocess.TimeoutExpired:
+        return {'scenario': scenario, 'fleet': size, 'error': f"timed out after {args.timeout}s"}
+    finally:
+        if server is not None:
+            server.stop()
+    if server is not None:
+        record['peak_sessions'] = server.stats.peak_sessions
+    return record
+
+def run(args) -> int:
+    sizes = [int(size) for size in args.sizes.split(',')]
+    scenarios = args.scenarios.split(',') if args.scenarios else list(SCENARIOS)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    if args.shards and args.backend == 'fake':
+        print("--shards needs --backend simulator; fake connections only exist in the worker", file=sys.stderr)
+        return 2
+    if args.backend == 'simulator':
+        # Two threads per simulated session
+        threading.stack_size(512 * 1024)
+        # Clients resetting their sessions on disconnect is expected
+        logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix='networktools-bench-') as directory:
+            workdir = Path(directory)
+            inventory, fixtures = prepare_fleet(size, workdir)
+            for scenario in scenarios:
+                record = run_scenario(args, scenario, size, inventory, fixtures, workdir)
+                results.append(record)
+                if 'error' in record:
+                    print(f"{scenario:<18} {size:>6}  FAILED: {record['error'].splitlines()[-1:]}",
+                          file=sys.stderr)
+                else:
+                    print(f"{scenario:<18} {size:>6}  {record['wall_seconds']:9.3f} s "
+                          f"{record['devices_per_second'] or 0:10.1f} dev/s "
+                          f"{record['peak_rss_mib'] or 0:8.1f} MiB  sessions {record['peak_sessions']}",
+                          file=sys.stderr)
+
+    document = {
+        **git_revision(),
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'workers': args.workers,
+        'shards': args.shards,
+        'latency': args.latency,
+        'results': results
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    return 1 if any('error' in record for record in results) else 0
+
+def compare(args) -> int:
+    """Wall time of each scenario and fleet size in new relative to base"""
+    base, new = (json.loads(Path(path).read_text()) for path in (args.base, args.new))
+    print(f"base {str(base.get('commit'))[:10]}  new {str(new.get('commit'))[:10]}  "
+          f"({base.get('backend')} / {new.get('backend')})")
+    baseline = {(record['scenario'], record['fleet']): record for record in base['results']}
+    regressed = False
+    for record in new['results']:
+        old = baseline.get((record['scenario'], record['fleet']))
+        if old is None or 'error' in old or 'error' in record:
+            status = "error" if 'error' in record else "no baseline"
+            print(f"{record['scenario']:<18} {record['fleet']:>6}  {status}")
+            continue
+        ratio = record['wall_seconds'] / old['wall_seconds'] if old['wall_seconds'] else 1.0
+        status = ""
+        if ratio > 1 + args.threshold:
+            status, regressed = "SLOWER", True
+        elif ratio < 1 - args.threshold:
+            status = "faster"
+        memory = ""
+        if old.get('peak_rss_mib') and record.get('peak_rss_mib'):
+            memory = f"{record['peak_rss_mib'] - old['peak_rss_mib']:+8.1f} MiB"
+        print(f"{record['scenario']:<18} {record['fleet']:>6}  {old['wall_seconds']:9.3f} s -> "
+              f"{record['wall_seconds']:9.3f} s  x{ratio:5.2f}  {memory}  {status}")
+    return 1 if regressed else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end workflow benchmarks")
+    commands = parser.add_subparsers(dest='action', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the scenarios and write JSON results")
+    run_parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                            help="Comma separated fleet sizes (default: %(default)s)")
+    run_parser.add_argument('--scenarios', help=f"Comma separated subset of {', '.join(SCENARIOS)}")
+    run_parser.add_argument('--backend', choices=('fake', 'simulator'), default='fake')
+    run_parser.add_argument('--workers', type=int, default=10, help="Thread pool size, as in the app")
+    run_parser.add_argument('--shards', type=int, default=0, help="Session worker processes (simulator only)")
+    run_parser.add_argument('--latency', type=float, default=0.0,
+                            help="Seconds added to every login and command")
+    run_parser.add_argument('--timeout', type=float, default=1800, help="Seconds allowed per scenario run")
+    run_parser.add_argument('-o', '--output', help="Results file (default: stdout)")
+
+    compare_parser = commands.add_parser('compare', help="Compare two result files")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="Relative slowdown reported as a regression (default: %(default)s)")
+
+    # Used by run for each scenario
+    worker_parser = commands.add_parser('worker')
+    worker_parser.add_argument('scenario', choices=SCENARIOS)
+    worker_parser.add_argument('size', type=int)
+    worker_parser.add_argument('inventory', type=Path)
+    worker_parser.add_argument('fixtures', type=Path)
+    worker_parser.add_argument('result')
+    worker_parser.add_argument('--backend', choices=('fake', 'simulator'), default='fake')
+    worker_parser.add_argument('--workers', type=int, default=10)
+    worker_parser.add_argument('--latency', type=float, default=0.0)
+
+    args = parser.parse_args(argv)
+    return {'run': run, 'compare': compare, 'worker': run_worker}[args.action](args)
+
+if __name__ == '__main__':
+    sys.exit(main())
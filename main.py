@@ -1,10 +1,16 @@
-import tkinter as tk
-from src.gui.main_window import MainWindow
+import sys
 
 def main():
+    # Any arguments run a feature headless; the GUI (and tkinter) is only loaded without them
+    if len(sys.argv) > 1:
+        from src.cli import main as cli_main
+        sys.exit(cli_main())
+
+    import tkinter as tk
+    from src.gui.main_window import MainWindow
     root = tk.Tk()
     app = MainWindow(root)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,572 @@
+"""
+Headless entry point
+
+    python main.py <command> --inventory devices.csv [options]
+
+Runs a feature against a CSV inventory without Tk and writes its results
+to the report store. Keep imports here (and in what they pull in) free of
+tkinter, matplotlib and networkx so the runner starts quickly on jump
+hosts and from cron.
+"""
+import argparse
+import getpass
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+from src.core.device import Device
+from src.core.device_manager import DeviceManager
+from src.core import operations, shards
+from src.utils import profiling
+from src.utils.metrics import metrics
+from src.utils.report_manager import Report, ReportManager
+from src.utils.threader import DEFAULT_WORKERS, Job, OperationCancelled
+
+USERNAME_ENV = 'NETWORKTOOLS_USERNAME'
+PASSWORD_ENV = 'NETWORKTOOLS_PASSWORD'
+MICETRO_PASSWORD_ENV = 'MICETRO_PASSWORD'
+
+# Subcommand -> feature label used in timings (the GUI tab's module name)
+FEATURE_LABELS = {
+    'connect': 'connect',
+    'command': 'custom_command',
+    'vlans': 'vlan_discovery',
+    'neighbors': 'network_discovery',
+    'audit': 'auditor',
+    'crawl': 'crawler',
+    'validate-routes': 'route_validator',
+    'worker': 'worker',
+    'broker': 'broker',
+}
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CANCELLED = 130
+
+class CliError(Exception):
+    """Bad input that should end the run with a message rather than a traceback"""
+
+def run_job(work: Callable[[Job], Any], args) -> Any:
+    """
+    Run work(job) on a worker thread and print its events until it ends
+    Ctrl-C cancels the job; OperationCancelled is raised once it has stopped.
+    """
+    verbose = args.verbose
+    job = Job(feature=FEATURE_LABELS[args.feature], max_workers=args.workers or DEFAULT_WORKERS)
+    job.profile = args.profile
+    outcome = {}
+
+    def target():
+        try:
+            if job.profile is not None:
+                with job.profile.thread():
+                    outcome['result'] = work(job)
+            else:
+                outcome['result'] = work(job)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    while thread.is_alive() or not job.events.empty():
+        try:
+            try:
+                kind, payload = job.events.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if kind == "status":
+                print(payload, file=sys.stderr)
+            elif kind == "progress":
+                if verbose:
+                    print(f"{payload:.0f}%", file=sys.stderr)
+            elif kind == "result":
+                print(payload)
+            elif kind == "call":
+                callback, args = payload
+                callback(*args)
+        except KeyboardInterrupt:
+            if not job.cancelled:
+                print("Cancelling, waiting for running commands...", file=sys.stderr)
+                job.cancel()
+
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+def save_report(report_type: str, device: Device, results: str, **device_info):
+    ReportManager().save_report(Report(
+        report_type=report_type,
+        device_hostname=device.hostname,
+        timestamp=datetime.now(),
+        results=results,
+        device_info={
+            'ip': device.ip,
+            'device_type': device.device_type,
+            **device_info
+        }
+    ))
+
+def load_devices(args, hostnames: Optional[List[str]] = None, credentials: bool = True) -> DeviceManager:
+    """Load the inventory and set credentials on the selected devices"""
+    device_manager = DeviceManager(shards=args.shards)
+    if args.workers is None:
+        args.workers = device_manager.max_workers
+    try:
+        device_manager.load_from_csv(args.inventory)
+    except (OSError, KeyError) as e:
+        raise CliError(f"Cannot load inventory {args.inventory}: {e}")
+
+    wanted = hostnames if hostnames is not None else args.devices
+    if wanted:
+        missing = [hostname for hostname in wanted if not device_manager.get_device_by_hostname(hostname)]
+        if missing and hostnames is None:
+            raise CliError(f"Not in inventory: {', '.join(missing)}")
+        args.selected = [device_manager.get_device_by_hostname(hostname)
+                         for hostname in wanted if hostname not in missing]
+    else:
+        args.selected = list(device_manager.devices)
+    if not args.selected:
+        raise CliError("No devices selected")
+    if not credentials:
+        return device_manager
+
+    username, password = get_credentials(args)
+    for device in args.selected:
+        device.username = username
+        device.password = password
+    return device_manager
+
+def get_credentials(args):
+    username = args.username or os.environ.get(USERNAME_ENV)
+    if not username:
+        raise CliError(f"No username: pass --username or set {USERNAME_ENV}")
+    password = os.environ.get(PASSWORD_ENV)
+    if password is None:
+        if not sys.stdin.isatty():
+            raise CliError(f"No password: set {PASSWORD_ENV}")
+        password = getpass.getpass(f"Password for {username}: ")
+    return username, password
+
+def connect(args, device_manager: DeviceManager) -> List[Device]:
+    """Connect the selected devices, printing one line per failure"""
+    def work(job):
+        job.status(f"Connecting to {len(args.selected)} devices...")
+        return device_manager.connect_devices(args.selected, job=job, max_workers=args.workers)
+
+    devices = run_job(work, args)
+    connected = [device for device in devices if device.connection]
+    for device in devices:
+        if not device.connection:
+            print(f"{device.hostname}: Connection Failed", file=sys.stderr)
+    print(f"Connected to {len(connected)}/{len(devices)} devices", file=sys.stderr)
+    return connected
+
+def disconnect(device_manager: DeviceManager):
+    for device in device_manager.devices:
+        if device.connection:
+            try:
+                device.connection.disconnect()
+            except Exception:
+                pass
+            device.connection = None
+
+def map_devices(args, devices: List[Device], operation: Callable[[Job, Device], str],
+                report_type: str) -> int:
+    """
+    Run operation on every device, printing and saving each result as it finishes
+    Returns: number of devices that failed
+    """
+    def per_device(job, device):
+        try:
+            output, failed = operation(job, device), False
+        except Exception as e:
+            output, failed = f"Error: {str(e)}", True
+        save_report(report_type, device, output)
+        job.result(f"\n=== {device.hostname} ===\n{output}\n")
+        return failed
+
+    failures = run_job(
+        lambda job: job.map(lambda device: per_device(job, device), devices, args.workers,
+                            report_progress=args.verbose),
+        args
+    )
+    return sum(failures)
+
+def cmd_connect(args, device_manager, devices) -> int:
+    for device in devices:
+        print(f"{device.hostname}\t{device.ip}\tConnected")
+    return EXIT_OK if len(devices) == len(args.selected) else EXIT_FAILED
+
+def read_commands(args) -> List[str]:
+    commands = list(args.command or [])
+    if args.commands_file:
+        with open(args.commands_file) as f:
+            commands.extend(line.strip() for line in f)
+    commands = [command for command in commands if command.strip()]
+    if not commands:
+        raise CliError("No commands given")
+    return commands
+
+def cmd_command(args, device_manager, devices) -> int:
+    commands = read_commands(args)
+
+    # Devices on which any command failed
+    errors = set()
+
+    def run(job, device):
+        outputs = operations.run_commands(job, device, commands)
+        if any(error for _, _, error in outputs):
+            errors.add(device.hostname)
+        return operations.format_outputs(outputs)
+
+    failed = map_devices(args, devices, run, 'custom_command')
+    return EXIT_FAILED if failed or errors else EXIT_OK
+
+def cmd_vlans(args, device_manager, devices) -> int:
+    failed = map_devices(args, devices, operations.discover_vlans, 'vlan')
+    return EXIT_FAILED if failed else EXIT_OK
+
+def cmd_neighbors(args, device_manager, devices) -> int:
+    failed = map_devices(args, devices, operations.discover_neighbors, 'neighbors')
+    return EXIT_FAILED if failed else EXIT_OK
+
+def cmd_audit(args, device_manager, devices) -> int:
+    rules = load_audit_rules()
+
+    def per_device(job, device):
+        try:
+            report = operations.audit_device(job, device, rules)
+            job.result(f"\n=== {device.hostname} ===\n{report.results}\n")
+            return False
+        except Exception as e:
+            job.result(f"\n=== {device.hostname} ===\nError: {str(e)}\n")
+            return True
+
+    failures = run_job(
+        lambda job: job.map(lambda device: per_device(job, device), devices, args.workers,
+                            report_progress=args.verbose),
+        args
+    )
+    return EXIT_FAILED if any(failures) else EXIT_OK
+
+def load_audit_rules():
+    from src.utils.audit_rules import AuditRuleManager
+    return AuditRuleManager().get_all_rules()
+
+def crawl_seed(args, devices: List[Device]) -> Device:
+    if not args.seed:
+        return devices[0]
+    root_device = next((device for device in devices if device.hostname == args.seed), None)
+    if root_device is None:
+        raise CliError(f"Seed device {args.seed} is not {'selected' if args.broker else 'connected'}")
+    return root_device
+
+def cmd_crawl(args, device_manager, devices) -> int:
+    root_device = crawl_seed(args, devices)
+
+    failures: List[str] = []
+
+    def work(job):
+        job.status(f"Crawling from {root_device.hostname} (max depth {args.max_depth})...")
+        return operations.crawl_topology(job, device_manager, root_device, args.max_depth,
+                                         failures=failures)
+
+    edges = run_job(work, args)
+    results = "\n".join(f"{hostname} -- {neighbor}" for hostname, neighbor in edges)
+    for line in results.splitlines():
+        print(line)
+    save_report('crawl', root_device, results or "No neighbors found")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    print(f"Discovered {len(edges)} links, {len(device_manager.devices)} devices known", file=sys.stderr)
+    return EXIT_FAILED if failures else EXIT_OK
+
+def cmd_validate_routes(args, device_manager, devices) -> int:
+    # requests is only needed here
+    from src.core.micetro_client import MicetroClient
+    from src.utils.ipam_mirror import IpamMirror
+    from src.utils.route_validation import RouteValidationState
+
+    password = os.environ.get(MICETRO_PASSWORD_ENV)
+    if password is None:
+        if not sys.stdin.isatty():
+            raise CliError(f"No Micetro password: set {MICETRO_PASSWORD_ENV}")
+        password = getpass.getpass(f"Micetro password for {args.micetro_user}: ")
+    client = MicetroClient(args.micetro_url, args.micetro_user, password)
+    mirror = IpamMirror.for_server(client.base_url)
+
+    def work(job):
+        supernets = operations.load_supernets()
+        job.status("Syncing IPAM mirror...")
+        changes = client.sync_mirror(mirror)
+        job.result(
+            f"IPAM sync: {changes.blocks_changed}/{changes.blocks_checked} address blocks changed, "
+            f"{len(changes.added)} added, {len(changes.removed)} removed"
+        )
+        job.check()
+        job.status("Collecting routes from core routers...")
+        router_routes = operations.collect_core_routes(job, device_manager)
+        return RouteValidationState().update(mirror.networks(), router_routes, supernets)
+
+    try:
+        delta = run_job(work, args)
+    finally:
+        client.close()
+
+    rows = sorted(delta.newly_missing + delta.newly_valid + delta.changed, key=lambda row: str(row[0]))
+    results = "\n".join(f"{network}\t{source}\t{status}" for network, source, status in rows)
+    print(results)
+    ReportManager().save_report(Report(
+        report_type='route_validation',
+        device_hostname=client.base_url.split('://')[-1].split('/')[0],
+        timestamp=datetime.now(),
+        results=results,
+        device_info={'core_routers': [device.hostname for device in devices]}
+    ))
+    return EXIT_OK
+
+def run_distributed(args, devices: List[Device]) -> int:
+    """
+    Submit the feature to the broker as one task per device, then print and
+    save each device's result as workers finish it, as a local run would
+    """
+    # sqlite3 is only needed with --broker
+    from src.core import distributed
+    from src.core.broker import BrokerError, DONE, FAILED, SKIPPED
+
+    if args.feature not in distributed.TASK_KINDS:
+        raise CliError(f"{args.feature} cannot run on workers")
+    payload = {}
+    if args.feature == 'command':
+        payload['commands'] = read_commands(args)
+    elif args.feature == 'audit':
+        payload['rules'] = distributed.rule_payload(load_audit_rules())
+    elif args.feature == 'crawl':
+        devices = [crawl_seed(args, devices)]
+        payload.update(depth=1, max_depth=args.max_depth)
+    broker = open_broker(args.broker)
+    try:
+        run_id = distributed.submit_run(broker, args.feature, devices, **payload)
+    except (BrokerError, OSError) as e:
+        raise CliError(f"Cannot submit to broker {args.broker}: {e}")
+    print(f"Submitted {len(devices)} tasks to {args.broker} (run {run_id})", file=sys.stderr)
+
+    report_types = {'command': 'custom_command', 'vlans': 'vlan', 'neighbors': 'neighbors', 'audit': 'audit'}
+    failures, edges, workers = [], [], set()
+
+    def on_task(job, task):
+        if task.state == FAILED:
+            failures.append(f"{task.hostname}: {task.error}")
+            return
+        if task.state == SKIPPED:
+            if task.error:
+                job.result(task.error)
+            return
+        if task.state != DONE:
+            return
+        workers.add(task.worker)
+        if task.result.get('failed'):
+            failures.append(f"{task.hostname}: command failed")
+        if args.feature == 'crawl':
+            edges.extend(task.result['edges'])
+            for hostname, neighbor in task.result['edges']:
+                job.result(f"{hostname} -- {neighbor}")
+        elif args.feature == 'connect':
+            job.result(f"{task.hostname}\t{task.payload['device']['ip']}\tConnected")
+        else:
+            output = task.result['output']
+            save_report(report_types[args.feature], distributed.task_device(task), output, worker=task.worker)
+            job.result(f"\n=== {task.hostname} ===\n{output}\n")
+
+    def work(job):
+        job.status("Waiting for workers...")
+        distributed.follow_run(job, broker, run_id, lambda task: on_task(job, task))
+
+    try:
+        run_job(work, args)
+    except (BrokerError, OSError) as e:
+        raise CliError(f"Lost broker {args.broker}: {e}")
+    finally:
+        broker.close()
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if args.feature == 'crawl':
+        results = "\n".join(f"{hostname} -- {neighbor}" for hostname, neighbor in edges)
+        save_report('crawl', devices[0], results or "No neighbors found")
+        print(f"Discovered {len(edges)} links", file=sys.stderr)
+    print(f"Run {run_id} finished on {len(workers)} workers", file=sys.stderr)
+    return EXIT_FAILED if failures else EXIT_OK
+
+def cmd_worker(args) -> int:
+    """Run tasks from the broker with this host's credentials until stopped"""
+    from src.core import distributed
+
+    username, password = get_credentials(args)
+    broker = open_broker(args.broker)
+    device_manager = DeviceManager(shards=args.shards)
+    if args.workers is None:
+        args.workers = device_manager.max_workers
+    worker = distributed.BrokerWorker(broker, device_manager, username, password,
+                                      name=args.name, region=args.region)
+    try:
+        completed = run_job(lambda job: worker.run(job, args.workers, idle_exit=args.idle_exit), args)
+    finally:
+        broker.close()
+        device_manager.close()
+    print(f"Worker {worker.name} ran {completed} tasks", file=sys.stderr)
+    return EXIT_OK
+
+def open_broker(location: str):
+    from src.core.broker import BrokerError
+    from src.core.broker_http import open_broker
+
+    try:
+        return open_broker(location)
+    except (BrokerError, OSError) as e:
+        raise CliError(f"Cannot open broker {location}: {e}")
+
+def cmd_broker(args) -> int:
+    """Serve the job database to controllers and workers on other hosts until Ctrl-C"""
+    from src.core.broker import BrokerError, JobBroker
+    from src.core.broker_http import BrokerServer, TOKEN_ENV, parse_listen
+
+    host, port = parse_listen(args.listen)
+    try:
+        server = BrokerServer(JobBroker(args.db), host, port, token=os.environ.get(TOKEN_ENV),
+                              certfile=args.tls_cert, keyfile=args.tls_key)
+    except (BrokerError, OSError, ValueError) as e:
+        raise CliError(f"Cannot serve {args.db}: {e}")
+    print(f"Serving {args.db} at {server.url}", file=sys.stderr)
+    if not os.environ.get(TOKEN_ENV):
+        print(f"Set {TOKEN_ENV}={server.token} for controllers and workers", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return EXIT_OK
+
+def export_metrics(args):
+    try:
+        textfile, summary = metrics.export(args.metrics_dir)
+    except OSError as e:
+        print(f"Could not write metrics: {e}", file=sys.stderr)
+        return
+    if args.verbose:
+        print(f"Timings written to {textfile} and {summary}", file=sys.stderr)
+
+COMMANDS = {
+    'connect': cmd_connect,
+    'command': cmd_command,
+    'vlans': cmd_vlans,
+    'neighbors': cmd_neighbors,
+    'audit': cmd_audit,
+    'crawl': cmd_crawl,
+    'validate-routes': cmd_validate_routes,
+}
+
+def build_parser() -> argparse.ArgumentParser:
+    # Options for anything that opens sessions, including workers
+    session = argparse.ArgumentParser(add_help=False)
+    session.add_argument('-u', '--username', help=f"Login username (default: ${USERNAME_ENV})")
+    session.add_argument('-w', '--workers', type=int, help="Parallel sessions (default: 10, or every thread "
+                         "of every --shards worker)")
+    session.add_argument('-v', '--verbose', action='store_true', help="Print progress")
+    session.add_argument('--shards', type=int, help="Worker processes holding the SSH sessions, for fleets "
+                         f"of hundreds of devices (default: ${shards.SHARDS_ENV} or 0)")
+    session.add_argument('--profile', dest='profile_flag', action='store_true',
+                         help=f"Save cProfile stats, collapsed stacks and a memory snapshot "
+                              f"(also enabled by ${profiling.PROFILE_ENV})")
+    session.add_argument('--metrics-dir', help="Where to write the timing textfile and run summary "
+                                               "(default: $NETWORKTOOLS_METRICS_DIR or ~/.networktools/metrics)")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[session])
+    common.add_argument('-i', '--inventory', required=True, help="Device CSV (hostname, ip, model)")
+    common.add_argument('-d', '--devices', type=lambda value: [h for h in value.split(',') if h],
+                        help="Comma-separated hostnames to run on (default: all)")
+    common.add_argument('--broker', help="Hand the devices to workers instead of connecting from here: "
+                                         "a job database on this host or the URL of 'main.py broker'")
+
+    parser = argparse.ArgumentParser(
+        prog='networktools',
+        description=f"Run Network Tools features without the GUI. "
+                    f"The login password is read from ${PASSWORD_ENV} or prompted for."
+    )
+    subparsers = parser.add_subparsers(dest='feature', required=True)
+    subparsers.add_parser('connect', parents=[common], help="Check that devices can be logged into")
+    command = subparsers.add_parser('command', parents=[common], help="Run show commands")
+    command.add_argument('-c', '--command', action='append', help="Command to run (repeatable)")
+    command.add_argument('-f', '--commands-file', help="File with one command per line")
+    subparsers.add_parser('vlans', parents=[common], help="VLAN discovery")
+    subparsers.add_parser('neighbors', parents=[common], help="CDP/LLDP neighbor discovery")
+    subparsers.add_parser('audit', parents=[common], help="Run the audit rules")
+    crawl = subparsers.add_parser('crawl', parents=[common], help="Crawl the topology over CDP")
+    crawl.add_argument('--seed', help="Device to start from (default: first connected)")
+    crawl.add_argument('--max-depth', type=int, default=3)
+    validate = subparsers.add_parser(
+        'validate-routes', parents=[common],
+        help=f"Validate core router routes against Micetro (password from ${MICETRO_PASSWORD_ENV})"
+    )
+    validate.add_argument('--micetro-url', required=True)
+    validate.add_argument('--micetro-user', required=True)
+    worker = subparsers.add_parser('worker', parents=[session],
+                                   help="Run devices handed out by a controller's --broker")
+    worker.add_argument('--broker', required=True,
+                        help="The controller's job database (same host only) or the URL of 'main.py broker'")
+    worker.add_argument('--region', help="Only take devices with this inventory region (or none)")
+    worker.add_argument('--name', help="Worker name recorded with results (default: host-pid)")
+    worker.add_argument('--idle-exit', type=float, help="Stop after this many seconds without tasks")
+    broker = subparsers.add_parser('broker', help="Serve a job database to controllers and workers on other hosts "
+                                                  "(token from $NETWORKTOOLS_BROKER_TOKEN or generated)")
+    broker.set_defaults(verbose=False, profile_flag=False, metrics_dir=None)
+    broker.add_argument('--db', required=True, help="Job database file on this host's local disk")
+    broker.add_argument('--listen', default='127.0.0.1:8765', help="host:port to serve on (default: 127.0.0.1:8765)")
+    broker.add_argument('--tls-cert', help="Certificate (PEM) to serve HTTPS with")
+    broker.add_argument('--tls-key', help="Private key for --tls-cert, if not in the same file")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # One profile covers every job of the run
+    args.profile = None
+    if args.profile_flag or profiling.is_enabled():
+        args.profile = profiling.RunProfile(FEATURE_LABELS[args.feature])
+        args.profile.start()
+    device_manager = None
+    try:
+        # Route validation only needs the core routers
+        hostnames = None
+        if args.feature == 'validate-routes' and not args.devices:
+            hostnames = operations.CORE_ROUTERS
+        if args.feature == 'worker':
+            return cmd_worker(args)
+        if args.feature == 'broker':
+            return cmd_broker(args)
+        if args.broker:
+            load_devices(args, hostnames, credentials=False)
+            return run_distributed(args, args.selected)
+        device_manager = load_devices(args, hostnames)
+        devices = connect(args, device_manager)
+        if not devices:
+            return EXIT_FAILED
+        return COMMANDS[args.feature](args, device_manager, devices)
+    except CliError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    except OperationCancelled:
+        print("Cancelled", file=sys.stderr)
+        return EXIT_CANCELLED
+    finally:
+        if device_manager is not None:
+            disconnect(device_manager)
+            device_manager.close()
+        export_metrics(args)
+        if args.profile is not None:
+            args.profile.stop()
+            print(f"Profile saved to {args.profile.save()}", file=sys.stderr)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+SQLite job broker shared by a controller and networktools workers
+
+A controller creates a run and submits one task per device; workers claim
+pending tasks, run them with their own credentials and store the
+results; the controller collects them as they finish. Claims are leases
+that workers renew while a task runs: a task held by a worker that died
+is handed out again once the lease runs out, until it has used its
+attempts. Task hostnames are unique within a run and kind, which is what
+keeps a distributed crawl from visiting a device twice.
+
+The database uses WAL journaling, which relies on shared memory between
+the processes using it, so the file must stay on one host's local disk.
+Workers on other hosts reach it through the HTTP service in broker_http.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+PENDING = 'pending'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+# Recorded but never run, e.g. crawl neighbors past the depth limit or outside the allowed subnets
+SKIPPED = 'skipped'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, SKIPPED, CANCELLED)
+
+# Filesystem types (from /proc/mounts) on which SQLite's locking and WAL are unsafe
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'afs', '9p', 'ceph', 'glusterfs',
+                       'fuse.sshfs', 'fuse.glusterfs', 'fuse.s3fs', 'fuse.gcsfuse', 'lustre', 'beegfs')
+MOUNTS_FILE = '/proc/mounts'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    feature TEXT NOT NULL,
+    created REAL NOT NULL,
+    cancelled INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs (id),
+    kind TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    region TEXT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    finished_seq INTEGER,
+    UNIQUE (run_id, kind, hostname)
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, region);
+CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (run_id, finished_seq);
+"""
+
+@dataclass
+class Task:
+    id: int
+    run_id: str
+    kind: str
+    hostname: str
+    region: Optional[str]
+    payload: Dict
+    state: str = PENDING
+    worker: Optional[str] = None
+    attempts: int = 0
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    # Order in which the run's tasks finished
+    finished_seq: Optional[int] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Task':
+        return cls(
+            id=row['id'],
+            run_id=row['run_id'],
+            kind=row['kind'],
+            hostname=row['hostname'],
+            region=row['region'],
+            payload=json.loads(row['payload']),
+            state=row['state'],
+            worker=row['worker'],
+            attempts=row['attempts'],
+            result=json.loads(row['result']) if row['result'] else None,
+            error=row['error'],
+            finished_seq=row['finished_seq']
+        )
+
+class BrokerError(Exception):
+    """The broker cannot be used or rejected a request"""
+
+def network_filesystem(path: str, mounts_file: Optional[str] = None) -> Optional[str]:
+    """Type of the network filesystem holding path, None if it is local (or unknown)"""
+    try:
+        with open(mounts_file or MOUNTS_FILE) as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return None
+    directory = os.path.dirname(os.path.realpath(path))
+    best, fstype = '', None
+    for mount_point, mount_type in mounts:
+        # /proc/mounts escapes spaces as \040
+        mount_point = mount_point.replace('\\040', ' ')
+        inside = directory == mount_point or directory.startswith(mount_point.rstrip('/') + '/')
+        if inside and len(mount_point) >= len(best):
+            best, fstype = mount_point, mount_type
+    return fstype if fstype in NETWORK_FILESYSTEMS else None
+
+class JobBroker:
+    """
+    The broker database; every process using the file must be on this host
+    Raises: BrokerError if path is on a network filesystem
+    """
+
+    # Seconds a claim lasts without a heartbeat before the task can be handed to another worker
+    LEASE = 120
+    # Runs of a task before a failure is final
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, path: str, lease: float = LEASE, max_attempts: int = MAX_ATTEMPTS):
+        fstype = network_filesystem(path)
+        if fstype:
+            raise BrokerError(f"{path} is on a network filesystem ({fstype}); keep the broker database on "
+                              f"local disk and give remote workers the URL of 'main.py broker'")
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # sqlite3 connections stay on the thread that opened them
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            # Readers do not block the writer; many workers poll at once
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _write(self):
+        """Transaction that takes the write lock up front, so claims cannot race"""
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        return _Transaction(db)
+
+    def create_run(self, feature: str) -> str:
+        run_id = uuid.uuid4().hex
+        self._connection().execute("INSERT INTO runs (id, feature, created) VALUES (?, ?, ?)",
+                                   (run_id, feature, time.time()))
+        return run_id
+
+    def submit(self, run_id: str, kind: str, tasks: Iterable[Dict], state: str = PENDING) -> List[bool]:
+        """
+        Add tasks, each a dict with hostname, optional region and payload
+        A task whose hostname the run already has for this kind is dropped.
+        Returns: whether each task was added
+        """
+        added, ids = [], []
+        with self._write() as db:
+            for task in tasks:
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO tasks (run_id, kind, hostname, region, payload, state, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, kind, task['hostname'], task.get('region'), json.dumps(task.get('payload', {})),
+                     state, task.get('error'))
+                )
+                added.append(cursor.rowcount == 1)
+                if cursor.rowcount == 1:
+                    ids.append(cursor.lastrowid)
+            if state in FINISHED:
+                self._sequence(db, run_id, ids)
+        return added
+
+    def claim(self, worker: str, limit: int = 1, region: Optional[str] = None,
+              kinds: Optional[Sequence[str]] = None) -> List[Task]:
+        """
+        Lease up to limit pending tasks (or tasks whose lease ran out)
+        A worker with a region only takes tasks for that region or for none.
+        """
+        now = time.time()
+        conditions = ["(t.state = ? OR (t.state = ? AND t.claimed_at < ?))",
+                      "t.run_id IN (SELECT id FROM runs WHERE cancelled = 0)"]
+        params: List = [PENDING, CLAIMED, now - self.lease]
+        if region is not None:
+            conditions.append("(t.region IS NULL OR t.region = ?)")
+            params.append(region)
+        if kinds:
+            conditions.append(f"t.kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+        with self._write() as db:
+            self._expire(db, now)
+            rows = db.execute(f"SELECT t.* FROM tasks t WHERE {' AND '.join(conditions)} "
+                              f"ORDER BY t.id LIMIT ?", params + [limit]).fetchall()
+            tasks = [Task.from_row(row) for row in rows]
+            for task in tasks:
+                task.state, task.worker, task.attempts = CLAIMED, worker, task.attempts + 1
+                db.execute("UPDATE tasks SET state = ?, worker = ?, claimed_at = ?, attempts = ? WHERE id = ?",
+                           (CLAIMED, worker, now, task.attempts, task.id))
+        return tasks
+
+    def heartbeat(self, tasks: List[Task]) -> List[int]:
+        """
+        Renew the leases of tasks a worker is still running
+        Returns: ids of tasks whose lease was lost (taken over, or failed after expiring)
+        """
+        now = time.time()
+        lost = []
+        with self._write() as db:
+            for task in tasks:
+                cursor = db.execute("UPDATE tasks SET claimed_at = ? WHERE id = ? AND state = ? AND worker = ?",
+                                    (now, task.id, CLAIMED, task.worker))
+                if not cursor.rowcount:
+                    lost.append(task.id)
+        return lost
+
+    def complete(self, task: Task, result: Dict):
+        self._finish(task, DONE, result=json.dumps(result))
+
+    def fail(self, task: Task, error: str):
+        """Record a failure; the task goes back to the queue until it has used its attempts"""
+        if task.attempts < self.max_attempts:
+            with self._write() as db:
+                db.execute("UPDATE tasks SET state = ?, worker = NULL, claimed_at = NULL, error = ? "
+                           "WHERE id = ? AND state = ? AND worker = ?",
+                           (PENDING, error, task.id, CLAIMED, task.worker))
+            return
+        self._finish(task, FAILED, error=error)
+
+    def release(self, task: Task):
+        """Give a claimed task back without counting the attempt, e.g. when a worker stops"""
+        with self._write() as db:
+            db.execute("UPDATE tasks SET state = ?, worker = NULL, claimed_at = NULL, attempts = attempts - 1 "
+                       "WHERE id = ? AND state = ? AND worker = ?", (PENDING, task.id, CLAIMED, task.worker))
+
+    def cancel(self, run_id: str):
+        """Stop handing out the run's tasks; claimed ones still finish"""
+        with self._write() as db:
+            db.execute("UPDATE runs SET cancelled = 1 WHERE id = ?", (run_id,))
+            ids = [row['id'] for row in db.execute("SELECT id FROM tasks WHERE run_id = ? AND state = ?",
+                                                   (run_id, PENDING))]
+            db.execute("UPDATE tasks SET state = ? WHERE run_id = ? AND state = ?", (CANCELLED, run_id, PENDING))
+            self._sequence(db, run_id, ids)
+
+    def finished(self, run_id: str, after: int = 0) -> List[Task]:
+        """Tasks of the run finished after sequence number after, in the order they finished"""
+        rows = self._connection().execute(
+            "SELECT * FROM tasks WHERE run_id = ? AND finished_seq > ? ORDER BY finished_seq",
+            (run_id, after)
+        ).fetchall()
+        return [Task.from_row(row) for row in rows]
+
+    def progress(self, run_id: str) -> Dict[str, int]:
+        """Task count per state"""
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY state",
+                                          (run_id,)).fetchall()
+        return {state: count for state, count in rows}
+
+    def is_done(self, run_id: str) -> bool:
+        counts = self.progress(run_id)
+        return not counts.get(PENDING) and not counts.get(CLAIMED)
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def _expire(self, db: sqlite3.Connection, now: float):
+        """Fail expired claims of tasks that have used their attempts, rather than hand them out again"""
+        rows = db.execute("SELECT id, run_id FROM tasks WHERE state = ? AND claimed_at < ? AND attempts >= ?",
+                          (CLAIMED, now - self.lease, self.max_attempts)).fetchall()
+        for row in rows:
+            db.execute("UPDATE tasks SET state = ?, error = ? WHERE id = ?",
+                       (FAILED, f"Lease expired on attempt {self.max_attempts}: "
+                                f"the worker stopped or lost contact with the broker", row['id']))
+            self._sequence(db, row['run_id'], [row['id']])
+
+    def _finish(self, task: Task, state: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._write() as db:
+            # A worker whose lease ran out may finish after another took the task over
+            cursor = db.execute("UPDATE tasks SET state = ?, result = ?, error = ? "
+                                "WHERE id = ? AND state = ? AND worker = ?",
+                                (state, result, error, task.id, CLAIMED, task.worker))
+            if cursor.rowcount:
+                self._sequence(db, task.run_id, [task.id])
+
+    def _sequence(self, db: sqlite3.Connection, run_id: str, ids: List[int]):
+        """Number newly finished tasks so the controller can read them in order"""
+        last = db.execute("SELECT COALESCE(MAX(finished_seq), 0) FROM tasks WHERE run_id = ?",
+                          (run_id,)).fetchone()[0]
+        for offset, task_id in enumerate(ids, 1):
+            db.execute("UPDATE tasks SET finished_seq = ? WHERE id = ?", (last + offset, task_id))
+
+class _Transaction:
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,210 @@
+"""
+HTTP access to a JobBroker for controllers and workers on other hosts
+
+`main.py broker` runs a BrokerServer next to the database file; remote
+processes use a RemoteBroker, which has the same methods as JobBroker.
+Each call is a POST to /<method> with a JSON body of keyword arguments,
+and the reply is {"result": ...} or {"error": ...}. Requests must carry
+the server's token as a bearer token. Serve over TLS (or on a trusted
+network) since results carry device output.
+"""
+import hmac
+import json
+import logging
+import os
+import secrets
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from src.core.broker import BrokerError, JobBroker, Task
+
+# Shared secret between the broker service and its clients
+TOKEN_ENV = 'NETWORKTOOLS_BROKER_TOKEN'
+DEFAULT_PORT = 8765
+
+# JobBroker methods served, and which of their arguments are tasks
+METHODS = {
+    'create_run': (),
+    'submit': (),
+    'claim': (),
+    'complete': ('task',),
+    'fail': ('task',),
+    'release': ('task',),
+    'heartbeat': ('tasks',),
+    'cancel': (),
+    'finished': (),
+    'progress': (),
+    'is_done': (),
+}
+
+logger = logging.getLogger(__name__)
+
+def open_broker(location: str, token: Optional[str] = None):
+    """A RemoteBroker for an http(s):// URL, else a JobBroker on the local file"""
+    if location.startswith(('http://', 'https://')):
+        return RemoteBroker(location, token if token is not None else os.environ.get(TOKEN_ENV))
+    return JobBroker(location)
+
+def parse_listen(value: str) -> Tuple[str, int]:
+    """host:port, host or :port"""
+    host, _, port = value.rpartition(':') if ':' in value else (value, '', '')
+    return host or '127.0.0.1', int(port) if port else DEFAULT_PORT
+
+def _encode(value):
+    if isinstance(value, Task):
+        return asdict(value)
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    return value
+
+class BrokerServer:
+    """Serves a JobBroker over HTTP until shutdown()"""
+
+    def __init__(self, broker: JobBroker, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 token: Optional[str] = None, certfile: Optional[str] = None, keyfile: Optional[str] = None):
+        self.broker = broker
+        self.token = token or secrets.token_urlsafe(24)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+            self.scheme = 'https'
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self) -> threading.Thread:
+        """Serve on a background thread"""
+        thread = threading.Thread(target=self.serve_forever, name='broker-http', daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def call(self, method: str, kwargs: Dict):
+        if method not in METHODS:
+            raise BrokerError(f"Unknown method: {method}")
+        for name in METHODS[method]:
+            if name == 'tasks':
+                kwargs[name] = [Task(**task) for task in kwargs[name]]
+            else:
+                kwargs[name] = Task(**kwargs[name])
+        return _encode(getattr(self.broker, method)(**kwargs))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                expected = f"Bearer {server.token}".encode()
+                if not hmac.compare_digest(self.headers.get('Authorization', '').encode(), expected):
+                    self._reply(401, {'error': "Bad or missing broker token"})
+                    return
+                try:
+                    body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                    result = server.call(self.path.strip('/'), json.loads(body or b'{}'))
+                except (BrokerError, TypeError, ValueError, KeyError) as e:
+                    self._reply(400, {'error': str(e)})
+                    return
+                except Exception as e:
+                    logger.exception("Broker call %s failed", self.path)
+                    self._reply(500, {'error': str(e)})
+                    return
+                self._reply(200, {'result': result})
+
+            def _reply(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug("%s %s", self.address_string(), format % args)
+
+        return Handler
+
+class RemoteBroker:
+    """JobBroker methods over HTTP; raises BrokerError (or OSError when unreachable)"""
+
+    def __init__(self, url: str, token: Optional[str], timeout: float = 30, cafile: Optional[str] = None):
+        if not token:
+            raise BrokerError(f"No broker token: set {TOKEN_ENV} to the token 'main.py broker' printed")
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self._context = ssl.create_default_context(cafile=cafile) if self.url.startswith('https') else None
+
+    def _call(self, method: str, **kwargs):
+        request = urllib.request.Request(
+            f"{self.url}/{method}",
+            data=json.dumps(_encode_kwargs(kwargs)).encode(),
+            headers={'Content-Type': 'application/json', 'Authorization': f"Bearer {self.token}"},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout, context=self._context) as response:
+                return json.loads(response.read())['result']
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise BrokerError(f"Broker {method} failed ({e.code}): {message}")
+
+    def create_run(self, feature: str) -> str:
+        return self._call('create_run', feature=feature)
+
+    def submit(self, run_id: str, kind: str, tasks, state: Optional[str] = None) -> List[bool]:
+        kwargs = {'state': state} if state else {}
+        return self._call('submit', run_id=run_id, kind=kind, tasks=list(tasks), **kwargs)
+
+    def claim(self, worker: str, limit: int = 1, region: Optional[str] = None, kinds=None) -> List[Task]:
+        tasks = self._call('claim', worker=worker, limit=limit, region=region,
+                           kinds=list(kinds) if kinds else None)
+        return [Task(**task) for task in tasks]
+
+    def complete(self, task: Task, result: Dict):
+        self._call('complete', task=task, result=result)
+
+    def fail(self, task: Task, error: str):
+        self._call('fail', task=task, error=error)
+
+    def release(self, task: Task):
+        self._call('release', task=task)
+
+    def heartbeat(self, tasks: List[Task]) -> List[int]:
+        return self._call('heartbeat', tasks=tasks)
+
+    def cancel(self, run_id: str):
+        self._call('cancel', run_id=run_id)
+
+    def finished(self, run_id: str, after: int = 0) -> List[Task]:
+        return [Task(**task) for task in self._call('finished', run_id=run_id, after=after)]
+
+    def progress(self, run_id: str) -> Dict[str, int]:
+        return self._call('progress', run_id=run_id)
+
+    def is_done(self, run_id: str) -> bool:
+        return self._call('is_done', run_id=run_id)
+
+    def close(self):
+        pass
+
+def _encode_kwargs(kwargs: Dict) -> Dict:
+    return {name: _encode(value) for name, value in kwargs.items()}
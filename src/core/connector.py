@@ -1,26 +1,42 @@
-from netmiko import ConnectHandler
+import logging
+import os
 from typing import Dict, Optional
+from src.utils.metrics import metrics
+
+# Port used when a device has none of its own (e.g. to reach a local simulator)
+SSH_PORT_ENV = 'NETWORKTOOLS_SSH_PORT'
+
+logger = logging.getLogger(__name__)
 
 def create_connection(device_params: Dict) -> Optional[object]:
     try:
-        # Ensure we have required parameters
-        required_params = ['device_type', 'ip', 'username', 'password']
-        if not all(param in device_params for param in required_params):
-            raise ValueError("Missing required connection parameters")
-            
-        # Add timeout parameters
-        connection_params = {
-            'device_type': device_params['device_type'],
-            'host': device_params['ip'],
-            'username': device_params['username'],
-            'password': device_params['password'],
-            'timeout': 10,  # Connection timeout in seconds
-            'fast_cli': True,  # Enable fast CLI mode
-            'session_timeout': 60  # Session timeout in seconds
-        }
-            
-        connection = ConnectHandler(**connection_params)
-        return connection
+        return open_connection(device_params)
     except Exception as e:
-        print(f"Connection failed: {e}")
-        return None
\ No newline at end of file
+        logger.warning("Connection to %s failed: %s",
+                       device_params.get('hostname', device_params.get('ip')), e)
+        return None
+
+def open_connection(device_params: Dict) -> object:
+    """A netmiko connection; raises if it cannot be made"""
+    # netmiko (and paramiko) take a while to import; only pay for it on first connect
+    from netmiko import ConnectHandler
+    # Ensure we have required parameters
+    required_params = ['device_type', 'ip', 'username', 'password']
+    if not all(param in device_params for param in required_params):
+        raise ValueError("Missing required connection parameters")
+        
+    # Add timeout parameters
+    connection_params = {
+        'device_type': device_params['device_type'],
+        'host': device_params['ip'],
+        'port': int(device_params.get('port') or os.environ.get(SSH_PORT_ENV) or 22),
+        'username': device_params['username'],
+        'password': device_params['password'],
+        'timeout': 10,  # Connection timeout in seconds
+        'fast_cli': True,  # Enable fast CLI mode
+        'session_timeout': 60  # Session timeout in seconds
+    }
+        
+    # TCP, SSH handshake, authentication and session setup
+    with metrics.timed('connect_seconds', device=device_params.get('hostname', device_params['ip'])):
+        return ConnectHandler(**connection_params)
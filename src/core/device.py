@@ -15,6 +15,10 @@ class Device:
     device_type: str
     username: Optional[str] = None
     password: Optional[str] = None
+    # SSH port, if not the default
+    port: Optional[int] = None
+    # Site the device belongs to; distributed runs send its tasks to workers there
+    region: Optional[str] = None
     connection: Optional[object] = None
     status: DeviceStatus = DeviceStatus.DISCONNECTED
     
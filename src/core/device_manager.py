@@ -1,10 +1,15 @@
-from typing import List, Optional
+import logging
+from typing import Dict, List, Optional
 from .device import Device
 from .connector import create_connection
+from .shards import ShardPool, shard_count
 from src.utils.csv_handler import load_devices_from_csv
-from src.utils.threader import run_threaded_operation
+from src.utils.metrics import metrics
+from src.utils.threader import DEFAULT_WORKERS, Job, run_threaded_operation
 import re
 
+logger = logging.getLogger(__name__)
+
 class DeviceManager:
     DEVICE_TYPE_PATTERNS = [
         # Catalyst 9000 Series (IOS-XE)
@@ -38,8 +43,27 @@ class DeviceManager:
     }
     DEFAULT_TYPE = 'cisco_ios'
 
-    def __init__(self):
+    def __init__(self, shards: Optional[int] = None):
         self.devices: List[Device] = []
+        # Worker processes owning the SSH sessions (default $NETWORKTOOLS_SESSION_SHARDS);
+        # without them sessions live in this process
+        count = shard_count() if shards is None else shards
+        self.shards: Optional[ShardPool] = ShardPool(count) if count > 0 else None
+        # hostname -> device, rebuilt whenever self.devices has changed length
+        self._by_hostname: Dict[str, Device] = {}
+        self._indexed_count = 0
+
+    @property
+    def max_workers(self) -> int:
+        """Sessions worth driving at once: every thread of every shard, else DEFAULT_WORKERS"""
+        if self.shards is not None:
+            return self.shards.size * self.shards.threads
+        return DEFAULT_WORKERS
+
+    def close(self):
+        """Stop the session shards, if any; their sessions are dropped"""
+        if self.shards is not None:
+            self.shards.close()
 
     def load_from_csv(self, filepath: str) -> List[Device]:
         device_data = load_devices_from_csv(filepath)
@@ -52,22 +76,32 @@ class DeviceManager:
             device = Device(
                 hostname=data['hostname'],
                 ip=data['ip'],
-                device_type=self._detect_device_type(model)
+                device_type=self._detect_device_type(model),
+                port=int(data['port']) if data.get('port') else None,
+                region=data.get('region') or None
             )
             self.devices.append(device)
+        self._reindex()
         return self.devices
 
-    def connect_devices(self, selected_devices: List[Device]) -> List[Device]:
+    def add_device(self, device: Device):
+        self.devices.append(device)
+        self._by_hostname.setdefault(device.hostname, device)
+        self._indexed_count = len(self.devices)
+
+    def connect_devices(self, selected_devices: List[Device], job: Optional[Job] = None,
+                        max_workers: Optional[int] = None) -> List[Device]:
+        """Connect in parallel; with a job, devices not yet started are skipped once it is cancelled"""
         def connect_device(device: Device):
-            # Debug prints
-            print(f"Device {device.hostname}:")
-            print(f"Original device_type: {device.device_type}")
             netmiko_type = self.NETMIKO_TYPE_MAP.get(device.device_type, 'cisco_ios')
-            print(f"Mapped to Netmiko type: {netmiko_type}")
+            logger.debug("%s: device_type %s mapped to Netmiko type %s",
+                         device.hostname, device.device_type, netmiko_type)
             
             device_params = {
                 'device_type': netmiko_type,
+                'hostname': device.hostname,
                 'ip': device.ip,
+                'port': device.port,
                 'username': device.username,
                 'password': device.password,
                 'secret': device.password,  # Using same password for enable
@@ -76,23 +110,37 @@ class DeviceManager:
                 'session_timeout': 60
             }
             try:
-                device.connection = create_connection(device_params)
+                device.connection = self.open_connection(device_params)
                 if device.connection:
-                    print(f"Successfully connected to {device.hostname}")
+                    logger.debug("Connected to %s", device.hostname)
                     # Enter enable mode
-                    device.connection.enable()
-                    print(f"Entered enable mode on {device.hostname}")
-                else:
-                    print(f"Failed to connect to {device.hostname}")
+                    with metrics.timed('enable_seconds', device=device.hostname):
+                        device.connection.enable()
+                    logger.debug("Entered enable mode on %s", device.hostname)
             except Exception as e:
-                print(f"Error connecting to {device.hostname}: {str(e)}")
+                logger.warning("Error connecting to %s: %s", device.hostname, e)
                 device.connection = None
             return device
 
-        return run_threaded_operation(connect_device, selected_devices)
+        return run_threaded_operation(connect_device, selected_devices, max_workers or self.max_workers, job=job)
+
+    def open_connection(self, device_params: Dict) -> Optional[object]:
+        """A netmiko connection, or a handle to one in a session shard; None if it failed"""
+        if self.shards is not None:
+            return self.shards.connect(device_params)
+        return create_connection(device_params)
 
     def get_device_by_hostname(self, hostname: str) -> Optional[Device]:
-        return next((device for device in self.devices if device.hostname == hostname), None) 
+        if self._indexed_count != len(self.devices):
+            self._reindex()
+        return self._by_hostname.get(hostname)
+
+    def _reindex(self):
+        """Hostname lookup table; the first device with a hostname wins"""
+        self._by_hostname = {}
+        for device in self.devices:
+            self._by_hostname.setdefault(device.hostname, device)
+        self._indexed_count = len(self.devices)
 
     def update_device_tree(self):
         """Update the device tree in the main window"""
@@ -0,0 +1,302 @@
+"""
+Distributed runs over a JobBroker
+
+The controller submits one task per device (or the crawl's seed) and
+follows the run; BrokerWorkers claim tasks, connect with their own
+credentials, run the same operations a local run would and store each
+device's result. A crawl task submits the neighbors it finds as new crawl
+tasks, so the frontier spreads over every worker while the broker keeps
+the visited set.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from src.core import operations
+from src.core.broker import BrokerError, CLAIMED, JobBroker, PENDING, SKIPPED, Task
+from src.core.device import Device
+from src.utils import parse_pool
+from src.utils.audit_rules import AuditRule
+from src.utils.network_validator import NetworkValidator
+from src.utils.threader import Job, OperationCancelled
+
+# Kinds of task a worker runs, named after the CLI subcommands
+TASK_KINDS = ('connect', 'command', 'vlans', 'neighbors', 'audit', 'crawl')
+
+logger = logging.getLogger(__name__)
+
+def device_task(device: Device, **payload) -> Dict:
+    """A task for device; credentials stay with the workers"""
+    return {
+        'hostname': device.hostname,
+        'region': device.region,
+        'payload': {
+            'device': {
+                'hostname': device.hostname,
+                'ip': device.ip,
+                'device_type': device.device_type,
+                'port': device.port
+            },
+            **payload
+        }
+    }
+
+def task_device(task: Task) -> Device:
+    return Device(region=task.region, **task.payload['device'])
+
+def rule_payload(rules: List[AuditRule]) -> List[Dict]:
+    """Audit rules as sent to workers, so every worker applies the controller's rules"""
+    return [vars(rule) for rule in rules]
+
+def submit_run(broker: JobBroker, kind: str, devices: List[Device], **payload) -> str:
+    """Create a run with one task per device; returns the run id"""
+    run_id = broker.create_run(kind)
+    broker.submit(run_id, kind, [device_task(device, **payload) for device in devices])
+    return run_id
+
+def follow_run(job: Job, broker: JobBroker, run_id: str, on_task: Callable[[Task], None],
+               poll_interval: float = 0.5):
+    """
+    Call on_task for each task of the run as it finishes, until none are left
+    Cancelling the job cancels the run's pending tasks.
+    """
+    after = 0
+    try:
+        while True:
+            # Read before fetching, so nothing finishing in between is missed
+            done = broker.is_done(run_id)
+            for task in broker.finished(run_id, after):
+                on_task(task)
+                after = task.finished_seq
+            counts = broker.progress(run_id)
+            total = sum(counts.values())
+            if total:
+                job.progress((total - counts.get(PENDING, 0) - counts.get(CLAIMED, 0)) * 100 / total)
+            if done:
+                return
+            time.sleep(poll_interval)
+            job.check()
+    except OperationCancelled:
+        broker.cancel(run_id)
+        raise
+
+class BrokerWorker:
+    """Claims tasks from a broker and runs them on this host's sessions"""
+
+    # Seconds between lease renewals, well inside JobBroker.LEASE
+    HEARTBEAT = 30
+
+    def __init__(self, broker: JobBroker, device_manager, username: str, password: str,
+                 name: Optional[str] = None, region: Optional[str] = None,
+                 validator: Optional[NetworkValidator] = None, heartbeat: float = HEARTBEAT):
+        self.broker = broker
+        self.device_manager = device_manager
+        self.username = username
+        self.password = password
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.region = region
+        self.validator = validator or NetworkValidator()
+        self.heartbeat = heartbeat
+        # Tasks being run, whose leases the heartbeat thread renews
+        self._held: Dict[int, Task] = {}
+        self._held_lock = threading.Lock()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.handlers = {
+            'connect': self._connect,
+            'command': self._command,
+            'vlans': self._vlans,
+            'neighbors': self._neighbors,
+            'audit': self._audit,
+            'crawl': self._crawl,
+        }
+
+    def run(self, job: Job, workers: int = 10, poll_interval: float = 1.0,
+            idle_exit: Optional[float] = None) -> int:
+        """
+        Run tasks, up to workers at a time, until the job is cancelled or
+        nothing has been claimable for idle_exit seconds
+        Returns: number of tasks run
+        """
+        running = set()
+        lock = threading.Lock()
+        completed = [0]
+        idle_since = time.monotonic()
+
+        def run_task(task: Task):
+            try:
+                self.run_task(job, task)
+            finally:
+                with lock:
+                    running.discard(task.id)
+                    completed[0] += 1
+
+        job.status(f"Worker {self.name} waiting for tasks{f' in {self.region}' if self.region else ''}...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while not job.cancelled:
+                with lock:
+                    free = workers - len(running)
+                tasks = []
+                if free:
+                    try:
+                        tasks = self.broker.claim(self.name, free, region=self.region)
+                    except (BrokerError, OSError) as e:
+                        # Keep polling through broker restarts
+                        logger.warning("Cannot claim tasks: %s", e)
+                for task in tasks:
+                    with lock:
+                        running.add(task.id)
+                    executor.submit(run_task, task)
+                with lock:
+                    busy = bool(running)
+                if tasks or busy:
+                    idle_since = time.monotonic()
+                elif idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                    break
+                if not tasks:
+                    time.sleep(poll_interval)
+        self.close()
+        job.check()
+        return completed[0]
+
+    def close(self):
+        """Stop renewing leases"""
+        with self._held_lock:
+            thread, self._heartbeat_thread = self._heartbeat_thread, None
+        if thread is not None:
+            self._stopped.set()
+            thread.join()
+            self._stopped.clear()
+
+    def run_task(self, job: Job, task: Task):
+        """Connect to the task's device, run it and store the result, keeping its lease alive meanwhile"""
+        with self._held_lock:
+            self._held[task.id] = task
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._renew_leases, name='broker-heartbeat',
+                                                          daemon=True)
+                self._heartbeat_thread.start()
+        try:
+            self._run_task(job, task)
+        finally:
+            with self._held_lock:
+                self._held.pop(task.id, None)
+
+    def _renew_leases(self):
+        while not self._stopped.wait(self.heartbeat):
+            with self._held_lock:
+                tasks = list(self._held.values())
+            if not tasks:
+                continue
+            try:
+                lost = self.broker.heartbeat(tasks)
+            except (BrokerError, OSError) as e:
+                logger.warning("Cannot renew leases: %s", e)
+                continue
+            for task in tasks:
+                if task.id in lost:
+                    # Its result will be dropped; another worker has it or it has failed
+                    logger.warning("Lost the lease on %s %s", task.kind, task.hostname)
+
+    def _run_task(self, job: Job, task: Task):
+        device = task_device(task)
+        device.username = self.username
+        device.password = self.password
+        try:
+            job.check()
+            self.device_manager.connect_devices([device], max_workers=1)
+            if not device.connection:
+                job.result(f"{task.kind} {task.hostname}: Connection Failed")
+                self._report(self.broker.fail, task, "Connection Failed")
+                return
+            result = self.handlers[task.kind](job, device, task)
+        except OperationCancelled:
+            self._report(self.broker.release, task)
+            return
+        except Exception as e:
+            job.result(f"{task.kind} {task.hostname}: {e}")
+            self._report(self.broker.fail, task, str(e))
+            return
+        finally:
+            if device.connection:
+                try:
+                    device.connection.disconnect()
+                except Exception:
+                    pass
+                device.connection = None
+        self._report(self.broker.complete, task, result)
+        job.result(f"{task.kind} {task.hostname}: done")
+
+    def _report(self, call: Callable, task: Task, *args):
+        """Store a task's outcome; if that fails the lease runs out and the task is handed out again"""
+        try:
+            call(task, *args)
+        except (BrokerError, OSError) as e:
+            logger.warning("Cannot update %s %s: %s", task.kind, task.hostname, e)
+
+    def _connect(self, job: Job, device: Device, task: Task) -> Dict:
+        return {'output': "Connected"}
+
+    def _command(self, job: Job, device: Device, task: Task) -> Dict:
+        outputs = operations.run_commands(job, device, task.payload['commands'])
+        return {
+            'output': operations.format_outputs(outputs),
+            'failed': any(error for _, _, error in outputs)
+        }
+
+    def _vlans(self, job: Job, device: Device, task: Task) -> Dict:
+        return {'output': operations.discover_vlans(job, device)}
+
+    def _neighbors(self, job: Job, device: Device, task: Task) -> Dict:
+        return {'output': operations.discover_neighbors(job, device)}
+
+    def _audit(self, job: Job, device: Device, task: Task) -> Dict:
+        rules = [AuditRule(**rule) for rule in task.payload['rules']]
+        return {'output': operations.audit_findings(job, device, rules)}
+
+    def _crawl(self, job: Job, device: Device, task: Task) -> Dict:
+        """
+        One step of crawl_topology(): read the device's CDP neighbors and queue
+        the ones not yet seen in this run. Neighbors past the depth limit or
+        outside the allowed networks are recorded as skipped, which still marks
+        them visited.
+        Returns: the edges to neighbors this task was first to find
+        """
+        depth, max_depth = task.payload['depth'], task.payload['max_depth']
+        output = job.send_command(device, "show cdp neighbors detail")
+        with job.timed_parse('cdp_neighbors'):
+            neighbors = parse_pool.parse(operations.parse_cdp_neighbors, output)
+
+        queued, skipped = [], []
+        for neighbor in neighbors:
+            if 'hostname' not in neighbor or 'ip' not in neighbor:
+                continue
+            # Discovered devices are assumed to be at the same site as the one that saw them
+            next_task = device_task(
+                Device(hostname=neighbor['hostname'], ip=neighbor['ip'],
+                       device_type=neighbor.get('device_type', 'cisco_ios'), region=task.region),
+                depth=depth + 1,
+                max_depth=max_depth
+            )
+            is_allowed, reason = self.validator.is_allowed(neighbor['ip'], neighbor['hostname'])
+            if not is_allowed:
+                next_task['error'] = f"Skipping {neighbor['hostname']} ({neighbor['ip']}): {reason}"
+                skipped.append(next_task)
+            elif depth + 1 > max_depth:
+                skipped.append(next_task)
+            else:
+                queued.append(next_task)
+
+        edges = []
+        for tasks, state in ((queued, PENDING), (skipped, SKIPPED)):
+            if tasks:
+                added = self.broker.submit(task.run_id, 'crawl', tasks, state=state)
+                edges.extend([device.hostname, neighbor_task['hostname']]
+                             for neighbor_task, new in zip(tasks, added) if new)
+        return {
+            'output': "\n".join(f"{hostname} -- {neighbor}" for hostname, neighbor in edges),
+            'edges': edges
+        }
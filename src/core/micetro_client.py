@@ -1,41 +1,314 @@
 import requests
-from typing import List
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from ipaddress import IPv4Network
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import codecs
+import hashlib
+import json
 import logging
+import re
+import threading
+from src.utils.ipam_mirror import IpamMirror, MirrorChanges
+
+class TruncatedResponse(requests.exceptions.RequestException):
+    """A ranges page ended before its JSON was complete"""
 
 class MicetroClient:
-    def __init__(self, base_url: str, username: str, password: str):
+    PAGE_SIZE = 1000
+    MAX_WORKERS = 8
+    CHUNK_SIZE = 64 * 1024
+    # Only these fields of a range record are kept
+    RANGE_FIELDS = ('ref', 'name', 'from', 'to', 'netmask', 'lastModified')
+    # Micetro filter expression used for timestamp based syncs
+    MODIFIED_FILTER = 'lastModified>="{}"'
+
+    _ARRAY_START = re.compile(r'"(?:ranges|result)"\s*:\s*\[')
+    _TOTAL_RESULTS = re.compile(r'"totalResults"\s*:\s*(\d+)')
+
+    def __init__(self, base_url: str, username: str, password: str,
+                 page_size: int = PAGE_SIZE, max_workers: int = MAX_WORKERS,
+                 cache_dir: Optional[Path] = None):
         self.base_url = base_url.rstrip('/')
         self.auth = (username, password)
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.logger = logging.getLogger(__name__)
+
         self.session = requests.Session()
         self.session.auth = self.auth
-        self.logger = logging.getLogger(__name__)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
+        })
+        # One pooled connection per page worker so concurrent pages reuse sockets
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # ETag/Last-Modified of the full listing's pages persist across runs; the
+        # records themselves are in the IPAM mirror
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / '.networktools' / 'micetro_cache'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_file = self.cache_dir / f"{hashlib.sha1(self.base_url.encode()).hexdigest()}.json"
+        self._cache_lock = threading.Lock()
+        self._cache = self._load_cache()
 
     def get_networks(self) -> List[IPv4Network]:
         """
         Fetch all networks from Micetro (READ-ONLY operation)
         Returns: List of IPv4Network objects
         """
+        networks = []
+        for record in self.get_ranges():
+            network = self.to_network(record)
+            if network is not None:
+                networks.append(network)
+        return networks
+
+    def get_ranges(self) -> List[Dict]:
+        """
+        Fetch all range records from Micetro, page by page (READ-ONLY operation)
+        Returns: List of range dicts in server order
+        """
+        return [record for page in self._get_pages() for record in page]
+
+    def sync_mirror(self, mirror: IpamMirror, use_timestamps: bool = False) -> MirrorChanges:
+        """
+        Bring a local IPAM mirror up to date (READ-ONLY on the Micetro side)
+
+        By default every page is revalidated (unchanged pages come back as
+        304s and are read back from the mirror) and the full listing is
+        applied to the mirror, which rewrites
+        only the address blocks that changed and deletes ranges no longer
+        listed. With use_timestamps, only ranges modified since the mirror's
+        watermark are requested. That cannot see deletions, so unless the
+        server's total then matches the mirror, or a full listing is due
+        (IpamMirror.FULL_SYNC_INTERVAL), the full listing is applied too.
+        """
+        watermark = mirror.get_watermark()
+        if use_timestamps and watermark and not mirror.full_sync_due():
+            extra = {'filter': self.MODIFIED_FILTER.format(watermark)}
+            records = [r for page in self._get_pages(extra) for r in page]
+            changes = mirror.upsert(records)
+            total = self._get_total()
+            if total is not None and total == mirror.count():
+                return changes
+            self.logger.info(f"Micetro reports {total} ranges, the mirror has {mirror.count()}; "
+                             f"running full sync")
+
+        validators: Dict[str, Dict] = {}
+        pages = self._get_pages(mirror=mirror, validators=validators)
+        changes = mirror.apply_listing(record for page in pages for record in page)
+        # Only now is every page's records in the mirror; pages no longer listed are dropped
+        with self._cache_lock:
+            self._cache['pages'] = validators
+        self._save_cache()
+        return changes
+
+    def to_network(self, record: Dict) -> Optional[IPv4Network]:
+        """Convert a range record to an IPv4Network, None if it is not a valid subnet"""
+        try:
+            return IPv4Network(f"{record['from']}/{record['netmask']}")
+        except (KeyError, ValueError) as e:
+            self.logger.warning(f"Skipping invalid network: {e}")
+            return None
+
+    def _get_pages(self, extra_params: Optional[Dict] = None, mirror: Optional[IpamMirror] = None,
+                   validators: Optional[Dict[str, Dict]] = None) -> List[List[Dict]]:
+        """
+        Fetch every page of the ranges endpoint
+        With a mirror, pages are revalidated against the cached validators and
+        the new validators are collected in validators.
+        Returns: List of records per page in offset order
+        """
         endpoint = f"{self.base_url}/api/v1/ranges"
+        extra_params = extra_params or {}
+        fetch = lambda offset: self._fetch_page(endpoint, offset, extra_params, mirror=mirror,
+                                                validators=validators)
         try:
-            # Explicitly use GET method for read-only operation
-            response = self.session.get(
-                endpoint,
-                timeout=30,
-                verify=True  # Ensure SSL verification
-            )
-            response.raise_for_status()
-            
-            networks = []
-            for network in response.json().get('result', []):
-                try:
-                    net = IPv4Network(f"{network['from']}/{network['netmask']}")
-                    networks.append(net)
-                except ValueError as e:
-                    self.logger.warning(f"Skipping invalid network: {e}")
-            
-            return networks
-            
+            first_page, total = fetch(0)
+            pages = [first_page]
+
+            if total is not None:
+                # Server told us the size, fetch the remaining pages concurrently
+                offsets = list(range(self.page_size, total, self.page_size))
+                pages.extend(self._fetch_pages(fetch, offsets))
+            else:
+                # No total available, fetch in waves until a short page arrives
+                offset = self.page_size
+                while len(pages[-1]) >= self.page_size:
+                    offsets = [offset + i * self.page_size for i in range(self.max_workers)]
+                    for page in self._fetch_pages(fetch, offsets):
+                        pages.append(page)
+                        if len(page) < self.page_size:
+                            break
+                    offset = offsets[-1] + self.page_size
+
+            return pages
+
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error fetching networks from Micetro: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+    def _get_total(self) -> Optional[int]:
+        """Ask the server for the current number of ranges"""
+        _, total = self._fetch_page(f"{self.base_url}/api/v1/ranges", 0, {}, limit=1)
+        return total
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def _fetch_pages(self, fetch: Callable[[int], Tuple[List[Dict], Optional[int]]],
+                     offsets: List[int]) -> List[List[Dict]]:
+        """Fetch several pages concurrently, preserving offset order"""
+        if not offsets:
+            return []
+        workers = min(self.max_workers, len(offsets))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return [page for page, _ in executor.map(fetch, offsets)]
+
+    def _fetch_page(self, endpoint: str, offset: int, extra_params: Dict, limit: Optional[int] = None,
+                    mirror: Optional[IpamMirror] = None, validators: Optional[Dict[str, Dict]] = None):
+        """
+        Fetch a single page
+        Pages of the full listing fetched for a mirror are revalidated: on a
+        304 their records are read back from the mirror by ref. Filtered
+        and probe requests are never cached.
+        Returns: (records, totalResults or None)
+        """
+        params = {'limit': limit or self.page_size, 'offset': offset, **extra_params}
+        page_key = str(offset)
+        revalidate = mirror is not None and validators is not None and not extra_params and limit is None
+        cached = None
+        if revalidate:
+            with self._cache_lock:
+                cached = self._cache['pages'].get(page_key)
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        # Explicitly use GET method for read-only operation
+        with self.session.get(endpoint, params=params, headers=headers, timeout=30,
+                              verify=True, stream=True) as response:
+            not_modified = response.status_code == 304 and cached is not None
+            if not not_modified:
+                response.raise_for_status()
+                records, total = self._parse_stream(response)
+
+        if not_modified:
+            records = mirror.records(cached['refs'])
+            if records is None:
+                # The mirror no longer has the page's ranges; fetch it in full
+                self.logger.debug(f"Page at offset {offset} not modified but not mirrored, refetching")
+                with self._cache_lock:
+                    self._cache['pages'].pop(page_key, None)
+                return self._fetch_page(endpoint, offset, extra_params, limit, mirror, validators)
+            self.logger.debug(f"Page at offset {offset} not modified")
+            entry = cached
+        else:
+            refs = [key[0] for key in map(IpamMirror.record_key, records) if key is not None]
+            entry = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'total': total,
+                'refs': refs
+            }
+        if revalidate:
+            with self._cache_lock:
+                validators[page_key] = entry
+        return records, entry['total']
+
+    def _parse_stream(self, response):
+        """
+        Incrementally parse the ranges array from a streamed response body,
+        so a page is decoded while it is still arriving
+        Returns: (records, totalResults or None)
+        Raises: TruncatedResponse if the body is cut short, so no partial page is cached
+        """
+        records = []
+        tail = []
+        for item in self._iter_array_items(response.iter_content(self.CHUNK_SIZE), tail):
+            records.append({k: item[k] for k in self.RANGE_FIELDS if k in item})
+
+        # The body without the array's items must still be complete JSON
+        rest = ''.join(tail)
+        try:
+            json.loads(rest)
+        except ValueError:
+            raise TruncatedResponse(f"Incomplete ranges page from {response.url}: ...{rest[-80:]!r}")
+        match = self._TOTAL_RESULTS.search(rest)
+        return records, int(match.group(1)) if match else None
+
+    def _iter_array_items(self, chunks, tail: List[str]) -> Iterator[Dict]:
+        """
+        Yield objects of the first "ranges"/"result" array and collect the
+        rest of the body, with the array emptied, in tail
+        Raises: TruncatedResponse if the chunks end inside the array
+        """
+        chunks = iter(chunks)
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder('utf-8')()
+        buffer = ''
+        pos = 0
+        in_array = False
+
+        for chunk in chunks:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+            pos = 0
+
+            if not in_array:
+                match = self._ARRAY_START.search(buffer)
+                if not match:
+                    continue
+                # Anything before the array (e.g. totalResults) is kept for the caller
+                tail.append(buffer[:match.end()])
+                pos = match.end()
+                in_array = True
+
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if buffer[pos] == ']':
+                    tail.append(buffer[pos:])
+                    for rest in chunks:
+                        tail.append(utf8.decode(rest))
+                    return
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Object is split across chunks, wait for more data
+                    break
+                yield item
+
+        if in_array:
+            raise TruncatedResponse(f"Response ended inside the ranges array after {buffer[pos:pos + 80]!r}")
+        tail.append(buffer)
+
+    def _load_cache(self) -> Dict:
+        """Load the on-disk page validators for this Micetro instance"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r') as f:
+                    cache = json.load(f)
+                if cache.get('page_size') == self.page_size:
+                    # Entries from before the mirror held the records are refetched
+                    pages = {key: page for key, page in cache.get('pages', {}).items() if 'refs' in page}
+                    return {'page_size': self.page_size, 'pages': pages}
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable Micetro cache: {e}")
+        return {'page_size': self.page_size, 'pages': {}}
+
+    def _save_cache(self):
+        """Write the page validators to disk (no records or session cookies)"""
+        with self._cache_lock:
+            with open(self.cache_file, 'w') as f:
+                json.dump(self._cache, f)
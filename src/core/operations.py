@@ -0,0 +1,280 @@
+"""
+Device operations shared by the feature tabs and the headless CLI
+
+Everything here runs on a job's worker thread and must not import GUI or
+plotting modules.
+"""
+from datetime import datetime
+from ipaddress import IPv4Network
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import re
+import threading
+from src.core.device import Device
+from src.utils import parse_pool
+from src.utils.audit_rules import AuditRule, rule_matches
+from src.utils.network_validator import NetworkValidator
+from src.utils.output_groups import fingerprint
+from src.utils.output_store import OutputStore
+from src.utils.report_manager import Report, ReportManager
+from src.utils.route_validation import ROUTES_CODEC, load_supernets, parse_routes
+from src.utils.threader import Job, OperationCancelled
+
+logger = logging.getLogger(__name__)
+
+# Hardcoded interregional routers, change in env
+CORE_ROUTERS = [
+    "router1.example.com",
+    "router2.example.com",
+    "router3.example.com",
+    "router4.example.com",
+    "router5.example.com",
+    "router6.example.com"
+]
+
+def discover_vlans(job: Job, device: Device) -> str:
+    return job.send_command(device, "show vlan brief")
+
+def discover_neighbors(job: Job, device: Device) -> str:
+    cdp_output = job.send_command(device, "show cdp neighbors detail")
+    lldp_output = job.send_command(device, "show lldp neighbors detail")
+    return f"CDP:\n{cdp_output}\n\nLLDP:\n{lldp_output}"
+
+def run_commands(job: Job, device: Device, commands: List[str]) -> List[Tuple[str, str, bool]]:
+    """
+    Run commands in order, recording failures instead of stopping
+    Returns: (command, output, error) per command
+    """
+    outputs = []
+    for command in commands:
+        try:
+            outputs.append((command, job.send_command(device, command), False))
+        except Exception as e:
+            outputs.append((command, f"Error: {str(e)}", True))
+    return outputs
+
+def format_outputs(outputs: List[Tuple[str, str, bool]]) -> str:
+    """run_commands() results as one report body"""
+    return "\n".join(f"--- {command} ---\n{output}" for command, output, _ in outputs)
+
+def collect_outputs(job: Job, devices: List[Device], commands: List[str]):
+    """
+    Run commands on every device, spilling each output to disk and indexing
+    and fingerprinting it as it arrives
+    Returns: (OutputStore, OutputIndex, {(hostname, command): fingerprint})
+    """
+    # numpy comes with the index; keep it off the CLI's startup path
+    from src.utils.output_search import OutputIndex
+
+    store, index, fingerprints = OutputStore(), OutputIndex(), {}
+    index_lock = threading.Lock()
+    completed = []
+    total_commands = len(commands) * len(devices)
+
+    def run(device: Device):
+        for command in commands:
+            error = False
+            try:
+                output = job.send_command(device, command)
+            except Exception as e:
+                output, error = f"Error: {str(e)}", True
+            store.put(device.hostname, command, output, error)
+            fingerprints[(device.hostname, command)] = parse_pool.parse(fingerprint, output, device.hostname)
+            with index_lock:
+                index.add((device.hostname, command), output)
+            completed.append(command)
+            job.progress(len(completed) * 100 / total_commands)
+
+    job.map(run, devices, report_progress=False)
+    return store, index, fingerprints
+
+def audit_findings(job: Job, device: Device, rules: List[AuditRule]) -> str:
+    """Run every audit rule on the device; one line per rule that matched"""
+    results = []
+    for rule in rules:
+        # Stops between commands once the audit is cancelled
+        output = job.send_command(device, rule.command)
+        if parse_pool.parse(rule_matches, output, rule.pattern):
+            results.append(
+                f"[{rule.severity}] {rule.name}: {rule.description}"
+            )
+    return "\n".join(results) if results else "No issues found"
+
+def audit_device(job: Job, device: Device, rules: List[AuditRule]) -> Report:
+    """Run every audit rule on the device and save the findings as an audit report"""
+    report = Report(
+        report_type="audit",
+        device_hostname=device.hostname,
+        timestamp=datetime.now(),
+        results=audit_findings(job, device, rules),
+        device_info={
+            'ip': device.ip,
+            'device_type': device.device_type
+        }
+    )
+    ReportManager().save_report(report)
+    return report
+
+def parse_cdp_neighbors(output: str) -> List[Dict[str, str]]:
+    """Parse CDP neighbor details output"""
+    neighbors = []
+    current_neighbor = {}
+
+    # Regular expressions for parsing
+    device_id_pattern = r"Device ID: (.+)"
+    ip_pattern = r"IP address: (.+)"
+    platform_pattern = r"Platform: (.+?),"
+
+    for line in output.split('\n'):
+        if "Device ID:" in line:
+            if current_neighbor:
+                neighbors.append(current_neighbor)
+            current_neighbor = {}
+            match = re.search(device_id_pattern, line)
+            if match:
+                current_neighbor['hostname'] = match.group(1)
+        elif "IP address:" in line:
+            match = re.search(ip_pattern, line)
+            if match:
+                current_neighbor['ip'] = match.group(1)
+        elif "Platform:" in line:
+            match = re.search(platform_pattern, line)
+            if match:
+                platform = match.group(1).lower()
+                if 'nexus' in platform:
+                    current_neighbor['device_type'] = 'cisco_nxos'
+                elif 'ios-xr' in platform:
+                    current_neighbor['device_type'] = 'cisco_xr'
+                else:
+                    current_neighbor['device_type'] = 'cisco_ios'
+
+    if current_neighbor:
+        neighbors.append(current_neighbor)
+
+    return neighbors
+
+def crawl_topology(job: Job, device_manager, root_device: Device, max_depth: int,
+                   validator: Optional[NetworkValidator] = None,
+                   failures: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """
+    Follow CDP neighbors from root_device, connecting with its credentials
+    New devices are added to the device manager; protected ones are listed
+    but not logged into. Devices that could not be connected to or read are
+    appended to failures as "hostname: reason".
+    Returns: topology edges as (hostname, neighbor hostname)
+    """
+    validator = validator or NetworkValidator()
+    credentials = {
+        'username': root_device.username,
+        'password': root_device.password
+    }
+    edges: List[Tuple[str, str]] = []
+    visited: Set[str] = {root_device.hostname}
+    _discover_neighbors(job, device_manager, validator, root_device, 1, max_depth,
+                        visited, credentials, edges, failures if failures is not None else [])
+    return edges
+
+def _discover_neighbors(job: Job, device_manager, validator: NetworkValidator, device: Device,
+                        depth: int, max_depth: int, visited: Set[str],
+                        credentials: Dict[str, str], edges: List[Tuple[str, str]],
+                        failures: List[str]):
+    """Recursively discover network neighbors"""
+    if depth > max_depth or not device.connection:
+        return
+
+    try:
+        # Get CDP neighbors
+        output = job.send_command(device, "show cdp neighbors detail")
+        with job.timed_parse('cdp_neighbors'):
+            neighbors = parse_pool.parse(parse_cdp_neighbors, output)
+
+        for neighbor in neighbors:
+            if neighbor['hostname'] not in visited:
+                visited.add(neighbor['hostname'])
+
+                # Check if device is allowed
+                is_allowed, reason = validator.is_allowed(
+                    neighbor['ip'],
+                    neighbor['hostname']
+                )
+
+                # Add to topology regardless of protection status
+                edges.append((device.hostname, neighbor['hostname']))
+
+                if not is_allowed:
+                    job.result(
+                        f"Skipping {neighbor['hostname']} ({neighbor['ip']}): {reason}"
+                    )
+                    continue
+
+                try:
+                    # Create and connect to new device
+                    new_device = Device(
+                        hostname=neighbor['hostname'],
+                        ip=neighbor['ip'],
+                        device_type=neighbor.get('device_type', 'cisco_ios'),
+                        username=credentials['username'],
+                        password=credentials['password']
+                    )
+
+                    # Add to device manager if not exists
+                    if not device_manager.get_device_by_hostname(new_device.hostname):
+                        device_manager.add_device(new_device)
+
+                    # Connect to device
+                    device_params = {
+                        'device_type': new_device.device_type,
+                        'hostname': new_device.hostname,
+                        'ip': new_device.ip,
+                        'username': new_device.username,
+                        'password': new_device.password,
+                    }
+                    job.check()
+                    job.status(f"Connecting to {new_device.hostname} (depth {depth + 1})...")
+                    new_device.connection = device_manager.open_connection(device_params)
+
+                    if new_device.connection:
+                        # Recursive discovery
+                        _discover_neighbors(job, device_manager, validator, new_device, depth + 1,
+                                            max_depth, visited, credentials, edges, failures)
+                    else:
+                        failures.append(f"{new_device.hostname}: Connection Failed")
+                        job.result(f"Failed to connect to {new_device.hostname}")
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    failures.append(f"{new_device.hostname}: {e}")
+                    job.result(f"Failed to connect to {new_device.hostname}: {str(e)}")
+
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        failures.append(f"{device.hostname}: {e}")
+        job.result(f"Error discovering neighbors for {device.hostname}: {str(e)}")
+
+def collect_core_routes(job: Job, device_manager,
+                        routers: List[str] = CORE_ROUTERS) -> Dict[str, List[IPv4Network]]:
+    """Get routes from every connected core router"""
+    routes = {}
+    for router in routers:
+        device = device_manager.get_device_by_hostname(router)
+        if device and device.connection:
+            routes[router] = get_device_routes(job, device)
+    return routes
+
+def get_device_routes(job: Job, device: Device) -> List[IPv4Network]:
+    """
+    Extract routes from a single device using READ-ONLY commands
+    Returns: List of IPv4Network objects
+    """
+    try:
+        # Ensure we're only using show commands
+        output = job.send_command(device, "show ip route")
+        # TextFSM runs in the parse pool rather than in send_command on this I/O thread
+        with job.timed_parse('routes'):
+            routes = parse_pool.parse(parse_routes, output, device.connection.device_type,
+                                      codec=ROUTES_CODEC)
+        return [route.network for route in routes]
+    except Exception as e:
+        logger.error(f"Error getting routes from {device.hostname}: {e}")
+        return []
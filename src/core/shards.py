@@ -0,0 +1,239 @@
+"""
+Session shards: SSH sessions owned by worker processes
+
+With a few hundred sessions, paramiko's encryption and netmiko's read loops
+are CPU bound and one interpreter's GIL serializes them. A ShardPool
+spreads sessions over worker processes; the devices in this process hold
+RemoteConnection handles whose calls are sent to the owning worker over a
+pipe, so feature code keeps calling device.connection.send_command() as
+before while the SSH work runs on every core.
+
+Requests are (request id, operation, session id, args, kwargs) tuples and
+replies (request id, ok, result or exception). Each worker serves its
+requests on a thread pool; a reader thread per worker here completes the
+futures callers wait on.
+"""
+import atexit
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from src.utils.metrics import metrics
+
+# Number of session worker processes, 0 to keep sessions in this process
+SHARDS_ENV = 'NETWORKTOOLS_SESSION_SHARDS'
+
+# Connection methods a RemoteConnection forwards; everything the features use is read-only
+REMOTE_METHODS = ('enable', 'send_command', 'find_prompt')
+
+logger = logging.getLogger(__name__)
+
+def shard_count() -> int:
+    """$NETWORKTOOLS_SESSION_SHARDS, else 0"""
+    return max(0, int(os.environ.get(SHARDS_ENV) or 0))
+
+class ShardError(ConnectionError):
+    """The worker owning a session stopped or could not return a result"""
+
+class RemoteConnection:
+    """Stands in for a netmiko connection held by a session worker"""
+
+    def __init__(self, shard: '_Shard', session: int, device_type: str):
+        self._shard = shard
+        self._session = session
+        self.device_type = device_type
+
+    def enable(self, *args, **kwargs):
+        return self._shard.request('enable', self._session, args, kwargs)
+
+    def send_command(self, command: str, **kwargs):
+        return self._shard.request('send_command', self._session, (command,), kwargs)
+
+    def find_prompt(self, *args, **kwargs):
+        return self._shard.request('find_prompt', self._session, args, kwargs)
+
+    def disconnect(self):
+        try:
+            self._shard.request('disconnect', self._session, (), {})
+        finally:
+            self._shard.release()
+
+class ShardPool:
+    """
+    Worker processes for SSH sessions, started on the first connect
+    New sessions go to the worker holding the fewest.
+    """
+
+    def __init__(self, shards: int, threads: int = 64):
+        self.size = shards
+        # Concurrent requests each worker serves
+        self.threads = threads
+        self._shards: List[_Shard] = []
+        self._sessions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def connect(self, device_params: Dict) -> Optional[RemoteConnection]:
+        """open_connection() in the least loaded worker; None if it failed"""
+        shard = self._pick()
+        session = next(self._sessions)
+        hostname = device_params.get('hostname', device_params.get('ip'))
+        try:
+            # Timed here; the worker's own registry is not exported
+            with metrics.timed('connect_seconds', device=hostname):
+                shard.request('connect', session, (device_params,), {})
+        except Exception as e:
+            shard.release()
+            logger.warning("Connection to %s failed: %s", hostname, e)
+            return None
+        return RemoteConnection(shard, session, device_params['device_type'])
+
+    def sessions(self) -> List[int]:
+        """Open sessions per worker"""
+        return [shard.sessions for shard in self._shards]
+
+    def close(self):
+        """Disconnect every session and stop the workers"""
+        with self._lock:
+            shards, self._shards = self._shards, []
+            if shards:
+                atexit.unregister(self.close)
+        for shard in shards:
+            shard.stop()
+
+    def _pick(self) -> '_Shard':
+        with self._lock:
+            if not self._shards:
+                context = multiprocessing.get_context('spawn')
+                self._shards = [_Shard(context, index, self.threads) for index in range(self.size)]
+                atexit.register(self.close)
+            shard = min(self._shards, key=lambda candidate: candidate.sessions)
+            shard.sessions += 1
+            return shard
+
+class _Shard:
+    """One worker process and the pipe to it"""
+
+    def __init__(self, context, index: int, threads: int):
+        self.index = index
+        self.sessions = 0
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=serve, args=(child, threads),
+                                        name=f'session-shard-{index}', daemon=True)
+        self._process.start()
+        child.close()
+        self._pending: Dict[int, Future] = {}
+        self._requests = itertools.count(1)
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._stopped = False
+        self._reader = threading.Thread(target=self._read, name=f'session-shard-{index}-reader', daemon=True)
+        self._reader.start()
+
+    def request(self, operation: str, session: int, args: tuple, kwargs: Dict):
+        """Send one request and wait for its reply, re-raising the worker's exception"""
+        future: Future = Future()
+        with self._lock:
+            if self._stopped:
+                raise ShardError(f"Session worker {self.index} is not running")
+            request_id = next(self._requests)
+            self._pending[request_id] = future
+        try:
+            with self._send_lock:
+                self._conn.send((request_id, operation, session, args, kwargs))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise ShardError(f"Session worker {self.index} is not running: {e}")
+        return future.result()
+
+    def release(self):
+        with self._lock:
+            self.sessions -= 1
+
+    def stop(self):
+        try:
+            with self._send_lock:
+                self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, value = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        # The worker is gone; nothing waiting on it will get a reply
+        with self._lock:
+            self._stopped = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ShardError(f"Session worker {self.index} stopped"))
+
+def serve(conn, threads: int):
+    """Worker process: run requests against this process's sessions until told to stop"""
+    # Imported here so only the workers pay for netmiko
+    from src.core.connector import open_connection
+
+    sessions: Dict[int, object] = {}
+    send_lock = threading.Lock()
+
+    def reply(request_id: int, ok: bool, value):
+        with send_lock:
+            try:
+                conn.send((request_id, ok, value))
+            except (OSError, ValueError):
+                pass
+            except Exception as e:
+                # The result or exception could not be pickled
+                conn.send((request_id, False, ShardError(f"{type(value).__name__}: {value} ({e})")))
+
+    def handle(request_id: int, operation: str, session: int, args: tuple, kwargs: Dict):
+        try:
+            if operation == 'connect':
+                # Failures are raised to the parent, which logs them
+                sessions[session] = open_connection(*args)
+                result = None
+            elif operation == 'disconnect':
+                connection = sessions.pop(session, None)
+                result = connection.disconnect() if connection is not None else None
+            elif operation in REMOTE_METHODS:
+                result = getattr(sessions[session], operation)(*args, **kwargs)
+            else:
+                raise ValueError(f"Unsupported operation: {operation}")
+        except Exception as e:
+            reply(request_id, False, e)
+            return
+        reply(request_id, True, result)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            executor.submit(handle, *message)
+
+    for connection in list(sessions.values()):
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+    conn.close()
@@ -1,11 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
-import re
 from src.gui.widgets import FeatureTab
-from src.utils.threader import run_threaded_operation
+from src.core.operations import audit_device
 from src.utils.audit_rules import AuditRuleManager, AuditRule
-from src.utils.report_manager import Report, ReportManager
-from datetime import datetime
 
 class AuditRuleDialog(tk.Toplevel):
     def __init__(self, parent, rule: AuditRule = None):
@@ -150,42 +147,22 @@ class AuditorTab(FeatureTab):
 
     def run_operation(self):
         super().run_operation()
-        connected_devices = [d for d in self.device_manager.devices if d.connection]
+        connected_devices = self.connected_devices()
         rules = self.rule_manager.get_all_rules()
         
-        def audit_device(device):
+        def audit(job, device):
             try:
-                results = []
-                connection = device.connection
-                
-                for rule in rules:
-                    output = connection.send_command(rule.command)
-                    if re.search(rule.pattern, output):
-                        results.append(
-                            f"[{rule.severity}] {rule.name}: {rule.description}"
-                        )
-                
-                # Create report
-                report = Report(
-                    report_type="audit",
-                    device_hostname=device.hostname,
-                    timestamp=datetime.now(),
-                    results="\n".join(results) if results else "No issues found",
-                    device_info={
-                        'ip': device.ip,
-                        'device_type': device.device_type
-                    }
-                )
-                
-                # Save report
-                ReportManager().save_report(report)
-                
-                return (device.hostname, report.results)
+                return (device.hostname, audit_device(job, device, rules).results)
             except Exception as e:
                 return (device.hostname, f"Error: {str(e)}")
 
-        results = run_threaded_operation(audit_device, connected_devices)
-        
-        self.results_text.delete('1.0', tk.END)
-        for hostname, output in results:
-            self.add_result(f"\n=== {hostname} ===\n{output}\n")
+        def show_results(results):
+            self.clear_output()
+            for hostname, output in results:
+                self.add_result(f"\n=== {hostname} ===\n{output}\n")
+            self.update_status(f"Audit complete on {len(results)} devices")
+
+        self.run_job(
+            lambda job: job.map(lambda device: audit(job, device), connected_devices),
+            show_results
+        )
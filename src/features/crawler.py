@@ -1,14 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from src.gui.widgets import FeatureTab
-from src.utils.threader import run_threaded_operation
-from src.core.device import Device
-from src.core.connector import create_connection
-import re
-from typing import Dict, Set, Optional
+from src.core.operations import crawl_topology
 from src.utils.network_validator import NetworkValidator
 import yaml
 
@@ -16,7 +9,8 @@ class CrawlerTab(FeatureTab):
     def __init__(self, parent, device_manager):
         super().__init__(parent, device_manager)
         self._create_crawler_widgets()
-        self.network_graph = nx.Graph()
+        # networkx and matplotlib are imported on first discovery, not with the tab
+        self.network_graph = None
         self.network_validator = NetworkValidator()
         self.device_colors = {
             'cisco_ios': '#FF9999',    # Light Red
@@ -55,115 +49,20 @@ class CrawlerTab(FeatureTab):
         )
         self.config_button.pack(side=tk.LEFT, padx=5)
 
-    def _parse_cdp_output(self, output: str) -> list:
-        """Parse CDP neighbor details output"""
-        neighbors = []
-        current_neighbor = {}
-        
-        # Regular expressions for parsing
-        device_id_pattern = r"Device ID: (.+)"
-        ip_pattern = r"IP address: (.+)"
-        platform_pattern = r"Platform: (.+?),"
-        
-        for line in output.split('\n'):
-            if "Device ID:" in line:
-                if current_neighbor:
-                    neighbors.append(current_neighbor)
-                current_neighbor = {}
-                match = re.search(device_id_pattern, line)
-                if match:
-                    current_neighbor['hostname'] = match.group(1)
-            elif "IP address:" in line:
-                match = re.search(ip_pattern, line)
-                if match:
-                    current_neighbor['ip'] = match.group(1)
-            elif "Platform:" in line:
-                match = re.search(platform_pattern, line)
-                if match:
-                    platform = match.group(1).lower()
-                    if 'nexus' in platform:
-                        current_neighbor['device_type'] = 'cisco_nxos'
-                    elif 'ios-xr' in platform:
-                        current_neighbor['device_type'] = 'cisco_xr'
-                    else:
-                        current_neighbor['device_type'] = 'cisco_ios'
-        
-        if current_neighbor:
-            neighbors.append(current_neighbor)
-        
-        return neighbors
-
-    def _discover_neighbors(self, device: Device, depth: int, max_depth: int, 
-                          visited: Set[str], credentials: Dict[str, str]):
-        """Recursively discover network neighbors"""
-        if depth > max_depth or not device.connection:
-            return
-
-        try:
-            # Get CDP neighbors
-            output = device.connection.send_command("show cdp neighbors detail")
-            neighbors = self._parse_cdp_output(output)
-            
-            for neighbor in neighbors:
-                if neighbor['hostname'] not in visited:
-                    visited.add(neighbor['hostname'])
-                    
-                    # Check if device is allowed
-                    is_allowed, reason = self.network_validator.is_allowed(
-                        neighbor['ip'], 
-                        neighbor['hostname']
-                    )
-                    
-                    # Add to graph regardless of protection status
-                    self.network_graph.add_edge(device.hostname, neighbor['hostname'])
-                    
-                    if not is_allowed:
-                        self.add_result(
-                            f"Skipping {neighbor['hostname']} ({neighbor['ip']}): {reason}"
-                        )
-                        continue
-                    
-                    try:
-                        # Create and connect to new device
-                        new_device = Device(
-                            hostname=neighbor['hostname'],
-                            ip=neighbor['ip'],
-                            device_type=neighbor.get('device_type', 'cisco_ios'),
-                            username=credentials['username'],
-                            password=credentials['password']
-                        )
-                        
-                        # Add to device manager if not exists
-                        if not self.device_manager.get_device_by_hostname(new_device.hostname):
-                            self.device_manager.devices.append(new_device)
-                            
-                        # Connect to device
-                        device_params = {
-                            'device_type': new_device.device_type,
-                            'ip': new_device.ip,
-                            'username': new_device.username,
-                            'password': new_device.password,
-                        }
-                        new_device.connection = create_connection(device_params)
-                        
-                        if new_device.connection:
-                            # Recursive discovery
-                            self._discover_neighbors(new_device, depth + 1, max_depth, 
-                                                  visited, credentials)
-                    except Exception as e:
-                        self.add_result(f"Failed to connect to {new_device.hostname}: {str(e)}")
-        
-        except Exception as e:
-            self.add_result(f"Error discovering neighbors for {device.hostname}: {str(e)}")
-
     def _draw_network_graph(self):
         """Draw the network topology graph"""
+        import networkx as nx
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from matplotlib.lines import Line2D
+
         # Clear previous graph
         for widget in self.network_frame.winfo_children():
             widget.destroy()
 
-        # Create figure and canvas
-        fig, ax = plt.subplots(figsize=(8, 6))
+        # Create figure and canvas (a plain Figure, so pyplot does not keep every drawing alive)
+        fig = Figure(figsize=(8, 6))
+        ax = fig.add_subplot()
         canvas = FigureCanvasTkAgg(fig, master=self.network_frame)
         
         # Update node colors to show protected devices
@@ -193,7 +92,7 @@ class CrawlerTab(FeatureTab):
         
         # Create legend
         legend_elements = [
-            plt.Line2D([0], [0], marker='o', color='w', 
+            Line2D([0], [0], marker='o', color='w', 
                       markerfacecolor=color, label=device_type, markersize=10)
             for device_type, color in self.device_colors.items()
         ]
@@ -212,31 +111,34 @@ class CrawlerTab(FeatureTab):
             self.update_status("No connected devices found")
             return
 
-        # Clear previous graph
-        self.network_graph.clear()
-        self.network_graph.add_node(root_device.hostname)
+        import networkx as nx
 
-        # Get credentials from root device
-        credentials = {
-            'username': root_device.username,
-            'password': root_device.password
-        }
+        # Start a new graph
+        self.network_graph = nx.Graph()
+        self.network_graph.add_node(root_device.hostname)
 
         # Start discovery
         max_depth = int(self.max_depth.get())
-        visited = set()
         
         self.update_status("Discovering network topology...")
-        self._discover_neighbors(root_device, 1, max_depth, visited, credentials)
-        
-        # Draw the network graph
-        self.update_status("Drawing network topology...")
-        self._draw_network_graph()
-        
-        # Update device tree in main window
-        self.device_manager.update_device_tree()
-        
-        self.update_status("Network discovery complete")
+
+        def draw_results(edges):
+            self.network_graph.add_edges_from(edges)
+
+            # Draw the network graph
+            self.update_status("Drawing network topology...")
+            self._draw_network_graph()
+            
+            # Update device tree in main window
+            self.device_manager.update_device_tree()
+            
+            self.update_status("Network discovery complete")
+
+        self.run_job(
+            lambda job: crawl_topology(job, self.device_manager, root_device, max_depth,
+                                       self.network_validator),
+            draw_results
+        )
 
     def _show_rules_dialog(self):
         """Show dialog for configuring network boundaries"""
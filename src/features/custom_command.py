@@ -1,11 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
-from typing import Dict, List, Optional
-import difflib
+from typing import Dict, List, Optional, Tuple
 import json
-import csv
 from datetime import datetime
-from src.gui.widgets import FeatureTab
+from src.gui.widgets import FeatureTab, VirtualTable
+from src.core.operations import collect_outputs
+from src.utils.output_groups import diff_against, group_by_fingerprint
+from src.utils.output_search import OutputIndex
+from src.utils.output_store import OutputStore
 from src.core.device import Device
 
 class CommandHistory:
@@ -54,9 +56,22 @@ class CommandHistory:
         self._save_history()
 
 class CustomCommandTab(FeatureTab):
+    # Wait this long after the last keystroke before searching
+    SEARCH_DELAY_MS = 200
+
     def __init__(self, parent, device_manager):
         super().__init__(parent, device_manager)
-        self.device_outputs: Dict[str, Dict[str, str]] = {}
+        # Outputs of the last run live on disk; only metadata is kept in memory
+        self.output_store = OutputStore()
+        # Store being exported to CSV; replacing it leaves the closing to the export
+        self._exporting: Optional[OutputStore] = None
+        # Search index over the outputs and the last query's (hostname, command) -> matches
+        self.output_index = OutputIndex()
+        self.match_counts: Dict[Tuple[str, str], int] = {}
+        # (hostname, command) -> fingerprint of the normalized output
+        self.fingerprints: Dict[Tuple[str, str], str] = {}
+        self._search_pending = None
+        self._highlight_pending = None
         self.command_history = CommandHistory()
         self.template_commands = self._load_template_commands()
         self._create_custom_widgets()
@@ -99,30 +114,73 @@ class CustomCommandTab(FeatureTab):
         
         ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=(0, 5))
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', self._handle_search)
+        self.search_var.trace_add('write', self._handle_search)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Return>', lambda e: self._jump_to_match(True))
+        ttk.Button(search_frame, text="Previous",
+                  command=lambda: self._jump_to_match(False)).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(search_frame, text="Next",
+                  command=lambda: self._jump_to_match(True)).pack(side=tk.LEFT, padx=5)
         
         # View options
         view_frame = ttk.LabelFrame(self, text="View Options", padding="5")
         view_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
         self.view_var = tk.StringVar(value="tabbed")
-        ttk.Radiobutton(view_frame, text="Tabbed View", 
+        ttk.Radiobutton(view_frame, text="Device View", 
                        variable=self.view_var, value="tabbed",
                        command=self._switch_view).pack(side=tk.LEFT, padx=5)
-        ttk.Radiobutton(view_frame, text="Diff View", 
+        ttk.Radiobutton(view_frame, text="Compare Devices", 
                        variable=self.view_var, value="diff",
                        command=self._switch_view).pack(side=tk.LEFT, padx=5)
+        ttk.Label(view_frame, text="Command:").pack(side=tk.LEFT, padx=(10, 5))
+        self.compare_picker = ttk.Combobox(view_frame, state="readonly", width=40)
+        self.compare_picker.pack(side=tk.LEFT)
+        self.compare_picker.bind('<<ComboboxSelected>>', lambda e: self._update_results_view())
         
-        # Results area with notebook for tabs
+        # Results area: device list and a single output viewer. Outputs are
+        # only put into the viewer when a device/command is selected.
         self.results_frame = ttk.LabelFrame(self, text="Results", padding="5")
         self.results_frame.grid(row=4, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        self.notebook = ttk.Notebook(self.results_frame)
-        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.output_pane = ttk.PanedWindow(self.results_frame, orient=tk.HORIZONTAL)
+        self.output_pane.pack(fill=tk.BOTH, expand=True)
+
+        self.device_list = VirtualTable(self.output_pane,
+                                        columns={"Device": 160, "Status": 80, "Matches": 70})
+        self.device_list.bind('<<TableSelect>>', self._on_device_selected)
+        self.output_pane.add(self.device_list, weight=1)
+
+        viewer_frame = ttk.Frame(self.output_pane)
+        self.output_pane.add(viewer_frame, weight=3)
+
+        picker_frame = ttk.Frame(viewer_frame)
+        picker_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(picker_frame, text="Command:").pack(side=tk.LEFT, padx=(0, 5))
+        self.command_picker = ttk.Combobox(picker_frame, state="readonly", width=50)
+        self.command_picker.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.command_picker.bind('<<ComboboxSelected>>', lambda e: self._show_selected_output())
+
+        self.output_text = tk.Text(viewer_frame, wrap=tk.NONE)
+        v_scroll = ttk.Scrollbar(viewer_frame, orient=tk.VERTICAL, command=self.output_text.yview)
+        h_scroll = ttk.Scrollbar(viewer_frame, orient=tk.HORIZONTAL, command=self.output_text.xview)
+        def on_scroll(first, last):
+            # Matches are only highlighted in the visible lines, so refresh on scroll
+            v_scroll.set(first, last)
+            self._schedule_highlight()
+        self.output_text.configure(yscrollcommand=on_scroll, xscrollcommand=h_scroll.set)
+        self.output_text.tag_config('search', background='yellow')
+        self.output_text.tag_config('current_match', background='orange')
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        self.output_text.pack(fill=tk.BOTH, expand=True)
+        self.selected_device: Optional[str] = None
         
-        self.diff_text = tk.Text(self.results_frame)
+        self.diff_text = tk.Text(self.results_frame, wrap=tk.NONE)
+        self.diff_text.tag_config('added', foreground='dark green')
+        self.diff_text.tag_config('removed', foreground='red')
+        self.diff_text.tag_config('group', font=('TkDefaultFont', 10, 'bold'))
         
         # Configure grid weights
         self.grid_rowconfigure(4, weight=1)
@@ -171,45 +229,34 @@ class CustomCommandTab(FeatureTab):
             self.update_status("Please enter command(s)")
             return
             
-        connected_devices = [
-            device for device in self.device_manager.devices 
-            if device.connection is not None
-        ]
+        connected_devices = self.connected_devices()
         
         if not connected_devices:
             self.update_status("No connected devices found")
             return
         
-        self.device_outputs.clear()
-        total_commands = len(commands)
-        self.update_status(f"Running {total_commands} command(s) on {len(connected_devices)} devices...")
+        commands = [command for command in commands if command.strip()]
+        self.update_status(f"Running {len(commands)} command(s) on {len(connected_devices)} devices...")
         self.update_progress(0)
         
-        for device in connected_devices:
-            self.device_outputs[device.hostname] = {}
-            for i, command in enumerate(commands, 1):
-                if not command.strip():
-                    continue
-                try:
-                    output = device.connection.send_command(command)
-                    self.device_outputs[device.hostname][command] = output
-                    progress = (i / (total_commands * len(connected_devices))) * 100
-                    self.update_progress(progress)
-                except Exception as e:
-                    self.device_outputs[device.hostname][command] = f"Error: {str(e)}"
-        
-        # Add command to history
-        for command in commands:
-            if command.strip():
+        def show_results(outcome):
+            self._discard_store()
+            self.output_store, self.output_index, self.fingerprints = outcome
+            self.match_counts = self.output_index.search(self.search_var.get())
+            
+            # Add command to history
+            for command in commands:
                 self.command_history.add(command)
-        self._update_history_dropdown()
-        
-        self.update_status("Command execution completed")
-        self._update_results_view()
+            self._update_history_dropdown()
+            
+            self.update_status("Command execution completed")
+            self._update_results_view()
+
+        self.run_job(lambda job: collect_outputs(job, connected_devices, commands), show_results)
 
     def _save_output(self):
         """Save outputs to CSV file"""
-        if not self.device_outputs:
+        if not len(self.output_store):
             self.update_status("No output to save")
             return
             
@@ -220,25 +267,117 @@ class CustomCommandTab(FeatureTab):
         )
         
         if filename:
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Hostname', 'Command', 'Output'])
-                
-                for hostname, commands in self.device_outputs.items():
-                    for command, output in commands.items():
-                        writer.writerow([hostname, command, output])
-            
-            self.update_status(f"Output saved to {filename}")
+            # Streamed from the on-disk store, one output at a time
+            store = self.output_store
+
+            def export(job):
+                try:
+                    store.export_csv(filename)
+                finally:
+                    job.call(self._export_finished, store)
+
+            self.update_status(f"Saving output to {filename}...")
+            if self.run_job(export, lambda _: self.update_status(f"Output saved to {filename}")):
+                self._exporting = store
+
+    def _export_finished(self, store: OutputStore):
+        """Close the exported store if it was cleared or replaced meanwhile"""
+        self._exporting = None
+        if store is not self.output_store:
+            store.close()
+
+    def _discard_store(self):
+        """Close the current store, unless an export still reads it and will close it"""
+        if self.output_store is not self._exporting:
+            self.output_store.close()
 
     def _handle_search(self, *args):
-        """Handle search in output"""
+        """Run the search once typing pauses"""
+        if self._search_pending is not None:
+            self.after_cancel(self._search_pending)
+        self._search_pending = self.after(self.SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        """Count matches per device from the index and highlight the visible output"""
+        self._search_pending = None
         search_text = self.search_var.get()
-        if self.view_var.get() == "tabbed":
-            for tab in self.notebook.tabs():
-                text_widget = self.notebook.select_slave(tab).winfo_children()[0]
-                self._highlight_search(text_widget, search_text)
-        else:
+        if self.view_var.get() != "tabbed":
             self._highlight_search(self.diff_text, search_text)
+            return
+
+        self.match_counts = self.output_index.search(search_text)
+        self._update_device_rows()
+        self._highlight_visible()
+        if search_text:
+            devices = {hostname for hostname, _ in self.match_counts}
+            self.update_status(
+                f"'{search_text}': {sum(self.match_counts.values())} matches on {len(devices)} devices")
+
+    def _jump_to_match(self, forward: bool):
+        """Move to the next/previous match, continuing into the next output with matches"""
+        search_text = self.search_var.get()
+        if not search_text or self.view_var.get() != "tabbed":
+            return
+        text = self.output_text
+        if forward:
+            position = text.search(search_text, 'insert + 1c', tk.END, nocase=True)
+        else:
+            position = text.search(search_text, 'insert', '1.0', nocase=True, backwards=True)
+
+        if not position:
+            store = self.output_store
+            documents = [(hostname, command) for hostname in store.hostnames()
+                         for command in store.commands(hostname)]
+            current = (self.selected_device, self.command_picker.get())
+            start = documents.index(current) if current in documents else -1
+            step = 1 if forward else -1
+            # Wrap around, ending back on the current output
+            for offset in range(1, len(documents) + 1):
+                hostname, command = documents[(start + step * offset) % len(documents)]
+                if self.match_counts.get((hostname, command)):
+                    break
+            else:
+                self.update_status(f"No matches for '{search_text}'")
+                return
+            self.selected_device = hostname
+            self.command_picker.set(command)
+            self.device_list.select([hostname])
+            self.device_list.see(hostname)
+            self._show_selected_output()
+            if forward:
+                position = text.search(search_text, '1.0', tk.END, nocase=True)
+            else:
+                position = text.search(search_text, tk.END, '1.0', nocase=True, backwards=True)
+            if not position:
+                return
+
+        text.mark_set('insert', position)
+        text.tag_remove('current_match', '1.0', tk.END)
+        text.tag_add('current_match', position, f"{position}+{len(search_text)}c")
+        text.see(position)
+
+    def _schedule_highlight(self):
+        if self._highlight_pending is None:
+            self._highlight_pending = self.after_idle(self._highlight_visible)
+
+    def _highlight_visible(self):
+        """Highlight matches in the lines currently on screen only"""
+        self._highlight_pending = None
+        text = self.output_text
+        search_text = self.search_var.get()
+        text.tag_remove('search', '1.0', tk.END)
+        if not search_text:
+            text.tag_remove('current_match', '1.0', tk.END)
+            return
+        start = text.index('@0,0 linestart')
+        stop = text.index(f'@0,{text.winfo_height()} lineend')
+        while True:
+            start = text.search(search_text, start, stop, nocase=True)
+            if not start:
+                break
+            end = f"{start}+{len(search_text)}c"
+            text.tag_add('search', start, end)
+            start = end
 
     def _highlight_search(self, text_widget, search_text):
         """Highlight search text in widget"""
@@ -312,52 +451,96 @@ class CustomCommandTab(FeatureTab):
             self._show_diff_view()
 
     def _show_tabbed_view(self):
-        """Display results in tabbed view"""
-        self.notebook.pack(fill=tk.BOTH, expand=True)
+        """Display results as a device list plus one output viewer"""
         self.diff_text.pack_forget()
+        self.output_pane.pack(fill=tk.BOTH, expand=True)
         
-        # Clear existing tabs
-        for tab in self.notebook.tabs():
-            self.notebook.forget(tab)
-        
-        # Create new tabs for each device
-        for hostname, commands in self.device_outputs.items():
-            frame = ttk.Frame(self.notebook)
-            for command, output in commands.items():
-                text = tk.Text(frame, wrap=tk.NONE)
-                text.insert(tk.END, output)
-                text.pack(fill=tk.BOTH, expand=True)
-                
-                # Add scrollbars
-                v_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=text.yview)
-                h_scroll = ttk.Scrollbar(frame, orient=tk.HORIZONTAL, command=text.xview)
-                text.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-                
-                v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-                h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
-                
-                self.notebook.add(frame, text=f"{hostname} - {command}")
+        self._update_device_rows()
+        hostnames = self.output_store.hostnames()
+        if self.selected_device not in hostnames:
+            self.selected_device = hostnames[0] if hostnames else None
+        if self.selected_device is not None:
+            self.device_list.select([self.selected_device])
+        self._show_selected_output()
+
+    def _update_device_rows(self):
+        """Device list rows: hostname, error status and matches for the current search"""
+        matches: Dict[str, int] = {}
+        for (hostname, _), count in self.match_counts.items():
+            matches[hostname] = matches.get(hostname, 0) + count
+        store = self.output_store
+        self.device_list.set_rows(
+            (hostname, (hostname, "Error" if store.has_errors(hostname) else "OK", matches.get(hostname, 0)))
+            for hostname in store.hostnames()
+        )
+
+    def _on_device_selected(self, event):
+        selected = self.device_list.selected_keys()
+        if selected and selected[0] != self.selected_device:
+            self.selected_device = selected[0]
+            self._show_selected_output()
+
+    def _show_selected_output(self):
+        """Load the output of the selected device/command into the viewer"""
+        commands = self.output_store.commands(self.selected_device)
+        self.command_picker['values'] = commands
+        if self.command_picker.get() not in commands:
+            self.command_picker.set(commands[0] if commands else '')
+
+        self.output_text.delete('1.0', tk.END)
+        if commands:
+            self.output_text.insert('1.0', self.output_store.get(self.selected_device, self.command_picker.get()))
+        self.output_text.mark_set('insert', '1.0')
+        self._schedule_highlight()
 
     def _show_diff_view(self):
-        """Display results in diff view"""
-        self.notebook.pack_forget()
+        """
+        Group devices whose normalized output for one command is identical,
+        then diff each group's representative against the largest group
+        """
+        self.output_pane.pack_forget()
         self.diff_text.pack(fill=tk.BOTH, expand=True)
-        
-        # Generate diff
-        if len(self.device_outputs) < 2:
-            diff_output = "Need at least 2 devices to compare outputs"
-        else:
-            devices = list(self.device_outputs.keys())
-            diff = difflib.HtmlDiff().make_file(
-                self.device_outputs[devices[0]].values(),
-                self.device_outputs[devices[1]].values(),
-                devices[0],
-                devices[1]
-            )
-            diff_output = diff
-        
         self.diff_text.delete(1.0, tk.END)
-        self.diff_text.insert(tk.END, diff_output)
+
+        store = self.output_store
+        commands = store.commands()
+        self.compare_picker['values'] = commands
+        if self.compare_picker.get() not in commands:
+            self.compare_picker.set(commands[0] if commands else '')
+        command = self.compare_picker.get()
+
+        devices = [(hostname, self.fingerprints[(hostname, command)])
+                   for hostname in store.hostnames() if (hostname, command) in store]
+        if len(devices) < 2:
+            self.diff_text.insert(tk.END, "Need at least 2 devices to compare outputs")
+            return
+
+        groups = group_by_fingerprint(devices)
+        baseline = groups[0]
+        baseline_output = store.get(baseline.representative, command)
+        lines = [(f"{command}: {len(groups)} distinct outputs across {len(devices)} devices", 'group'), ("", None)]
+        for number, group in enumerate(groups, 1):
+            label = " (baseline)" if group is baseline else " vs group 1"
+            lines.append((f"=== Group {number}: {len(group.hostnames)} devices{label} ===", 'group'))
+            lines.append((", ".join(group.hostnames), None))
+            if group is not baseline:
+                diff = diff_against(baseline_output, store.get(group.representative, command),
+                                    baseline.representative, group.representative,
+                                    baseline.representative, group.representative)
+                for line in diff:
+                    tag = None
+                    if line.startswith('+') and not line.startswith('+++'):
+                        tag = 'added'
+                    elif line.startswith('-') and not line.startswith('---'):
+                        tag = 'removed'
+                    lines.append((line, tag))
+            lines.append(("", None))
+
+        self.diff_text.insert(tk.END, "\n".join(line for line, _ in lines))
+        for number, (_, tag) in enumerate(lines, 1):
+            if tag:
+                self.diff_text.tag_add(tag, f"{number}.0", f"{number}.end")
+        self.update_status(f"{len(devices)} devices in {len(groups)} groups for '{command}'")
 
     def _switch_view(self):
         """Switch between tabbed and diff views"""
@@ -365,7 +548,11 @@ class CustomCommandTab(FeatureTab):
 
     def clear_results(self):
         """Clear all results and reset the view"""
-        self.device_outputs.clear()
+        self._discard_store()
+        self.output_store = OutputStore()
+        self.output_index = OutputIndex()
+        self.match_counts = {}
+        self.fingerprints = {}
         self.command_text.delete("1.0", tk.END)
         self.update_status("Ready")
         self.update_progress(0)
@@ -1,6 +1,6 @@
 import tkinter as tk
 from src.gui.widgets import FeatureTab
-from src.utils.threader import run_threaded_operation
+from src.core.operations import discover_neighbors
 
 class NetworkDiscoveryTab(FeatureTab):
     def __init__(self, parent, device_manager):
@@ -9,18 +9,20 @@ class NetworkDiscoveryTab(FeatureTab):
 
     def run_operation(self):
         super().run_operation()
-        connected_devices = [d for d in self.device_manager.devices if d.connection]
+        connected_devices = self.connected_devices()
         
-        def discover_network(device):
+        def discover_network(job, device):
             try:
-                connection = device.connection
-                cdp_output = connection.send_command("show cdp neighbors detail")
-                lldp_output = connection.send_command("show lldp neighbors detail")
-                return (device.hostname, f"CDP:\n{cdp_output}\n\nLLDP:\n{lldp_output}")
+                return (device.hostname, discover_neighbors(job, device))
             except Exception as e:
                 return (device.hostname, f"Error: {str(e)}")
 
-        results = run_threaded_operation(discover_network, connected_devices)
-        
-        for hostname, output in results:
-            self.add_result(f"\n=== {hostname} ===\n{output}\n")
+        def show_results(results):
+            for hostname, output in results:
+                self.add_result(f"\n=== {hostname} ===\n{output}\n")
+            self.update_status(f"Network discovery complete on {len(results)} devices")
+
+        self.run_job(
+            lambda job: job.map(lambda device: discover_network(job, device), connected_devices),
+            show_results
+        )
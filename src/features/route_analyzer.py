@@ -1,25 +1,140 @@
 import tkinter as tk
-from src.gui.widgets import FeatureTab
-from src.utils.threader import run_threaded_operation
+from tkinter import ttk, filedialog
+from ipaddress import IPv4Address
+from typing import List, Tuple
+from src.gui.widgets import FeatureTab, VirtualTable
+from src.utils import parse_pool
+from src.utils.route_validation import ROUTES_CODEC, parse_routes
+from src.utils.lpm import LpmService
+from src.utils.threader import Job
+
+def lookup_rows(job: Job, service: LpmService, lines: List[str]) -> Tuple[int, List]:
+    """
+    Route lookup table rows for the destinations in lines (runs in a job)
+    Returns: (number of destinations, [((destination, hostname), values)])
+    """
+    destinations = []
+    for line in lines:
+        value = line.split(',')[0].strip()
+        if not value:
+            continue
+        try:
+            destinations.append(str(IPv4Address(value)))
+        except ValueError:
+            job.result(f"Skipping invalid destination: {value}")
+
+    destinations = list(dict.fromkeys(destinations))
+    rows = []
+    for destination, per_device in service.query(destinations).items():
+        for hostname, paths in per_device.items():
+            if not paths:
+                values = (destination, hostname, "No route", "", "", "")
+            else:
+                values = (
+                    destination,
+                    hostname,
+                    str(paths[0].network),
+                    paths[0].protocol,
+                    ", ".join(path.next_hop for path in paths if path.next_hop),
+                    ", ".join(path.interface for path in paths if path.interface)
+                )
+            rows.append(((destination, hostname), values))
+    return len(destinations), rows
 
 class RouteAnalyzerTab(FeatureTab):
     def __init__(self, parent, device_manager):
         super().__init__(parent, device_manager)
         self.run_button.config(text="Analyze Routes")
+        self.lpm_service = LpmService()
+        self._create_lookup_widgets()
+
+    def _create_lookup_widgets(self):
+        # Destination lookup frame
+        lookup_frame = ttk.LabelFrame(self, text="Route Lookup", padding="5")
+        lookup_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
+        self.grid_rowconfigure(3, weight=1)
+
+        input_frame = ttk.Frame(lookup_frame)
+        input_frame.pack(fill=tk.X)
+
+        ttk.Label(input_frame, text="Destinations (one per line):").pack(side=tk.LEFT, anchor=tk.N)
+        self.destinations_text = tk.Text(input_frame, height=3, width=40)
+        self.destinations_text.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        ttk.Button(input_frame, text="Lookup",
+                  command=self._lookup_destinations).pack(side=tk.LEFT, padx=5)
+        ttk.Button(input_frame, text="Load File",
+                  command=self._load_destinations).pack(side=tk.LEFT, padx=5)
+
+        # Lookup results, keyed by (destination, hostname)
+        self.lookup_tree = VirtualTable(
+            lookup_frame,
+            columns={col: 110 for col in ("Destination", "Device", "Route", "Protocol", "Next Hop", "Interface")}
+        )
+        self.lookup_tree.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
 
     def run_operation(self):
         super().run_operation()
-        connected_devices = [d for d in self.device_manager.devices if d.connection]
-        
-        def analyze_routes(device):
+        connected_devices = self.connected_devices()
+
+        def analyze_routes(job, device):
             try:
-                connection = device.connection
-                routes = connection.send_command("show ip route")
-                return (device.hostname, routes)
+                routes = job.send_command(device, "show ip route")
+                return (device.hostname, device.connection.device_type, routes)
             except Exception as e:
-                return (device.hostname, f"Error: {str(e)}")
+                return (device.hostname, None, f"Error: {str(e)}")
+
+        def analyze(job):
+            results = job.map(lambda device: analyze_routes(job, device), connected_devices)
+            # Parse large tables in the parse pool, several at once; the tables are
+            # swapped in on completion
+            def parse(result):
+                hostname, platform, output = result
+                with job.timed_parse('routes'):
+                    return hostname, parse_pool.parse(parse_routes, output, platform, codec=ROUTES_CODEC)
+
+            tables = LpmService()
+            parsed = job.map(parse, [result for result in results if result[1]], report_progress=False)
+            for hostname, routes in parsed:
+                tables.load(hostname, routes)
+            return results, tables
+
+        def show_results(outcome):
+            results, tables = outcome
+            self.lpm_service = tables
+            for hostname, _, output in results:
+                self.add_result(f"\n=== {hostname} ===\n{output}\n")
+
+            loaded = {hostname: len(table) for hostname, table in self.lpm_service.tables.items()}
+            self.update_status(
+                f"Loaded {sum(loaded.values())} prefixes from {len(loaded)} devices for lookup"
+            )
+
+        self.run_job(analyze, show_results)
+
+    def _load_destinations(self):
+        """Load destination addresses from a text file"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("Text Files", "*.txt"), ("CSV Files", "*.csv"), ("All Files", "*.*")]
+        )
+        if filename:
+            with open(filename, 'r') as f:
+                self.destinations_text.delete("1.0", tk.END)
+                self.destinations_text.insert("1.0", f.read())
+
+    def _lookup_destinations(self):
+        """Show which route each device uses for every destination"""
+        if not self.lpm_service.tables:
+            self.update_status("Analyze routes first to load routing tables")
+            return
+
+        lines = self.destinations_text.get("1.0", tk.END).splitlines()
+        service = self.lpm_service
+
+        def show_rows(outcome):
+            destinations, rows = outcome
+            self.lookup_tree.set_rows(rows)
+            self.update_status(f"Looked up {destinations} destinations on {len(service.tables)} devices")
 
-        results = run_threaded_operation(analyze_routes, connected_devices)
-        
-        for hostname, output in results:
-            self.add_result(f"\n=== {hostname} ===\n{output}\n")
+        self.update_status(f"Looking up {len(lines)} destinations...")
+        self.run_job(lambda job: lookup_rows(job, service, lines), show_rows)
@@ -1,26 +1,20 @@
-from typing import List, Dict
 import tkinter as tk
 from tkinter import ttk
-import yaml
-from ipaddress import IPv4Network
-from src.gui.widgets import FeatureTab
+from typing import Tuple
+from src.gui.widgets import FeatureTab, VirtualTable
 from src.core.micetro_client import MicetroClient
+from src.core.operations import collect_core_routes, load_supernets
+from src.utils.ipam_mirror import IpamMirror
+from src.utils.route_validation import RouteValidationState, ValidationDelta
+from src.utils.threader import Job
 import logging
 
 class RouteValidatorTab(FeatureTab):
-    # Hardcoded interregional routers, change in env
-    CORE_ROUTERS = [
-        "router1.example.com",
-        "router2.example.com",
-        "router3.example.com",
-        "router4.example.com",
-        "router5.example.com",
-        "router6.example.com"
-    ]
-
     def __init__(self, parent, device_manager):
         super().__init__(parent, device_manager)
         self.micetro_client = None
+        self.ipam_mirror = None
+        self.validation_state = RouteValidationState()
         self._create_validator_widgets()
 
     def _create_validator_widgets(self):
@@ -43,137 +37,98 @@ class RouteValidatorTab(FeatureTab):
         self.password_entry = ttk.Entry(conn_frame, width=40, show="*")
         self.password_entry.grid(row=2, column=1, padx=5, pady=2)
 
-        # Results Treeview
-        self.results_tree = ttk.Treeview(
+        ttk.Button(self.button_frame, text="Full Revalidate",
+                  command=self._reset_results).pack(side=tk.LEFT, padx=5)
+
+        # Results table, keyed by (network, source)
+        filter_frame = ttk.Frame(self.results_frame)
+        filter_frame.pack(fill=tk.X)
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.results_tree.set_filter(self.filter_var.get()))
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=30).pack(side=tk.LEFT, padx=5)
+
+        self.results_tree = VirtualTable(
             self.results_frame,
-            columns=("Network", "Source", "Status"),
-            show="headings"
+            columns={"Network": 150, "Source": 150, "Status": 200}
         )
-        
-        # Configure headers
-        self.results_tree.heading("Network", text="Network")
-        self.results_tree.heading("Source", text="Source")
-        self.results_tree.heading("Status", text="Status")
-        
         self.results_tree.pack(fill=tk.BOTH, expand=True)
 
     def run_operation(self):
         """Main operation to validate routes"""
-        self.start_operation()
-        self.results_tree.delete(*self.results_tree.get_children())
-
-        try:
-            # Initialize Micetro client
-            self.micetro_client = MicetroClient(
-                self.url_entry.get(),
-                self.username_entry.get(),
-                self.password_entry.get()
-            )
-
-            # Load supernets from YAML
-            with open('config/supernets.yaml', 'r') as f:
-                supernets = yaml.safe_load(f)
-
-            # Get networks from Micetro
-            micetro_networks = self.micetro_client.get_networks()
-            
-            # Get routing tables from core routers
-            router_routes = self._get_router_routes()
-
-            # Compare and analyze
-            self._analyze_networks(micetro_networks, router_routes, supernets)
-
-        except Exception as e:
-            self.add_result(f"Error: {str(e)}")
-        finally:
-            self.finish_operation()
-
-    def _get_router_routes(self) -> Dict[str, List[IPv4Network]]:
-        """Get routes from all core routers"""
-        routes = {}
-        for router in self.CORE_ROUTERS:
-            device = self.device_manager.get_device_by_hostname(router)
-            if device and device.connection:
-                routes[router] = self._get_routes_from_device(device)
-        return routes
-
-    def _get_routes_from_device(self, device) -> List[IPv4Network]:
-        """
-        Extract routes from a single device using READ-ONLY commands
-        Returns: List of IPv4Network objects
-        """
-        routes = []
-        try:
-            # Ensure we're only using show commands
-            output = device.connection.send_command(
-                "show ip route", 
-                use_textfsm=True
-            )
-            
-            # Safety check - ensure we're not in config mode
-            if '%' in output or '(config' in output:
-                self.logger.error(f"Unexpected output format from device {device.hostname}")
-                return routes
-
-            # Parse the routing table output
-            if isinstance(output, list):  # TextFSM parsed output
-                for route in output:
-                    try:
-                        if 'network' in route and 'mask' in route:
-                            network = IPv4Network(f"{route['network']}/{route['mask']}")
-                            routes.append(network)
-                    except ValueError as e:
-                        self.logger.warning(f"Invalid route format: {e}")
-            else:
-                self.logger.warning("TextFSM parsing failed, falling back to manual parsing")
-                # Basic parsing of show ip route output
-                for line in output.splitlines():
-                    if line.startswith(('B', 'O', 'S', 'C', 'D', 'R')):  # Route types
-                        try:
-                            # Extract network/mask using regex or string operations
-                            # This is a simplified example - adjust based on your router output
-                            network_str = line.split()[1]
-                            if '/' in network_str:
-                                routes.append(IPv4Network(network_str))
-                        except (ValueError, IndexError) as e:
-                            self.logger.warning(f"Could not parse route: {e}")
-        except Exception as e:
-            self.logger.error(f"Error getting routes from {device.hostname}: {e}")
+        # Entries are read here; the client and mirror are opened in the job
+        url = self.url_entry.get()
+        auth = (self.username_entry.get(), self.password_entry.get())
+        self.update_status("Validating routes...")
+        self.run_job(lambda job: self._validate(job, url, auth), self._apply_delta)
+
+    def _validate(self, job: Job, url: str, auth: Tuple[str, str]) -> ValidationDelta:
+        """Sync, collect routes and diff against the previous run (worker thread)"""
+        supernets = load_supernets()
+        # Reuse the Micetro client (and its HTTP session) between runs
+        self.micetro_client = self._get_micetro_client(url, auth)
+        mirror = self._get_ipam_mirror()
+
+        # Sync the local IPAM mirror, then validate against it
+        job.status("Syncing IPAM mirror...")
+        changes = self.micetro_client.sync_mirror(mirror)
+        job.result(
+            f"IPAM sync: {changes.blocks_changed}/{changes.blocks_checked} address blocks changed, "
+            f"{len(changes.added)} added, {len(changes.removed)} removed"
+        )
+        micetro_networks = mirror.networks()
         
-        return routes
-
-    def _analyze_networks(self, micetro_networks, router_routes, supernets):
-        """Compare networks and update results tree"""
-        for network in micetro_networks:
-            self.results_tree.insert("", tk.END, values=(
-                str(network),
-                "Micetro",
-                self._validate_network(network, router_routes, supernets)
-            ))
-
-        # Add routes from routers that aren't in Micetro
-        for router, routes in router_routes.items():
-            for route in routes:
-                if route not in micetro_networks:
-                    self.results_tree.insert("", tk.END, values=(
-                        str(route),
-                        router,
-                        "Not in Micetro"
-                    ))
-
-    def _validate_network(self, network, router_routes, supernets) -> str:
-        """Validate a single network against routes and supernets"""
-        # Check if network is within any supernet
-        in_supernet = any(network.subnet_of(IPv4Network(supernet)) 
-                         for supernet in supernets)
-        if not in_supernet:
-            return "Outside defined supernets"
-
-        # Check if network is in routing tables
-        found_in_routes = False
-        for routes in router_routes.values():
-            if network in routes:
-                found_in_routes = True
-                break
-
-        return "Valid" if found_in_routes else "Missing from routing tables" 
\ No newline at end of file
+        # Get routing tables from core routers
+        job.check()
+        job.status("Collecting routes from core routers...")
+        router_routes = collect_core_routes(job, self.device_manager)
+
+        # Recompute only what changed since the previous run
+        return self.validation_state.update(micetro_networks, router_routes, supernets)
+
+    def _get_micetro_client(self, url: str, auth: Tuple[str, str]) -> MicetroClient:
+        """Return the cached client, creating a new one if the connection details changed"""
+        client = self.micetro_client
+        if client is None or client.base_url != url.rstrip('/') or client.auth != auth:
+            if client is not None:
+                client.close()
+            client = MicetroClient(url, *auth)
+        return client
+
+    def _get_ipam_mirror(self) -> IpamMirror:
+        """Return the local mirror belonging to the current Micetro URL"""
+        base_url = self.micetro_client.base_url
+        if self.ipam_mirror is None or self.ipam_mirror.server != base_url:
+            if self.ipam_mirror is not None:
+                self.ipam_mirror.close()
+            self.ipam_mirror = IpamMirror.for_server(base_url)
+        return self.ipam_mirror
+
+    def _apply_delta(self, delta: ValidationDelta):
+        """Patch the results table in place and report what changed"""
+        self.results_tree.delete((network, source) for network, source, _ in delta.removed)
+        for network, source, status in delta.newly_missing + delta.newly_valid + delta.changed:
+            self.results_tree.upsert((network, source), (network, source, status))
+
+        self.add_result(
+            f"Recomputed {delta.recomputed} prefixes: {len(delta.newly_missing)} newly missing, "
+            f"{len(delta.newly_valid)} newly valid, {len(delta.changed)} changed, "
+            f"{len(delta.removed)} removed"
+        )
+        sections = [
+            ("Newly missing", delta.newly_missing),
+            ("Newly valid", delta.newly_valid),
+            ("Changed", delta.changed),
+            ("Removed", delta.removed)
+        ]
+        for title, rows in sections:
+            if rows:
+                lines = "\n".join(f"  {network} [{source}] {status}" for network, source, status in rows)
+                self.add_result(f"{title}:\n{lines}")
+        self.update_status("Route validation complete")
+
+    def _reset_results(self):
+        """Drop the previous result set so the next run revalidates everything"""
+        self.validation_state.reset()
+        self.results_tree.clear()
+        self.update_status("Previous results cleared")
@@ -1,11 +1,279 @@
 import tkinter as tk
-from src.gui.widgets import FeatureTab
-from src.utils.threader import run_threaded_operation
-import ipaddress
+from tkinter import ttk, filedialog
+from collections import Counter
+from ipaddress import IPv4Network
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+import threading
+from src.gui.widgets import FeatureTab, VirtualTable
+from src.utils import subnet_tools
+from src.utils.free_space import FreeSpaceFinder
+from src.utils.ip_classifier import IpClassifier
+from src.utils.ipam_mirror import IpamMirror, MirrorChanges
+from src.utils.threader import Job
 
 class SubnetCalculatorTab(FeatureTab):
+    OPERATIONS = ["VLSM Allocate", "Summarize", "Find Overlaps", "Split", "Find Free Space"]
+
     def __init__(self, parent, device_manager):
         super().__init__(parent, device_manager)
         self.run_button.config(text="Calculate Subnet")
+        self.result_header: List[str] = []
+        self.result_rows: List[Tuple] = []
+        # Free space index over the IPAM mirror, built once and then kept up
+        # to date from the mirror's sync deltas; only the free space jobs use it
+        self.free_space: Optional[FreeSpaceFinder] = None
+        self._free_space_mirror: Optional[Path] = None
+        self._free_space_generation = 0
+        # Input prefixes currently allocated in the index
+        self._input_allocations: Counter = Counter()
+        self._mirror_changes: List[MirrorChanges] = []
+        self._mirror_changes_lock = threading.Lock()
+        IpamMirror.add_listener(self._on_mirror_changes)
+        self._create_calculator_widgets()
+
+    def _create_calculator_widgets(self):
+        # Operation and parameters next to the run button
+        ttk.Label(self.button_frame, text="Operation:").pack(side=tk.LEFT, padx=(10, 5))
+        self.operation = ttk.Combobox(self.button_frame, values=self.OPERATIONS,
+                                      state="readonly", width=15)
+        self.operation.set(self.OPERATIONS[0])
+        self.operation.pack(side=tk.LEFT)
+
+        ttk.Label(self.button_frame, text="Supernet:").pack(side=tk.LEFT, padx=(10, 5))
+        self.supernet_entry = ttk.Entry(self.button_frame, width=18)
+        self.supernet_entry.insert(0, "10.0.0.0/8")
+        self.supernet_entry.pack(side=tk.LEFT)
+
+        ttk.Label(self.button_frame, text="New Prefix:").pack(side=tk.LEFT, padx=(10, 5))
+        self.new_prefix = ttk.Spinbox(self.button_frame, from_=1, to=32, width=5)
+        self.new_prefix.set(24)
+        self.new_prefix.pack(side=tk.LEFT)
+
+        ttk.Button(self.button_frame, text="Import File",
+                  command=self._import_file).pack(side=tk.LEFT, padx=(10, 5))
+        ttk.Button(self.button_frame, text="Export Results",
+                  command=self._export_results).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.button_frame, text="Classify IP File",
+                  command=self._classify_file).pack(side=tk.LEFT, padx=5)
+
+        # Input area: prefixes, or "name,hosts" / "hosts" / "/len" for VLSM
+        input_frame = ttk.LabelFrame(self, text="Input (one prefix or request per line)", padding="5")
+        input_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+        self.input_text = tk.Text(input_frame, height=6)
+        self.input_text.pack(fill=tk.X, expand=True)
+
+        # Results table; columns change with the operation
+        self.results_tree = VirtualTable(self.results_frame, columns={})
+        self.results_tree.pack(fill=tk.BOTH, expand=True)
+
+    def run_operation(self):
+        """Run the selected subnet operation on the input"""
+        lines = [line.strip() for line in self.input_text.get("1.0", tk.END).splitlines()]
+        lines = [line for line in lines if line and not line.startswith('#')]
+        operation = self.operation.get()
+        if not lines and operation != "Find Free Space":
+            self.update_status("Please enter prefixes or requests")
+            return
+        # Read the parameters here; the job must not touch widgets
+        supernet = self.supernet_entry.get().strip()
+        new_prefix = self.new_prefix.get()
+
+        # Bad input raises ValueError, reported as the job's error
+        def calculate(job):
+            if operation == "Find Free Space":
+                return self._free_space(job, lines, int(new_prefix), supernet)
+            elif operation == "VLSM Allocate":
+                return self._allocate(lines, supernet)
+            elif operation == "Summarize":
+                return self._summarize(lines)
+            elif operation == "Find Overlaps":
+                return self._overlaps(lines)
+            return self._split(lines, int(new_prefix))
+
+        def show_results(outcome):
+            header, rows = outcome
+            self._show_results(header, rows)
+            self.update_status(f"{operation}: {len(lines)} inputs, {len(rows)} results")
+
+        self.update_status(f"{operation}...")
+        self.run_job(calculate, show_results)
+
+    def _allocate(self, lines: List[str], supernet: str):
+        labels, prefixlens, hosts = [], [], []
+        for line in lines:
+            parts = [part.strip() for part in line.split(',')]
+            label, value = (parts[0], parts[-1]) if len(parts) > 1 else ('', parts[0])
+            labels.append(label)
+            if value.startswith('/'):
+                prefixlens.append(int(value[1:]))
+                hosts.append(-1)
+            else:
+                prefixlens.append(-1)
+                # Anything past the IPv4 space is rejected by allocate_vlsm; keep it within int64
+                hosts.append(min(int(value), 1 << 32))
+
+        prefixlens = np.array(prefixlens)
+        hosts = np.array(hosts)
+        from_hosts = subnet_tools.hosts_to_prefixlen(np.maximum(hosts, 0))
+        prefixlens = np.where(prefixlens < 0, from_hosts, prefixlens)
+
+        allocated = subnet_tools.allocate_vlsm(supernet, prefixlens, labels)
+        usable = np.maximum((allocated.ends - allocated.starts + 1) - 2, 0)
+        rows = list(zip(labels, allocated.to_strings(),
+                        np.where(hosts < 0, '', hosts.astype(str)).tolist(), usable.tolist()))
+        return ["Name", "Network", "Requested Hosts", "Usable Hosts"], rows
+
+    def _summarize(self, lines: List[str]):
+        collapsed = subnet_tools.collapse(subnet_tools.PrefixArray.from_networks(lines))
+        sizes = (collapsed.ends - collapsed.starts + 1).tolist()
+        return ["Summary", "Addresses"], list(zip(collapsed.to_strings(), sizes))
+
+    def _overlaps(self, lines: List[str]):
+        prefixes = subnet_tools.PrefixArray.from_networks(lines)
+        names = prefixes.to_strings()
+        pairs = subnet_tools.find_overlaps(prefixes)
+        return ["Prefix", "Overlaps With"], [(names[i], names[j]) for i, j in pairs]
+
+    def _split(self, lines: List[str], new_prefix: int):
+        rows = []
+        for line in lines:
+            parent = str(IPv4Network(line, strict=False))
+            rows.extend((parent, subnet) for subnet in subnet_tools.split(parent, new_prefix).to_strings())
+        return ["Network", "Subnet"], rows
+
+    def _free_space(self, job: Job, lines: List[str], prefixlen: int, supernet_filter: str):
+        """
+        Free blocks of the "New Prefix" size per supernet in supernets.yaml,
+        treating the input prefixes and the synced IPAM mirror as allocated
+        """
+        inputs = Counter(str(IPv4Network(line.split(',')[-1].strip(), strict=False)) for line in lines)
+        if supernet_filter:
+            supernet_filter = str(IPv4Network(supernet_filter, strict=False))
+        finder = self._update_free_space(job)
+        # Swap the previous click's input prefixes for this one's
+        for network in (self._input_allocations - inputs).elements():
+            finder.release(network)
+        for network in (inputs - self._input_allocations).elements():
+            finder.allocate(network)
+        self._input_allocations = inputs
+
+        rows = []
+        for supernet, index in finder.indexes.items():
+            if supernet_filter and str(supernet) != supernet_filter:
+                continue
+            next_free = index.find_free(prefixlen)
+            blocks = index.free_blocks(prefixlen)
+            rows.append((str(supernet), str(next_free) if next_free else "None",
+                         len(blocks), index.free_addresses()))
+        return ["Supernet", f"Next Free /{prefixlen}", f"Free Blocks >= /{prefixlen}", "Free Addresses"], rows
+
+    def _update_free_space(self, job: Job) -> FreeSpaceFinder:
+        """
+        Bring the free space index up to date with the IPAM mirror: apply
+        the deltas of syncs made since, or rebuild it if there is none yet,
+        the mirror in use changed, or a sync was missed (e.g. one run by
+        the CLI)
+        """
+        mirror = IpamMirror.synced()
+        try:
+            path = mirror.path if mirror else None
+            with self._mirror_changes_lock:
+                pending, self._mirror_changes = self._mirror_changes, []
+            current = mirror.generation() if mirror else 0
+
+            if self.free_space is not None and path == self._free_space_mirror:
+                for changes in pending:
+                    # Deltas already in the index are skipped
+                    if changes.generation == self._free_space_generation + 1:
+                        self.free_space.apply_changes(changes)
+                        self._free_space_generation = changes.generation
+                if self._free_space_generation == current:
+                    return self.free_space
+
+            job.status("Indexing free space...")
+            generation, prefixes = mirror.snapshot() if mirror else (0, [])
+            with self._mirror_changes_lock:
+                self._free_space_mirror = path
+            self.free_space = FreeSpaceFinder(allocations=prefixes)
+            self._free_space_generation = generation
+            self._input_allocations = Counter()
+            return self.free_space
+        finally:
+            if mirror:
+                mirror.close()
+
+    def _on_mirror_changes(self, path: Path, changes: MirrorChanges):
+        """IpamMirror listener, called on the syncing thread"""
+        with self._mirror_changes_lock:
+            if path == self._free_space_mirror:
+                self._mirror_changes.append(changes)
+
+    def _show_results(self, header: List[str], rows: List[Tuple]):
+        self.result_header, self.result_rows = header, rows
+        self.results_tree.set_columns({col: 150 for col in header})
+        self.results_tree.set_rows(enumerate(rows))
+
+    def _import_file(self):
+        """Load prefixes or VLSM requests from a CSV/text file"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("CSV Files", "*.csv"), ("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        if not filename:
+            return
+        values, labels = subnet_tools.read_prefix_file(filename)
+        lines = [f"{label},{value}" if label else value for value, label in zip(values, labels)]
+        self.input_text.delete("1.0", tk.END)
+        self.input_text.insert("1.0", "\n".join(lines))
+        self.update_status(f"Imported {len(lines)} lines from {filename}")
+
+    def _classify_file(self):
+        """
+        Map every address in a file to its Micetro range, zone and supernet
+        Per-address rows go to an optional output CSV; the table shows counts
+        """
+        input_file = filedialog.askopenfilename(
+            title="Addresses to classify",
+            filetypes=[("Text Files", "*.txt"), ("CSV Files", "*.csv"), ("All Files", "*.*")]
+        )
+        if not input_file:
+            return
+        output_file = filedialog.asksaveasfilename(
+            title="Save per-address results (cancel to skip)",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+
+        self.update_status(f"Classifying {input_file}...")
+
+        def classify(job):
+            def on_chunk(count):
+                job.check()
+                job.status(f"Classified {count} addresses...")
+            return IpClassifier.from_config().classify_file(input_file, output_file or None,
+                                                             on_chunk=on_chunk)
+
+        def show_summary(summary):
+            rows = [(category, label, count)
+                    for category, counts in summary.items()
+                    for label, count in sorted(counts.items(), key=lambda item: -item[1])]
+            self._show_results(["Category", "Label", "Addresses"], rows)
+            total = sum(summary["supernet"].values())
+            saved = f", rows saved to {output_file}" if output_file else ""
+            self.update_status(f"Classified {total} addresses{saved}")
 
+        self.run_job(classify, show_summary)
 
+    def _export_results(self):
+        """Save the current results table to CSV"""
+        if not self.result_rows:
+            self.update_status("No results to export")
+            return
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if filename:
+            subnet_tools.write_rows(filename, self.result_header, self.result_rows)
+            self.update_status(f"Results saved to {filename}")
@@ -1,6 +1,6 @@
 import tkinter as tk
 from src.gui.widgets import FeatureTab
-from src.utils.threader import run_threaded_operation
+from src.core.operations import discover_vlans
 
 class VlanDiscoveryTab(FeatureTab):
     def __init__(self, parent, device_manager):
@@ -11,20 +11,23 @@ class VlanDiscoveryTab(FeatureTab):
 
     def run_operation(self):
         super().run_operation()
-        connected_devices = [d for d in self.device_manager.devices if d.connection]
+        connected_devices = self.connected_devices()
         
-        def discover_vlans(device):
+        def discover(job, device):
             try:
-                connection = device.connection
-                output = connection.send_command("show vlan brief")
-                return (device.hostname, output)
+                return (device.hostname, discover_vlans(job, device))
             except Exception as e:
                 return (device.hostname, f"Error: {str(e)}")
 
+        def show_results(results):
+            # Process and display results
+            self.clear_output()
+            for hostname, output in results:
+                self.add_result(f"\n=== {hostname} ===\n{output}\n")
+            self.update_status(f"VLAN discovery complete on {len(results)} devices")
+
         # Run discovery in threads
-        results = run_threaded_operation(discover_vlans, connected_devices)
-        
-        # Process and display results
-        self.results_text.delete('1.0', tk.END)
-        for hostname, output in results:
-            self.add_result(f"\n=== {hostname} ===\n{output}\n")
+        self.run_job(
+            lambda job: job.map(lambda device: discover(job, device), connected_devices),
+            show_results
+        )
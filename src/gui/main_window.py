@@ -1,28 +1,36 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 from src.core.device_manager import DeviceManager
-from src.features.vlan_discovery import VlanDiscoveryTab
-from src.features.network_discovery import NetworkDiscoveryTab
-from src.features.route_analyzer import RouteAnalyzerTab
-from src.features.auditor import AuditorTab
-from src.features.reporter import ReporterTab
-from src.features.crawler import CrawlerTab
 from src.utils.credentials_manager import CredentialsManager
-from .widgets import DeviceTreeView
+from src.utils import profiling
+from .widgets import DeviceTreeView, FeatureTab
 from .dialogs import LoginDialog, LoadingDialog
-from src.core.connector import create_connection
-from src.features.custom_command import CustomCommandTab
-from src.features.route_validator import RouteValidatorTab
+from typing import Dict
+import importlib
 import threading
 import queue
 
 class MainWindow:
+    # Tab name -> (module, class); imported and built the first time the tab is selected
+    FEATURE_TABS = {
+        "Custom Commands": ("src.features.custom_command", "CustomCommandTab"),
+        "VLAN Discovery": ("src.features.vlan_discovery", "VlanDiscoveryTab"),
+        "Network Discovery": ("src.features.network_discovery", "NetworkDiscoveryTab"),
+        "Local Routes": ("src.features.route_analyzer", "RouteAnalyzerTab"),
+        "Audit": ("src.features.auditor", "AuditorTab"),
+        "Reports": ("src.features.reporter", "ReporterTab"),
+        "Crawler": ("src.features.crawler", "CrawlerTab"),
+        "Route Validator": ("src.features.route_validator", "RouteValidatorTab"),
+        "Subnet Calculator": ("src.features.subnet_calc", "SubnetCalculatorTab")
+    }
+
     def __init__(self, root):
         self.root = root
         self.device_manager = DeviceManager()
         self.credentials_manager = CredentialsManager()
         
         self._init_window()
+        self._create_menu()
         self._create_main_frame()
         self._create_notebook()
         self._create_tabs()
@@ -32,6 +40,33 @@ class MainWindow:
         """Initialize main window settings"""
         self.root.title("Network Tools")
         self.root.geometry("800x600")
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        """Drop the sessions and stop any session shards before the window goes"""
+        for device in self.device_manager.devices:
+            if device.connection:
+                try:
+                    device.connection.disconnect()
+                except Exception:
+                    pass
+                device.connection = None
+        self.device_manager.close()
+        self.root.destroy()
+
+    def _create_menu(self):
+        """Create the menu bar"""
+        menubar = tk.Menu(self.root)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        # Saves pstats, collapsed stacks and a memory snapshot for every run
+        self.profile_var = tk.BooleanVar(value=profiling.is_enabled())
+        tools_menu.add_checkbutton(
+            label="Profile Feature Runs",
+            variable=self.profile_var,
+            command=lambda: profiling.set_enabled(self.profile_var.get())
+        )
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+        self.root.config(menu=menubar)
 
     def _create_main_frame(self):
         """Create and configure the main frame"""
@@ -44,21 +79,38 @@ class MainWindow:
         self.notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
     def _create_tabs(self):
-        """Create and add all tabs to the notebook"""
-        self.tabs = {
-            "Devices": self._create_devices_tab(),
-            "Custom Commands": CustomCommandTab(self.notebook, self.device_manager),
-            "VLAN Discovery": VlanDiscoveryTab(self.notebook, self.device_manager),
-            "Network Discovery": NetworkDiscoveryTab(self.notebook, self.device_manager),
-            "Local Routes": RouteAnalyzerTab(self.notebook, self.device_manager),
-            "Audit": AuditorTab(self.notebook, self.device_manager),
-            "Reports": ReporterTab(self.notebook, self.device_manager),
-            "Crawler": CrawlerTab(self.notebook, self.device_manager),
-            "Route Validator": RouteValidatorTab(self.notebook, self.device_manager)
-        }
-        
-        for name, tab in self.tabs.items():
-            self.notebook.add(tab, text=name)
+        """Add all tabs to the notebook; feature tabs start as empty placeholders"""
+        self.tabs = {"Devices": self._create_devices_tab()}
+        self.notebook.add(self.tabs["Devices"], text="Devices")
+
+        self._placeholders: Dict[str, ttk.Frame] = {}
+        for name in self.FEATURE_TABS:
+            placeholder = ttk.Frame(self.notebook)
+            placeholder.grid_rowconfigure(0, weight=1)
+            placeholder.grid_columnconfigure(0, weight=1)
+            self.notebook.add(placeholder, text=name)
+            self._placeholders[name] = placeholder
+
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+
+    def _on_tab_changed(self, event):
+        self.get_tab(self.notebook.tab(self.notebook.select(), 'text'))
+
+    def get_tab(self, name: str) -> FeatureTab:
+        """Return a tab, importing and building it on first use"""
+        tab = self.tabs.get(name)
+        if tab is None:
+            module, class_name = self.FEATURE_TABS[name]
+            self.root.config(cursor='watch')
+            self.root.update_idletasks()
+            try:
+                tab_class = getattr(importlib.import_module(module), class_name)
+                tab = tab_class(self._placeholders[name], self.device_manager)
+            finally:
+                self.root.config(cursor='')
+            tab.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+            self.tabs[name] = tab
+        return tab
 
     def _configure_grid(self):
         """Configure grid weights for responsive layout"""
@@ -88,6 +140,11 @@ class MainWindow:
         right_buttons = ttk.Frame(buttons_frame)
         right_buttons.pack(side=tk.RIGHT)
         
+        ttk.Label(right_buttons, text="Filter:").pack(side=tk.LEFT)
+        self.device_filter = tk.StringVar()
+        self.device_filter.trace_add('write', lambda *args: self.device_tree.set_filter(self.device_filter.get()))
+        ttk.Entry(right_buttons, textvariable=self.device_filter, width=20).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(right_buttons, text="Select All", 
                   command=self._select_all_devices).pack(side=tk.LEFT, padx=5)
         ttk.Button(right_buttons, text="Deselect All", 
@@ -112,8 +169,8 @@ class MainWindow:
 
     def _handle_device_connection(self):
         """Handle connecting to selected devices"""
-        selected_items = self.device_tree.selection()
-        if not selected_items:
+        selected_hostnames = self.device_tree.selected_keys()
+        if not selected_hostnames:
             return
 
         # Get credentials
@@ -129,10 +186,8 @@ class MainWindow:
 
         # Get selected devices and prepare them
         selected_devices = []
-        for item in selected_items:
-            device = self.device_manager.get_device_by_hostname(
-                self.device_tree.item(item)['values'][0]
-            )
+        for hostname in selected_hostnames:
+            device = self.device_manager.get_device_by_hostname(hostname)
             if device:
                 device.username = username
                 device.password = password
@@ -187,10 +242,9 @@ class MainWindow:
         self.root.after(100, check_queue)
 
     def _select_all_devices(self):
-        """Select all devices in the tree"""
-        for item in self.device_tree.get_children():
-            self.device_tree.selection_add(item)
+        """Select all devices in the tree (matching the filter)"""
+        self.device_tree.select_all()
 
     def _deselect_all_devices(self):
         """Deselect all devices in the tree"""
-        self.device_tree.selection_remove(self.device_tree.selection())
+        self.device_tree.deselect_all()
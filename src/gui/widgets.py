@@ -1,78 +1,587 @@
 import tkinter as tk
 from tkinter import ttk
 from src.core.device import Device
-from typing import List, Callable, Optional
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
 import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from src.utils import profiling
+from src.utils.metrics import metrics
+from src.utils.threader import Job, OperationCancelled
 
-class DeviceTreeView(ttk.Treeview):
+class VirtualTable(ttk.Frame):
+    """
+    Table whose rows live in Python, keyed by a hashable key. Only the rows
+    in the visible window are materialized as Treeview items, which are
+    reused while scrolling, so updates by key are O(1) and the widget cost
+    does not grow with the row count. Clicking a heading sorts by that
+    column; set_filter() narrows the rows to those containing some text.
+    Selection changes are announced with the <<TableSelect>> event.
+    """
+
+    def __init__(self, parent, columns: Dict[str, int], **kwargs):
+        super().__init__(parent, **kwargs)
+        self.columns = list(columns)
+        # key -> row values, in insertion order
+        self._rows: Dict[Hashable, tuple] = {}
+        # Keys passing the filter, in display order
+        self._view: List[Hashable] = []
+        self._selected: Set[Hashable] = set()
+        # Materialized Treeview item -> key shown in it
+        self._item_keys: Dict[str, Hashable] = {}
+        self._search_text: Dict[Hashable, str] = {}
+        self._offset = 0
+        self._visible = 1
+        self._sort_column: Optional[str] = None
+        self._sort_reverse = False
+        self._filter = ''
+        self._view_stale = False
+        self._render_pending = None
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=1)
+        self._configure_columns(columns)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', self._on_wheel)
+        self.tree.bind('<Button-5>', self._on_wheel)
+        self.tree.bind('<Prior>', lambda e: self._scroll(-self._visible))
+        self.tree.bind('<Next>', lambda e: self._scroll(self._visible))
+        self.tree.bind('<Up>', self._on_arrow)
+        self.tree.bind('<Down>', self._on_arrow)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[Hashable]:
+        """Keys in display order (filtered and sorted)"""
+        self._ensure_view()
+        return list(self._view)
+
+    def get(self, key) -> Optional[tuple]:
+        return self._rows.get(key)
+
+    def set_rows(self, rows: Iterable[Tuple[Hashable, Sequence]]):
+        """Replace all rows with (key, values) pairs"""
+        self._rows = {key: tuple(values) for key, values in rows}
+        self._selected &= self._rows.keys()
+        self._search_text.clear()
+        self._offset = 0
+        self._invalidate()
+
+    def upsert(self, key, values: Sequence):
+        """Insert a row, or replace the values of an existing one in place"""
+        is_new = key not in self._rows
+        self._rows[key] = tuple(values)
+        self._search_text.pop(key, None)
+        if is_new or self._sort_column or self._filter:
+            self._invalidate()
+        else:
+            self._schedule_render()
+
+    def set_value(self, key, column: str, value) -> bool:
+        """Update one cell. Returns: False if there is no such row"""
+        values = self._rows.get(key)
+        if values is None:
+            return False
+        index = self.columns.index(column)
+        self.upsert(key, values[:index] + (value,) + values[index + 1:])
+        return True
+
+    def delete(self, keys: Iterable[Hashable]):
+        removed = {key for key in keys if self._rows.pop(key, None) is not None}
+        if removed:
+            self._selected -= removed
+            for key in removed:
+                self._search_text.pop(key, None)
+            self._invalidate()
+
+    def clear(self):
+        self.set_rows([])
+
+    def set_columns(self, columns: Dict[str, int]):
+        """Replace the columns ({name: width}); drops every row"""
+        self.tree.delete(*self.tree.get_children())
+        self._item_keys = {}
+        self.columns = list(columns)
+        self._sort_column, self._sort_reverse = None, False
+        self.tree.configure(columns=self.columns)
+        self._configure_columns(columns)
+        self.set_rows([])
+
+    def _configure_columns(self, columns: Dict[str, int]):
+        for col, width in columns.items():
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=width)
+
+    def sort_by(self, column: str, reverse: Optional[bool] = None):
+        """Sort by a column; repeating the same column flips the order"""
+        if reverse is None:
+            reverse = not self._sort_reverse if column == self._sort_column else False
+        self._sort_column, self._sort_reverse = column, reverse
+        self._invalidate()
+
+    def set_filter(self, text: str):
+        """Show only rows containing text in any column (case-insensitive)"""
+        self._filter = text.strip().lower()
+        self._offset = 0
+        self._invalidate()
+
+    def selected_keys(self) -> List[Hashable]:
+        self._ensure_view()
+        return [key for key in self._view if key in self._selected]
+
+    def select_all(self):
+        """Select every row passing the filter"""
+        self._ensure_view()
+        self._selected = set(self._view)
+        self._selection_changed()
+
+    def deselect_all(self):
+        self._selected = set()
+        self._selection_changed()
+
+    def select(self, keys: Iterable[Hashable]):
+        """Replace the selection"""
+        self._selected = {key for key in keys if key in self._rows}
+        self._selection_changed()
+
+    def see(self, key):
+        """Scroll so the row for key is visible"""
+        self._ensure_view()
+        if key in self._rows:
+            position = self._view.index(key)
+            if not self._offset <= position < self._offset + self._visible:
+                self._offset = max(0, position - self._visible // 2)
+            self._schedule_render()
+
+    def refresh(self):
+        """Render pending changes now"""
+        if self._render_pending is not None:
+            self.after_cancel(self._render_pending)
+        self._render()
+
+    def _invalidate(self):
+        self._view_stale = True
+        self._schedule_render()
+
+    def _schedule_render(self):
+        # Bulk updates between two idle points cost a single render
+        if self._render_pending is None:
+            self._render_pending = self.after_idle(self._render)
+
+    def _ensure_view(self):
+        if not self._view_stale:
+            return
+        self._view_stale = False
+        if self._filter:
+            text = self._filter
+            self._view = [key for key in self._rows if text in self._row_text(key)]
+        else:
+            self._view = list(self._rows)
+
+        if self._sort_column:
+            index = self.columns.index(self._sort_column)
+            rows = self._rows
+            try:
+                self._view.sort(key=lambda key: rows[key][index], reverse=self._sort_reverse)
+            except TypeError:
+                # Mixed value types in the column: fall back to text order
+                self._view.sort(key=lambda key: str(rows[key][index]), reverse=self._sort_reverse)
+
+    def _row_text(self, key) -> str:
+        text = self._search_text.get(key)
+        if text is None:
+            text = self._search_text[key] = " ".join(map(str, self._rows[key])).lower()
+        return text
+
+    def _render(self):
+        """Show the visible window of the view in recycled Treeview items"""
+        self._render_pending = None
+        self._ensure_view()
+        self._offset = max(0, min(self._offset, len(self._view) - self._visible))
+        keys = self._view[self._offset:self._offset + self._visible]
+
+        items = list(self.tree.get_children())
+        if len(items) > len(keys):
+            self.tree.delete(*items[len(keys):])
+            items = items[:len(keys)]
+        while len(items) < len(keys):
+            items.append(self.tree.insert("", tk.END))
+
+        self._item_keys = {}
+        for item, key in zip(items, keys):
+            self.tree.item(item, values=[str(value) for value in self._rows[key]])
+            self._item_keys[item] = key
+        self.tree.selection_set([item for item, key in self._item_keys.items()
+                                 if key in self._selected])
+
+        total = len(self._view)
+        if total:
+            self.scrollbar.set(self._offset / total, min(1.0, (self._offset + len(keys)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll(self, rows: int):
+        self._offset = max(0, self._offset + rows)
+        self._render()
+        return "break"
+
+    def _on_scrollbar(self, action: str, amount: str, unit: Optional[str] = None):
+        if action == "moveto":
+            self._offset = int(float(amount) * len(self._view))
+            self._render()
+        elif unit == "pages":
+            self._scroll(int(amount) * self._visible)
+        else:
+            self._scroll(int(amount))
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            return self._scroll(-3)
+        return self._scroll(3)
+
+    def _on_arrow(self, event):
+        """Arrow keys past the first or last visible row scroll the window"""
+        items = self.tree.get_children()
+        if not items:
+            return None
+        edge, step = (items[0], -1) if event.keysym == "Up" else (items[-1], 1)
+        if self.tree.focus() != edge:
+            return None
+        self._scroll(step)
+        # The edge item now shows the next row: move the selection onto it
+        key = self._item_keys.get(edge)
+        if key is not None:
+            self._selected = {key}
+            self._selection_changed()
+        return "break"
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # One row's worth of height goes to the headings
+        visible = max(1, event.height // row_height - 1)
+        if visible != self._visible:
+            self._visible = visible
+            self._schedule_render()
+
+    def _on_tree_select(self, event):
+        """Mirror the visible items' selection state into the selected keys"""
+        selection = set(self.tree.selection())
+        changed = False
+        for item, key in self._item_keys.items():
+            if item in selection and key not in self._selected:
+                self._selected.add(key)
+                changed = True
+            elif item not in selection and key in self._selected:
+                self._selected.discard(key)
+                changed = True
+        if changed:
+            self.event_generate('<<TableSelect>>')
+
+    def _selection_changed(self):
+        self._schedule_render()
+        self.event_generate('<<TableSelect>>')
+
+class DeviceTreeView(VirtualTable):
     def __init__(self, parent, **kwargs):
         super().__init__(
             parent,
-            columns=("Hostname", "IP", "Type", "Status"),
-            show="headings",
+            columns={
+                "Hostname": 150,
+                "IP": 150,
+                "Type": 150,
+                "Status": 100
+            },
             **kwargs
         )
         
         # Add logging
         self.logger = logging.getLogger(__name__)
-        
-        # Configure headers
-        headers = {
-            "Hostname": 150,
-            "IP": 150,
-            "Type": 150,
-            "Status": 100
-        }
-        
-        for col, width in headers.items():
-            self.heading(col, text=col)
-            self.column(col, width=width)
-        
-        # Add scrollbar
-        self.scrollbar = ttk.Scrollbar(
-            parent, 
-            orient=tk.VERTICAL, 
-            command=self.yview
-        )
-        self.configure(yscrollcommand=self.scrollbar.set)
 
     def grid_with_scrollbar(self, **kwargs):
+        # The scrollbar is part of the table frame
         self.grid(row=kwargs.get('row', 0), 
                  column=kwargs.get('column', 0), 
                  sticky=kwargs.get('sticky', (tk.W, tk.E, tk.N, tk.S)))
-        self.scrollbar.grid(row=kwargs.get('row', 0), 
-                          column=kwargs.get('column', 0) + 1, 
-                          sticky=(tk.N, tk.S))
 
     def update_devices(self, devices: List[Device]):
-        self.clear()
-        for device in devices:
-            self.insert("", tk.END, values=(
-                device.hostname,
-                device.ip,
-                device.device_type,
-                "Disconnected"
-            ))
+        self.set_rows((device.hostname, (
+            device.hostname,
+            device.ip,
+            device.device_type,
+            "Connected" if device.connection else "Disconnected"
+        )) for device in devices)
 
     def update_device_status(self, hostname: str, status: str) -> bool:
-        """Update device status with error handling
-        Returns: True if successful, False otherwise"""
-        try:
-            for item in self.get_children():
-                if self.item(item)['values'][0] == hostname:
-                    self.set(item, "Status", status)
-                    return True
-            self.logger.warning(f"Device {hostname} not found in tree")
-            return False
-        except Exception as e:
-            self.logger.error(f"Error updating status for {hostname}: {str(e)}")
-            return False
+        """Update device status
+        Returns: True if successful, False if the device is not in the tree"""
+        if self.set_value(hostname, "Status", status):
+            return True
+        self.logger.warning(f"Device {hostname} not found in tree")
+        return False
+
+class UpdateCoalescer:
+    """
+    Collects status, progress and result text and applies them to the
+    widgets in one batch, at most max_rate times per second. Only the
+    latest status and progress are kept; result text is appended in order.
+    """
+
+    def __init__(self, widget, apply_status: Callable[[str], None],
+                 apply_progress: Callable[[float], None],
+                 apply_results: Callable[[List[str]], None], max_rate: int = 10):
+        self.widget = widget
+        self.apply_status = apply_status
+        self.apply_progress = apply_progress
+        self.apply_results = apply_results
+        self.interval = 1.0 / max_rate
+        self._status: Optional[str] = None
+        self._progress: Optional[float] = None
+        self._results: List[str] = []
+        self._last_flush = 0.0
+        self._scheduled = None
+
+    def status(self, message: str):
+        self._status = message
+        self._schedule()
+
+    def progress(self, value: float):
+        self._progress = value
+        self._schedule()
+
+    def result(self, text: str):
+        self._results.append(text)
+        self._schedule()
+
+    def discard_results(self):
+        """Drop result text that has not been shown yet"""
+        self._results = []
+
+    def flush(self):
+        """Apply everything pending now"""
+        if self._scheduled is not None:
+            self.widget.after_cancel(self._scheduled)
+            self._scheduled = None
+        self._last_flush = time.monotonic()
+
+        status, self._status = self._status, None
+        progress, self._progress = self._progress, None
+        results, self._results = self._results, []
+        if status is not None:
+            self.apply_status(status)
+        if progress is not None:
+            self.apply_progress(progress)
+        if results:
+            self.apply_results(results)
+
+    def _schedule(self):
+        if self._scheduled is not None:
+            return
+        wait = max(0.0, self._last_flush + self.interval - time.monotonic())
+        self._scheduled = self.widget.after(int(wait * 1000), self._scheduled_flush)
+
+    def _scheduled_flush(self):
+        self._scheduled = None
+        self.flush()
+
+class ResultsConsole(ttk.Frame):
+    """
+    Results text area holding only the last max_lines lines. Everything
+    appended is also spilled to a temporary log file, which the "View Full
+    Output" pager reads page by page on demand.
+    """
+    MAX_LINES = 5000
+
+    def __init__(self, parent, max_lines: int = MAX_LINES, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.max_lines = max_lines
+        self.total_lines = 0
+        self._log = None
+
+        header = ttk.Frame(self)
+        header.pack(fill=tk.X)
+        self.summary_label = ttk.Label(header, text="")
+        self.summary_label.pack(side=tk.LEFT)
+        ttk.Button(header, text="View Full Output",
+                  command=self.view_full_output).pack(side=tk.RIGHT)
+
+        self.text = tk.Text(self, wrap=tk.WORD)
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.text.yview)
+        self.text.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(fill=tk.BOTH, expand=True)
+
+        self.bind('<Destroy>', self._on_destroy)
+
+    @property
+    def log_path(self) -> Optional[str]:
+        return self._log.name if self._log else None
+
+    def append(self, texts: List[str]):
+        """Append a batch of results, one or more lines each"""
+        chunk = "".join(f"{text}\n" for text in texts)
+        if self._log is None:
+            self._log = tempfile.NamedTemporaryFile(
+                'w', prefix='networktools_results_', suffix='.log', encoding='utf-8', delete=False)
+        self._log.write(chunk)
+        self._log.flush()
+        self.total_lines += chunk.count("\n")
+
+        # Only follow the output if the view is already at the bottom
+        at_bottom = self.text.yview()[1] >= 1.0
+        self.text.insert(tk.END, chunk)
+        # Text always ends with a newline here, so the last index line is empty
+        lines = int(self.text.index('end-1c').split('.')[0]) - 1
+        if lines > self.max_lines:
+            self.text.delete('1.0', f'{lines - self.max_lines + 1}.0')
+        if at_bottom:
+            self.text.see(tk.END)
+        self._update_summary()
 
     def clear(self):
-        for item in self.get_children():
-            self.delete(item)
+        self.text.delete('1.0', tk.END)
+        if self._log is not None:
+            self._log.seek(0)
+            self._log.truncate()
+        self.total_lines = 0
+        self._update_summary()
+
+    def view_full_output(self):
+        if self._log is None:
+            return
+        OutputPager(self, self._log.name, title="Full Output")
+
+    def _update_summary(self):
+        if self.total_lines > self.max_lines:
+            self.summary_label.config(
+                text=f"Showing last {self.max_lines} of {self.total_lines} lines")
+        else:
+            self.summary_label.config(text="")
+
+    def _on_destroy(self, event):
+        if event.widget is self and self._log is not None:
+            self._log.close()
+            try:
+                os.remove(self._log.name)
+            except OSError:
+                pass
+            self._log = None
+
+class OutputPager(tk.Toplevel):
+    """Read-only view of a large text file, loading one page of lines at a time"""
+    PAGE_LINES = 2000
+    SCAN_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, parent, path: str, title: str = "Output"):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("900x600")
+        self.path = path
+        self.page = 0
+        # Byte offset where each page starts
+        self.page_offsets: List[int] = [0]
+        self.line_count = 0
+
+        nav = ttk.Frame(self, padding="5")
+        nav.pack(fill=tk.X)
+        for text, command in [("<< First", lambda: self.show_page(0)),
+                              ("< Previous", lambda: self.show_page(self.page - 1)),
+                              ("Next >", lambda: self.show_page(self.page + 1)),
+                              ("Last >>", lambda: self.show_page(len(self.page_offsets) - 1)),
+                              ("Reload", self.reload)]:
+            ttk.Button(nav, text=text, command=command).pack(side=tk.LEFT, padx=2)
+        self.position_label = ttk.Label(nav, text="")
+        self.position_label.pack(side=tk.LEFT, padx=10)
+
+        self.text = tk.Text(self, wrap=tk.NONE)
+        v_scroll = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.text.yview)
+        h_scroll = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.text.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        self.text.pack(fill=tk.BOTH, expand=True)
+
+        self.reload()
+
+    def reload(self):
+        """Re-index the file (it may have grown) and show the last page"""
+        self.page_offsets, self.line_count = index_pages(self.path, self.PAGE_LINES, self.SCAN_BYTES)
+        self.show_page(len(self.page_offsets) - 1)
+
+    def show_page(self, page: int):
+        page = max(0, min(page, len(self.page_offsets) - 1))
+        self.page = page
+        with open(self.path, 'rb') as f:
+            f.seek(self.page_offsets[page])
+            if page + 1 < len(self.page_offsets):
+                data = f.read(self.page_offsets[page + 1] - self.page_offsets[page])
+            else:
+                data = f.read()
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', data.decode('utf-8', errors='replace'))
+        self.text.configure(state=tk.DISABLED)
+
+        if not self.line_count:
+            self.position_label.config(text="No output")
+            return
+        first = page * self.PAGE_LINES + 1
+        last = min(first + self.PAGE_LINES - 1, self.line_count)
+        self.position_label.config(
+            text=f"Lines {first}-{last} of {self.line_count} (page {page + 1}/{len(self.page_offsets)})")
+
+def index_pages(path: str, page_lines: int, scan_bytes: int = 16 * 1024 * 1024) -> Tuple[List[int], int]:
+    """
+    Byte offsets of every page_lines-th line of a file, found with a
+    vectorized newline scan
+    Returns: (page start offsets, number of lines)
+    """
+    # Only needed once a log is paged; keeps numpy off the startup path
+    import numpy as np
+    offsets = [0]
+    lines = 0
+    position = 0
+    last_byte = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(scan_bytes)
+            if not chunk:
+                break
+            last_byte = chunk[-1:]
+            newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+            # Newline number (1-based, file-wide) of each match; a page ends on every page_lines-th
+            numbers = np.arange(lines + 1, lines + 1 + len(newlines))
+            ends = newlines[numbers % page_lines == 0]
+            offsets.extend((position + ends + 1).tolist())
+            lines += len(newlines)
+            position += len(chunk)
+    # A page boundary at the very end of the file starts no page
+    if len(offsets) > 1 and offsets[-1] >= position:
+        offsets.pop()
+    # Count an unterminated last line
+    if last_byte != b'\n':
+        lines += 1
+    return offsets, lines
 
 class FeatureTab(ttk.Frame):
+    # How often job events are drained on the Tk thread
+    POLL_INTERVAL_MS = 50
+    # Maximum widget refreshes per second for status, progress and results
+    UPDATE_RATE = 10
+
     def __init__(self, parent, device_manager, **kwargs):
         super().__init__(parent, **kwargs)
         self.device_manager = device_manager
@@ -82,6 +591,8 @@ class FeatureTab(ttk.Frame):
         self.current_operation = None
         self.cancel_requested = False
         
+        self.updates = UpdateCoalescer(self, self._show_status, self._show_progress,
+                                       self._show_results_text, self.UPDATE_RATE)
         self._create_widgets()
         self._configure_grid()
 
@@ -121,8 +632,9 @@ class FeatureTab(ttk.Frame):
         self.results_frame = ttk.LabelFrame(self, text="Results", padding="5")
         self.results_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        self.results_text = tk.Text(self.results_frame, wrap=tk.WORD)
-        self.results_text.pack(fill=tk.BOTH, expand=True)
+        self.results_console = ResultsConsole(self.results_frame)
+        self.results_console.pack(fill=tk.BOTH, expand=True)
+        self.results_text = self.results_console.text
 
     def _configure_grid(self):
         """Configure grid weights"""
@@ -131,10 +643,7 @@ class FeatureTab(ttk.Frame):
 
     def run_operation(self):
         """Override this method in subclasses"""
-        connected_devices = [
-            device for device in self.device_manager.devices 
-            if device.connection is not None
-        ]
+        connected_devices = self.connected_devices()
         
         if not connected_devices:
             self.update_status("No connected devices found")
@@ -143,24 +652,136 @@ class FeatureTab(ttk.Frame):
         self.update_status(f"Running operation on {len(connected_devices)} devices...")
         # Implement specific operation in subclass
 
+    def connected_devices(self) -> List[Device]:
+        return [device for device in self.device_manager.devices if device.connection is not None]
+
+    def run_job(self, work: Callable[[Job], Any],
+                on_complete: Optional[Callable[[Any], None]] = None) -> Optional[Job]:
+        """
+        Run work(job) on a worker thread. Status, progress and results posted
+        through the job are applied on the Tk thread by polling with after();
+        on_complete(return value) runs there too once the work finishes.
+        Returns: the job, or None if another operation is still running
+        """
+        if self.current_operation is not None:
+            self.update_status("An operation is already running")
+            return None
+
+        job = Job(feature=self.feature_name, max_workers=self.device_manager.max_workers)
+        if profiling.is_enabled():
+            job.profile = profiling.RunProfile(self.feature_name)
+            job.profile.start()
+        self.current_operation = job
+        self.start_operation()
+
+        def target():
+            try:
+                if job.profile is not None:
+                    with job.profile.thread():
+                        result = work(job)
+                else:
+                    result = work(job)
+                job.events.put(("done", result))
+            except OperationCancelled:
+                job.events.put(("cancelled", None))
+            except Exception as e:
+                self.logger.exception("Background operation failed")
+                job.events.put(("error", e))
+
+        threading.Thread(target=target, daemon=True).start()
+        self.after(self.POLL_INTERVAL_MS, self._poll_job, job, on_complete)
+        return job
+
+    def _poll_job(self, job: Job, on_complete: Optional[Callable[[Any], None]]):
+        """Apply queued job events; reschedules itself until the job ends"""
+        while True:
+            try:
+                kind, payload = job.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "status":
+                self.update_status(payload)
+            elif kind == "progress":
+                self.update_progress(payload)
+            elif kind == "result":
+                self.add_result(payload)
+            elif kind == "call":
+                callback, args = payload
+                callback(*args)
+            else:
+                self.current_operation = None
+                self.finish_operation()
+                self._export_metrics()
+                if kind == "done":
+                    if on_complete:
+                        if job.profile is not None:
+                            # Include the redraw on the Tk thread
+                            with job.profile.thread():
+                                on_complete(payload)
+                        else:
+                            on_complete(payload)
+                elif kind == "cancelled":
+                    self.update_status("Operation cancelled")
+                else:
+                    self.add_result(f"Error: {str(payload)}")
+                    self.update_status("Operation failed")
+                if job.profile is not None:
+                    self._save_profile(job.profile)
+                return
+
+        self.after(self.POLL_INTERVAL_MS, self._poll_job, job, on_complete)
+
+    @property
+    def feature_name(self) -> str:
+        """Feature label for timings: the feature's module name, e.g. 'auditor'"""
+        return self.__class__.__module__.rsplit('.', 1)[-1]
+
+    def _save_profile(self, profile: profiling.RunProfile):
+        profile.stop()
+        try:
+            self.add_result(f"Profile saved to {profile.save()}")
+        except OSError:
+            self.logger.exception("Could not save profile")
+
+    def _export_metrics(self):
+        """Refresh the timing textfile and session summary after every job"""
+        try:
+            metrics.export()
+        except OSError:
+            self.logger.exception("Could not write metrics")
+
     def update_status(self, message: str):
-        """Update status label"""
+        """Update status label (coalesced)"""
+        self.updates.status(message)
+
+    def update_progress(self, value: float):
+        """Update progress bar (coalesced)"""
+        self.updates.progress(value)
+
+    def add_result(self, result: str):
+        """Add text to results area (batched)"""
+        self.updates.result(result)
+
+    def clear_output(self):
+        """Empty the results area, including results not shown yet"""
+        self.updates.discard_results()
+        self.results_console.clear()
+
+    def _show_status(self, message: str):
         self.status_label.config(text=message)
-        self.update()
 
-    def update_progress(self, value: int):
-        """Update progress bar"""
+    def _show_progress(self, value: float):
         self.progress['value'] = value
-        self.update()
 
-    def add_result(self, result: str):
-        """Add text to results area"""
-        self.results_text.insert(tk.END, f"{result}\n")
-        self.results_text.see(tk.END)
+    def _show_results_text(self, results: List[str]):
+        self.results_console.append(results)
 
     def cancel_operation(self):
         """Request cancellation of current operation"""
         self.cancel_requested = True
+        if self.current_operation is not None:
+            self.current_operation.cancel()
         self.update_status("Cancelling operation...")
         self.cancel_button.configure(state=tk.DISABLED)
 
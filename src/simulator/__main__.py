@@ -0,0 +1,77 @@
+"""
+Local Cisco CLI simulator
+
+    python -m src.simulator --devices 1000 --write-inventory sim.csv --port 2222
+    NETWORKTOOLS_SSH_PORT=2222 python main.py audit -i sim.csv -u lab
+
+Serves simulated devices over SSH on loopback addresses until Ctrl-C.
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from src.simulator.devices import FixtureStore, generate_devices, load_inventory, write_inventory
+from src.simulator.server import FaultSettings, SimulatorServer
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.simulator', description="Simulate Cisco devices over SSH")
+    devices = parser.add_mutually_exclusive_group(required=True)
+    devices.add_argument('-i', '--inventory', help="Simulate the devices in a hostname,ip,model CSV")
+    devices.add_argument('-n', '--devices', type=int, help="Simulate this many devices on 127.1.0.1 onwards")
+    parser.add_argument('--write-inventory', help="Write the simulated devices to this CSV")
+    parser.add_argument('-f', '--fixtures', help="Directory of <hostname>/<command>.txt outputs")
+    parser.add_argument('-p', '--port', type=int, default=2222)
+    parser.add_argument('--username', help="Only accept this username (default: any)")
+    parser.add_argument('--password', help="Only accept this password (default: any)")
+    parser.add_argument('--allow-remote', action='store_true', help="Accept connections from other hosts")
+
+    faults = parser.add_argument_group("fault injection")
+    faults.add_argument('--latency', type=float, default=0.0, help="Seconds before each command's output")
+    faults.add_argument('--jitter', type=float, default=0.0, help="Random +/- seconds added to --latency")
+    faults.add_argument('--login-latency', type=float, default=0.0, help="Seconds to answer a login")
+    faults.add_argument('--bandwidth', type=int, default=0, help="Output bytes per second per session")
+    faults.add_argument('--refuse-rate', type=float, default=0.0, help="Share of connections refused")
+    faults.add_argument('--auth-failure-rate', type=float, default=0.0, help="Share of logins rejected")
+    faults.add_argument('--drop-rate', type=float, default=0.0, help="Share of commands that drop the session")
+    faults.add_argument('--hang-rate', type=float, default=0.0, help="Share of commands that never answer")
+    faults.add_argument('--seed', type=int, help="Make fault injection repeatable")
+    parser.add_argument('--stats-interval', type=float, default=10.0, help="Seconds between stats lines")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    # Two threads per session; smaller stacks let thousands of sessions fit
+    threading.stack_size(512 * 1024)
+
+    devices = load_inventory(args.inventory) if args.inventory else generate_devices(args.devices)
+    if args.write_inventory:
+        write_inventory(devices, args.write_inventory)
+    credentials = None
+    if args.username or args.password:
+        credentials = (args.username or '', args.password or '')
+    faults = FaultSettings(
+        latency=args.latency, jitter=args.jitter, login_latency=args.login_latency,
+        bandwidth=args.bandwidth, refuse_rate=args.refuse_rate,
+        auth_failure_rate=args.auth_failure_rate, drop_rate=args.drop_rate,
+        hang_rate=args.hang_rate, seed=args.seed
+    )
+    server = SimulatorServer(devices, args.port, FixtureStore(args.fixtures), faults,
+                             credentials, allow_remote=args.allow_remote)
+    server.start()
+    print(f"Simulating {len(devices)} devices on port {server.port} "
+          f"(set NETWORKTOOLS_SSH_PORT={server.port} to reach them)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(args.stats_interval)
+            print(server.stats.as_dict(), file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(server.stats.as_dict(), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
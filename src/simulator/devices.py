@@ -0,0 +1,181 @@
+import csv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+from src.core.device_manager import DeviceManager
+
+# Platforms the simulator can impersonate; other detected types fall back to IOS
+PLATFORMS = ('cisco_ios', 'cisco_ios_xe', 'cisco_nxos')
+
+@dataclass
+class SimulatedDevice:
+    hostname: str
+    ip: str
+    model: str = 'C9300-48P'
+    platform: str = 'cisco_ios_xe'
+    # Start sessions at the privileged (#) prompt, as TACACS priv-15 logins do
+    privileged: bool = True
+
+    @property
+    def prompt_name(self) -> str:
+        """Cisco prompts show the hostname up to the first dot"""
+        return self.hostname.split('.')[0]
+
+def platform_for_model(model: str) -> str:
+    platform = DeviceManager()._detect_device_type(model)
+    return platform if platform in PLATFORMS else 'cisco_ios'
+
+def load_inventory(filepath: str) -> List[SimulatedDevice]:
+    """Devices from a hostname,ip,model CSV (the same file the app loads)"""
+    devices = []
+    with open(filepath, newline='') as f:
+        for row in csv.DictReader(f):
+            model = row.get('model', row.get('device_model', '')) or 'C9300-48P'
+            devices.append(SimulatedDevice(row['hostname'], row['ip'], model, platform_for_model(model)))
+    return devices
+
+def generate_devices(count: int, prefix: str = 'sim', first_ip: str = '127.1.0.1') -> List[SimulatedDevice]:
+    """count devices on consecutive loopback addresses, cycling through the platforms"""
+    models = [('C9300-48P', 'cisco_ios_xe'), ('WS-C2960X-48', 'cisco_ios'), ('N9K-C93180YC', 'cisco_nxos')]
+    a, b, c, d = (int(octet) for octet in first_ip.split('.'))
+    start = (a << 24) | (b << 16) | (c << 8) | d
+    devices = []
+    for index in range(count):
+        address = start + index
+        model, platform = models[index % len(models)]
+        devices.append(SimulatedDevice(
+            hostname=f"{prefix}{index + 1:05d}",
+            ip='.'.join(str((address >> shift) & 255) for shift in (24, 16, 8, 0)),
+            model=model,
+            platform=platform
+        ))
+    return devices
+
+def write_inventory(devices: List[SimulatedDevice], filepath: str):
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['hostname', 'ip', 'model'])
+        for device in devices:
+            writer.writerow([device.hostname, device.ip, device.model])
+
+def command_filename(command: str) -> str:
+    """Fixture file name for a command, e.g. show_ip_route.txt"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', command.strip().lower()).strip('_') + '.txt'
+
+class FixtureStore:
+    """
+    Command outputs read from <directory>/<hostname>/<command>.txt, falling
+    back to <directory>/_default/<command>.txt and then to built-in outputs.
+    Files are read on every request so large fixtures are not held in memory.
+    """
+    DEFAULT_DIR = '_default'
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+
+    def output(self, device: SimulatedDevice, command: str) -> Optional[str]:
+        """
+        Output for a full command, or None if the device does not know it
+        "| include/exclude/begin" filters are applied unless a fixture
+        exists for the whole command line.
+        """
+        output = self._lookup(device, command)
+        if output is None and '|' in command:
+            command, _, pipe = command.partition('|')
+            output = self._lookup(device, command)
+            if output is not None:
+                output = apply_pipe(output, pipe)
+        return output
+
+    def _lookup(self, device: SimulatedDevice, command: str) -> Optional[str]:
+        if self.directory is not None:
+            name = command_filename(command)
+            for folder in (device.hostname, self.DEFAULT_DIR):
+                path = self.directory / folder / name
+                if path.is_file():
+                    return path.read_text()
+        return builtin_output(device, command)
+
+def apply_pipe(output: str, pipe: str) -> Optional[str]:
+    """IOS output modifiers; None for one the simulator does not support"""
+    keyword, _, pattern = pipe.strip().partition(' ')
+    # Keywords may be abbreviated (inc, ex, b)
+    keyword = keyword.lower() or '?'
+    regex = re.compile(pattern.strip())
+    lines = output.splitlines()
+    if 'include'.startswith(keyword):
+        lines = [line for line in lines if regex.search(line)]
+    elif 'exclude'.startswith(keyword):
+        lines = [line for line in lines if not regex.search(line)]
+    elif 'begin'.startswith(keyword):
+        start = next((index for index, line in enumerate(lines) if regex.search(line)), len(lines))
+        lines = lines[start:]
+    else:
+        return None
+    return "\n".join(lines) + ("\n" if lines else "")
+
+def builtin_output(device: SimulatedDevice, command: str) -> Optional[str]:
+    command = ' '.join(command.split()).lower()
+    builder = BUILTIN_COMMANDS.get(command)
+    return builder(device) if builder else None
+
+def _show_version(device: SimulatedDevice) -> str:
+    if device.platform == 'cisco_nxos':
+        return (
+            "Cisco Nexus Operating System (NX-OS) Software\n"
+            "Software\n"
+            "  NXOS: version 9.3(10)\n"
+            "Hardware\n"
+            f"  cisco Nexus9000 {device.model} Chassis\n"
+            f"  Device name: {device.prompt_name}\n"
+            "Kernel uptime is 120 day(s), 4 hour(s), 2 minute(s), 11 second(s)\n"
+        )
+    software = "IOS-XE Software, Version 17.09.04a" if device.platform == 'cisco_ios_xe' \
+        else "IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E9"
+    return (
+        f"Cisco {software}, RELEASE SOFTWARE (fc1)\n"
+        "Copyright (c) 1986-2023 by Cisco Systems, Inc.\n"
+        f"{device.prompt_name} uptime is 20 weeks, 3 days, 4 hours, 2 minutes\n"
+        'System image file is "flash:packages.conf"\n'
+        f"cisco {device.model} processor with 1343271K/6147K bytes of memory.\n"
+        "Configuration register is 0x102\n"
+    )
+
+def _show_vlan_brief(device: SimulatedDevice) -> str:
+    return (
+        "\nVLAN Name                             Status    Ports\n"
+        "---- -------------------------------- --------- -------------------------------\n"
+        "1    default                          active    Gi1/0/1, Gi1/0/2, Gi1/0/3\n"
+        "1002 fddi-default                     act/unsup \n"
+        "1003 token-ring-default               act/unsup \n"
+    )
+
+def _show_ip_route(device: SimulatedDevice) -> str:
+    return (
+        "Codes: L - local, C - connected, S - static, O - OSPF, B - BGP\n"
+        "Gateway of last resort is not set\n\n"
+        f"      {device.ip}/32 is subnetted, 1 subnets\n"
+        f"C        {device.ip} is directly connected, Loopback0\n"
+    )
+
+def _show_running_config(device: SimulatedDevice) -> str:
+    return (
+        "Building configuration...\n\n"
+        "Current configuration : 512 bytes\n!\n"
+        f"hostname {device.prompt_name}\n!\n"
+        "service password-encryption\n!\n"
+        "interface Loopback0\n"
+        f" ip address {device.ip} 255.255.255.255\n!\n"
+        "line vty 0 4\n transport input ssh\n!\nend\n"
+    )
+
+BUILTIN_COMMANDS = {
+    'show version': _show_version,
+    'show vlan brief': _show_vlan_brief,
+    'show ip route': _show_ip_route,
+    'show running-config': _show_running_config,
+    'show cdp neighbors detail': lambda device: "",
+    'show lldp neighbors detail': lambda device: "",
+    'show clock': lambda device: "*12:00:00.000 UTC Mon Jan 1 2024\n",
+}
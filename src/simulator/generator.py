@@ -0,0 +1,438 @@
+"""
+Synthetic network generator
+
+    python -m src.simulator.generator out/ --devices 10000 --topology tree --routes 1000000
+
+Writes a consistent network for the simulator and the benchmarks:
+
+    out/inventory.csv                    hostname,ip,model
+    out/fixtures/<hostname>/*.txt        CDP/LLDP neighbors, show vlan brief,
+                                         show ip route and show running-config
+    out/fixtures/_default/show_ip_route.txt  the core routers' full table
+    out/micetro_ranges.json              Micetro /api/v1/ranges response
+    out/supernets.yaml                   supernets covering the routed space
+    out/manifest.json                    settings, core routers and counts
+
+Neighbor outputs on both ends of a link name the same interfaces, the
+running-config describes them, and the IPAM ranges are the routed
+prefixes with a configurable drift either way. Everything is derived from
+the seed, so the same settings always give the same network.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+from dataclasses import asdict, dataclass, replace
+from ipaddress import IPv4Address, IPv4Network
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import yaml
+from src.simulator.devices import (FixtureStore, SimulatedDevice, command_filename, generate_devices,
+                                   platform_for_model, write_inventory)
+
+TOPOLOGIES = ('tree', 'leaf-spine', 'ring')
+
+# Models per role; core routers stay IOS-XE so their tables parse the same way
+CORE_MODEL = 'ASR1001-X'
+SPINE_MODEL = 'N9K-C9364C'
+LEAF_MODEL = 'N9K-C93180YC'
+ACCESS_MODELS = ('C9300-48P', 'WS-C2960X-48')
+
+# Space the routing table is carved from, in order
+ROUTED_SPACE = (IPv4Network('10.0.0.0/8'), IPv4Network('172.16.0.0/12'))
+# IPAM-only ranges outside the supernets
+UNROUTED_SPACE = IPv4Network('100.64.0.0/10')
+SUPERNETS = ('10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16')
+MAX_ROUTES = 2000000
+
+@dataclass
+class NetworkSpec:
+    devices: int = 100
+    topology: str = 'tree'
+    # Children per device in a tree, spines in a leaf-spine
+    fanout: int = 4
+    core_routers: int = 2
+    # Prefixes in the core routers' table
+    routes: int = 10000
+    # VLANs on each access switch
+    vlans: int = 20
+    # Share of routed prefixes missing from IPAM, and of extra IPAM-only ranges
+    ipam_drift: float = 0.05
+    # Chance that a device breaks each default audit rule
+    violation_rate: float = 0.1
+    seed: int = 0
+    prefix: str = 'sim'
+    first_ip: str = '127.1.0.1'
+
+@dataclass
+class Link:
+    a: int
+    a_interface: str
+    b: int
+    b_interface: str
+
+class SyntheticNetwork:
+    """Devices, roles and links for a NetworkSpec; write() renders the fixtures"""
+
+    def __init__(self, spec: NetworkSpec):
+        if spec.topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology: {spec.topology}")
+        if not 0 < spec.routes <= MAX_ROUTES:
+            raise ValueError(f"Routes must be between 1 and {MAX_ROUTES}")
+        self.spec = spec
+        self.roles: List[str] = []
+        self.devices: List[SimulatedDevice] = []
+        for index, device in enumerate(generate_devices(spec.devices, spec.prefix, spec.first_ip)):
+            role = self._role(index)
+            model = {'core': CORE_MODEL, 'spine': SPINE_MODEL, 'leaf': LEAF_MODEL}.get(
+                role, ACCESS_MODELS[index % len(ACCESS_MODELS)])
+            self.roles.append(role)
+            self.devices.append(replace(device, model=model, platform=platform_for_model(model)))
+        self._ports: List[int] = [0] * len(self.devices)
+        self.links: List[Link] = []
+        self._build_links()
+
+    @property
+    def core_routers(self) -> List[SimulatedDevice]:
+        return [device for device, role in zip(self.devices, self.roles) if role == 'core']
+
+    def _role(self, index: int) -> str:
+        spec = self.spec
+        if index < spec.core_routers:
+            return 'core'
+        if spec.topology == 'leaf-spine':
+            return 'spine' if index < spec.core_routers + spec.fanout else 'leaf'
+        return 'access'
+
+    def _interface(self, index: int) -> str:
+        """Next free port on a device"""
+        self._ports[index] += 1
+        port = self._ports[index]
+        if self.devices[index].platform == 'cisco_nxos':
+            return f"Ethernet1/{port}"
+        return f"GigabitEthernet{(port - 1) // 48 + 1}/0/{(port - 1) % 48 + 1}"
+
+    def _link(self, a: int, b: int):
+        self.links.append(Link(a, self._interface(a), b, self._interface(b)))
+
+    def _build_links(self):
+        spec, count = self.spec, len(self.devices)
+        cores = min(spec.core_routers, count)
+        # The core routers are fully meshed
+        for a in range(cores):
+            for b in range(a + 1, cores):
+                self._link(a, b)
+        if spec.topology == 'tree':
+            # Numbered breadth first: the cores (or the first device) are the top level
+            fanout = max(1, spec.fanout)
+            top = cores or 1
+            for index in range(top, count):
+                self._link((index - top) // fanout if cores else (index - 1) // fanout, index)
+        elif spec.topology == 'leaf-spine':
+            spines = range(cores, min(cores + spec.fanout, count))
+            for spine in spines:
+                for core in range(cores):
+                    self._link(core, spine)
+            for leaf in range(cores + len(spines), count):
+                for spine in spines:
+                    self._link(spine, leaf)
+        else:
+            # A ring of the other devices, each core attached to one of them
+            ring = range(cores, count)
+            for index in ring[1:]:
+                self._link(index - 1, index)
+            if len(ring) > 2:
+                self._link(ring[-1], ring[0])
+            for core in range(min(cores, len(ring))):
+                self._link(core, ring[core * len(ring) // cores])
+
+    def neighbors(self) -> Dict[int, List[Tuple[str, int, str]]]:
+        """Per device: (local interface, neighbor index, neighbor interface)"""
+        neighbors: Dict[int, List[Tuple[str, int, str]]] = {index: [] for index in range(len(self.devices))}
+        for link in self.links:
+            neighbors[link.a].append((link.a_interface, link.b, link.b_interface))
+            neighbors[link.b].append((link.b_interface, link.a, link.a_interface))
+        return neighbors
+
+    def routed_prefixes(self) -> Iterator[IPv4Network]:
+        """The core table: spec.routes prefixes of mixed length, as large as the space allows"""
+        total = sum(network.num_addresses for network in ROUTED_SPACE)
+        # Shortest length for which every prefix fits, even with alignment gaps
+        shortest = min(30, max(8, 33 - int(math.log2(total // self.spec.routes))))
+        rng = random.Random(self.spec.seed + 1)
+        spaces = iter(ROUTED_SPACE)
+        space = next(spaces)
+        cursor = int(space.network_address)
+        for _ in range(self.spec.routes):
+            length = rng.randint(shortest, min(30, shortest + 4))
+            size = 1 << (32 - length)
+            cursor = (cursor + size - 1) // size * size
+            if cursor + size > int(space.broadcast_address) + 1:
+                space = next(spaces)
+                cursor = int(space.network_address)
+            yield IPv4Network((cursor, length))
+            cursor += size
+
+    def write(self, directory: str) -> Dict:
+        """Write every file into directory; returns the manifest"""
+        out = Path(directory)
+        fixtures = out / 'fixtures'
+        fixtures.mkdir(parents=True, exist_ok=True)
+        write_inventory(self.devices, str(out / 'inventory.csv'))
+
+        neighbors = self.neighbors()
+        for index, device in enumerate(self.devices):
+            folder = fixtures / device.hostname
+            folder.mkdir(exist_ok=True)
+            links = neighbors[index]
+            files = {
+                'show cdp neighbors detail': self.cdp_neighbors(links),
+                'show lldp neighbors detail': self.lldp_neighbors(links),
+                'show vlan brief': self.vlan_brief(index),
+                'show running-config': self.running_config(index, links),
+            }
+            if self.roles[index] != 'core':
+                files['show ip route'] = self.device_routes(index, links)
+            for command, text in files.items():
+                (folder / command_filename(command)).write_text(text)
+
+        # Only the core routers read the full table
+        default = fixtures / FixtureStore.DEFAULT_DIR
+        default.mkdir(exist_ok=True)
+        with open(default / command_filename('show ip route'), 'w') as f:
+            for chunk in self.route_table():
+                f.write(chunk)
+
+        ranges = self.write_ranges(out / 'micetro_ranges.json')
+        with open(out / 'supernets.yaml', 'w') as f:
+            yaml.dump({'supernets': list(SUPERNETS)}, f, default_flow_style=False)
+
+        manifest = {
+            'spec': asdict(self.spec),
+            'devices': len(self.devices),
+            'links': len(self.links),
+            'core_routers': [device.hostname for device in self.core_routers],
+            'routes': self.spec.routes,
+            'ipam_ranges': ranges,
+        }
+        (out / 'manifest.json').write_text(json.dumps(manifest, indent=2) + "\n")
+        return manifest
+
+    def cdp_neighbors(self, links: List[Tuple[str, int, str]]) -> str:
+        entries = []
+        for local, index, remote in links:
+            device = self.devices[index]
+            platform = f"cisco Nexus9000 {device.model}" if device.platform == 'cisco_nxos' \
+                else f"cisco {device.model}"
+            entries.append(
+                "-------------------------\n"
+                f"Device ID: {device.hostname}\n"
+                "Entry address(es): \n"
+                f"  IP address: {device.ip}\n"
+                f"Platform: {platform},  Capabilities: Router Switch IGMP \n"
+                f"Interface: {local},  Port ID (outgoing port): {remote}\n"
+                "Holdtime : 142 sec\n\n"
+            )
+        return ''.join(entries) + (f"\nTotal cdp entries displayed : {len(links)}\n" if links else "")
+
+    def lldp_neighbors(self, links: List[Tuple[str, int, str]]) -> str:
+        entries = []
+        for local, index, remote in links:
+            device = self.devices[index]
+            entries.append(
+                "------------------------------------------------\n"
+                f"Local Intf: {local}\n"
+                f"Chassis id: {self._mac(index)}\n"
+                f"Port id: {remote}\n"
+                "Port Description: uplink\n"
+                f"System Name: {device.hostname}\n\n"
+                "System Capabilities: B,R\n"
+                "Enabled Capabilities: B,R\n\n"
+                "Management Addresses:\n"
+                f"    IP: {device.ip}\n\n"
+            )
+        return ''.join(entries) + f"\nTotal entries displayed: {len(links)}\n"
+
+    def vlan_brief(self, index: int) -> str:
+        lines = [
+            "",
+            "VLAN Name                             Status    Ports",
+            "---- -------------------------------- --------- -------------------------------",
+        ]
+        access = self.roles[index] in ('access', 'leaf')
+        vlans = self.spec.vlans if access else 0
+        ports = [f"Gi1/0/{port}" for port in range(1, 48)]
+        per_vlan = max(1, len(ports) // (vlans + 1))
+        lines.append(f"{1:<4} {'default':<32} {'active':<9} {', '.join(ports[:per_vlan][:6])}".rstrip())
+        for number in range(vlans):
+            vlan_id = 100 + number * 10
+            members = ports[(number + 1) * per_vlan:(number + 2) * per_vlan][:6]
+            lines.append(f"{vlan_id:<4} {f'VLAN{vlan_id:04d}-USERS':<32} {'active':<9} {', '.join(members)}".rstrip())
+        for vlan_id, name in ((1002, 'fddi-default'), (1003, 'token-ring-default'),
+                              (1004, 'fddinet-default'), (1005, 'trnet-default')):
+            lines.append(f"{vlan_id:<4} {name:<32} act/unsup")
+        return "\n".join(lines) + "\n"
+
+    def running_config(self, index: int, links: List[Tuple[str, int, str]]) -> str:
+        device = self.devices[index]
+        # A separate stream per device keeps configs stable when other settings change
+        rng = random.Random(f"{self.spec.seed}:{device.hostname}")
+        rate = self.spec.violation_rate
+        weak_password = rng.random() < rate
+        telnet = rng.random() < rate
+        public_snmp = rng.random() < rate
+
+        lines = [
+            "Building configuration...", "",
+            "Current configuration : 8192 bytes", "!",
+            "version 17.9",
+            "service timestamps log datetime msec",
+            "no service password-encryption" if weak_password else "service password-encryption",
+            "!", f"hostname {device.prompt_name}", "!",
+            "username admin privilege 15 password 0 cisco123" if weak_password
+            else "username admin privilege 15 secret 9 $9$2MJBozw/9R3UsU$0yGHjN6Rk",
+            "!",
+        ]
+        if self.roles[index] in ('access', 'leaf'):
+            for number in range(self.spec.vlans):
+                vlan_id = 100 + number * 10
+                lines += [f"vlan {vlan_id}", f" name VLAN{vlan_id:04d}-USERS", "!"]
+        lines += ["interface Loopback0", f" ip address {device.ip} 255.255.255.255", "!"]
+        for local, neighbor, remote in links:
+            lines += [
+                f"interface {local}",
+                f" description to {self.devices[neighbor].hostname} {remote}",
+                " switchport mode trunk" if self.roles[index] != 'core' else " no switchport",
+                "!",
+            ]
+        lines += [
+            f"snmp-server community {'public' if public_snmp else f'nt{rng.getrandbits(32):08x}'} RO",
+            "!", "line con 0", " exec-timeout 5 0",
+            "line vty 0 4", " login local",
+            f" transport input {'telnet ssh' if telnet else 'ssh'}",
+            "!", "end",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def device_routes(self, index: int, links: List[Tuple[str, int, str]]) -> str:
+        """A non-core device's small table: default route, loopback and its links"""
+        device = self.devices[index]
+        lines = [
+            "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP",
+            "       O - OSPF, IA - OSPF inter area, * - candidate default",
+            "",
+            "Gateway of last resort is 10.255.255.1 to network 0.0.0.0",
+            "",
+            "S*    0.0.0.0/0 [1/0] via 10.255.255.1",
+            f"C        {device.ip}/32 is directly connected, Loopback0",
+        ]
+        for number, (local, _, _) in enumerate(links[:64]):
+            network = IPv4Network((int(IPv4Address('10.254.0.0')) + ((index * 64 + number) % 16384) * 4, 30))
+            lines.append(f"C        {network} is directly connected, {local}")
+        return "\n".join(lines) + "\n"
+
+    def route_table(self) -> Iterator[str]:
+        """The core table in IOS format, in chunks"""
+        yield (
+            "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP\n"
+            "       D - EIGRP, EX - EIGRP external, O - OSPF, IA - OSPF inter area\n"
+            "       * - candidate default, U - per-user static route\n\n"
+            "Gateway of last resort is 10.255.255.1 to network 0.0.0.0\n\n"
+            "S*    0.0.0.0/0 [1/0] via 10.255.255.1\n"
+        )
+        rng = random.Random(self.spec.seed + 2)
+        chunk: List[str] = []
+        major = None
+        for network in self.routed_prefixes():
+            octet = network.network_address.packed[0]
+            if octet != major:
+                major = octet
+                chunk.append(f"      {octet}.0.0.0/8 is variably subnetted\n")
+            choice = rng.random()
+            hop = f"10.255.{rng.randint(0, 3)}.{rng.randint(1, 254)}"
+            if choice < 0.6:
+                chunk.append(f"O IA     {network} [110/{rng.randint(2, 200)}] via {hop}, 2w3d, "
+                             f"TenGigabitEthernet0/1/{rng.randint(0, 3)}\n")
+            elif choice < 0.9:
+                chunk.append(f"B        {network} [20/0] via {hop}, 5w1d\n")
+            elif choice < 0.97:
+                chunk.append(f"S        {network} [1/0] via {hop}\n")
+            else:
+                chunk.append(f"D EX     {network} [170/2816] via {hop}, 1d04h, Port-channel1\n")
+            if len(chunk) >= 10000:
+                yield ''.join(chunk)
+                chunk = []
+        yield ''.join(chunk)
+
+    def write_ranges(self, path: Path) -> int:
+        """Micetro ranges JSON for the routed prefixes with the spec's drift; returns the range count"""
+        rng = random.Random(self.spec.seed + 3)
+        drift = self.spec.ipam_drift
+        count = 0
+        with open(path, 'w') as f:
+            f.write('{"result": {"ranges": [\n')
+
+            def record(network: IPv4Network):
+                nonlocal count
+                f.write(("" if not count else ",\n") + json.dumps({
+                    'ref': f"Ranges/{count + 1}",
+                    'name': str(network),
+                    'from': str(network.network_address),
+                    'to': str(network.broadcast_address),
+                    'netmask': str(network.netmask),
+                    'lastModified': "2024-01-01T00:00:00Z",
+                }))
+                count += 1
+
+            extras = 0
+            for network in self.routed_prefixes():
+                if rng.random() >= drift:
+                    record(network)
+                # Ranges nobody routes, outside the supernets
+                if rng.random() < drift:
+                    record(IPv4Network((int(UNROUTED_SPACE.network_address) + extras * 256, 24)))
+                    extras += 1
+            f.write(f'\n], "totalResults": {count}}}}}\n')
+        return count
+
+    def _mac(self, index: int) -> str:
+        value = 0x00AA00000000 + index
+        return '.'.join(f"{(value >> shift) & 0xFFFF:04x}" for shift in (32, 16, 0))
+
+def build_parser() -> argparse.ArgumentParser:
+    defaults = NetworkSpec()
+    parser = argparse.ArgumentParser(prog='python -m src.simulator.generator',
+                                     description="Generate a synthetic network for the simulator")
+    parser.add_argument('output', help="Directory to write into")
+    parser.add_argument('-n', '--devices', type=int, default=defaults.devices)
+    parser.add_argument('-t', '--topology', choices=TOPOLOGIES, default=defaults.topology)
+    parser.add_argument('--fanout', type=int, default=defaults.fanout,
+                        help="Children per device (tree) or spine count (leaf-spine)")
+    parser.add_argument('--core-routers', type=int, default=defaults.core_routers)
+    parser.add_argument('--routes', type=int, default=defaults.routes,
+                        help=f"Prefixes in the core routers' table (up to {MAX_ROUTES})")
+    parser.add_argument('--vlans', type=int, default=defaults.vlans, help="VLANs per access switch")
+    parser.add_argument('--ipam-drift', type=float, default=defaults.ipam_drift,
+                        help="Share of prefixes missing from, and extra in, the IPAM ranges")
+    parser.add_argument('--violation-rate', type=float, default=defaults.violation_rate,
+                        help="Chance of each audit rule failing per device")
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--prefix', default=defaults.prefix, help="Hostname prefix")
+    parser.add_argument('--first-ip', default=defaults.first_ip)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = vars(build_parser().parse_args(argv))
+    output = args.pop('output')
+    try:
+        manifest = SyntheticNetwork(NetworkSpec(**args)).write(output)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Wrote {manifest['devices']} devices, {manifest['links']} links, {manifest['routes']} routes "
+          f"and {manifest['ipam_ranges']} IPAM ranges to {output}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import logging
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+import paramiko
+from src.simulator.devices import FixtureStore, SimulatedDevice
+
+logger = logging.getLogger(__name__)
+
+HOST_KEY_FILE = Path.home() / '.networktools' / 'simulator_host_key'
+
+@dataclass
+class FaultSettings:
+    """Latency, bandwidth and failure injection; rates are probabilities from 0 to 1"""
+    # Seconds before each command's output, plus or minus up to jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Seconds before a login is answered, as a slow AAA server would
+    login_latency: float = 0.0
+    # Output bytes per second per session, 0 for unlimited
+    bandwidth: int = 0
+    # Connections closed before the SSH banner
+    refuse_rate: float = 0.0
+    auth_failure_rate: float = 0.0
+    # Sessions dropped part way through a command's output
+    drop_rate: float = 0.0
+    # Commands that never answer; the session stays silent until the client gives up
+    hang_rate: float = 0.0
+    seed: Optional[int] = None
+
+@dataclass
+class SimulatorStats:
+    sessions_open: int = 0
+    sessions_total: int = 0
+    peak_sessions: int = 0
+    refused: int = 0
+    auth_failures: int = 0
+    commands: int = 0
+    dropped: int = 0
+    hung: int = 0
+    bytes_sent: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **counts: int):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+            self.peak_sessions = max(self.peak_sessions, self.sessions_open)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: value for name, value in vars(self).items() if not name.startswith('_')}
+
+def load_host_key(path: Path = HOST_KEY_FILE) -> paramiko.PKey:
+    """The simulator's RSA host key, generated on first use"""
+    if path.exists():
+        return paramiko.RSAKey(filename=str(path))
+    key = paramiko.RSAKey.generate(2048)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    key.write_private_key_file(str(path))
+    return key
+
+class SimulatorServer:
+    """
+    SSH server impersonating many Cisco devices on one port
+
+    Every device has its own loopback address (127.x.y.z); the device a
+    client reached is taken from the address it connected to, so
+    thousands of devices share one listening socket. Each session uses two
+    threads (paramiko's transport thread and the CLI loop).
+    """
+
+    def __init__(self, devices: Iterable[SimulatedDevice], port: int = 2222,
+                 fixtures: Optional[FixtureStore] = None, faults: Optional[FaultSettings] = None,
+                 credentials: Optional[Tuple[str, str]] = None, host: str = '0.0.0.0',
+                 allow_remote: bool = False, host_key: Optional[paramiko.PKey] = None):
+        self.devices: Dict[str, SimulatedDevice] = {device.ip: device for device in devices}
+        self.port = port
+        self.host = host
+        self.fixtures = fixtures or FixtureStore()
+        self.faults = faults or FaultSettings()
+        # None accepts any username and password
+        self.credentials = credentials
+        self.allow_remote = allow_remote
+        self.host_key = host_key or load_host_key()
+        self.stats = SimulatorStats()
+        self._seed = random.Random(self.faults.seed)
+        self._stopping = threading.Event()
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._transports: Set[paramiko.Transport] = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(4096)
+        # Port 0 picks a free port
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept_loop, name='simulator-accept', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._socket is not None:
+            self._socket.close()
+        with self._lock:
+            transports = list(self._transports)
+        for transport in transports:
+            transport.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _accept_loop(self):
+        while not self._stopping.is_set():
+            try:
+                client, peer = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(client, peer), daemon=True).start()
+
+    def _handle(self, client: socket.socket, peer):
+        local_ip = client.getsockname()[0]
+        device = self.devices.get(local_ip)
+        if device is None and len(self.devices) == 1:
+            device = next(iter(self.devices.values()))
+        with self._lock:
+            rng = random.Random(self._seed.random())
+        if (device is None or (not self.allow_remote and not peer[0].startswith('127.'))
+                or rng.random() < self.faults.refuse_rate):
+            self.stats.add(refused=1)
+            client.close()
+            return
+
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        interface = _SshInterface(self, device, rng)
+        with self._lock:
+            self._transports.add(transport)
+        self.stats.add(sessions_open=1, sessions_total=1)
+        try:
+            transport.start_server(server=interface)
+            # Give up as soon as the client leaves (e.g. after a failed login)
+            channel = None
+            deadline = time.monotonic() + 30
+            while channel is None and transport.is_active() and time.monotonic() < deadline:
+                channel = transport.accept(timeout=1)
+            if channel is not None and interface.shell.wait(timeout=30):
+                CliSession(self, channel, device, rng).run()
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            logger.debug(f"Session to {device.hostname} ended: {e}")
+        finally:
+            transport.close()
+            with self._lock:
+                self._transports.discard(transport)
+            self.stats.add(sessions_open=-1)
+
+class _SshInterface(paramiko.ServerInterface):
+    def __init__(self, server: SimulatorServer, device: SimulatedDevice, rng: random.Random):
+        self.server = server
+        self.device = device
+        self.rng = rng
+        self.shell = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        faults = self.server.faults
+        if faults.login_latency:
+            time.sleep(faults.login_latency)
+        credentials = self.server.credentials
+        if (credentials is not None and (username, password) != credentials) \
+                or self.rng.random() < faults.auth_failure_rate:
+            self.server.stats.add(auth_failures=1)
+            return paramiko.AUTH_FAILED
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+class CliSession:
+    """Line-based IOS / IOS-XE / NX-OS exec shell on one channel"""
+    MORE = " --More-- "
+    # What IOS prints to wipe the --More-- prompt
+    MORE_ERASE = "\b" * 10 + " " * 10 + "\b" * 10
+
+    def __init__(self, server: SimulatorServer, channel: paramiko.Channel, device: SimulatedDevice,
+                 rng: random.Random):
+        self.server = server
+        self.channel = channel
+        self.device = device
+        self.rng = rng
+        self.nxos = device.platform == 'cisco_nxos'
+        # NX-OS has no separate enable level
+        self.privileged = device.privileged or self.nxos
+        self.config_mode = False
+        self.terminal_length = 24
+        self._pending = ''
+
+    @property
+    def prompt(self) -> str:
+        if self.config_mode:
+            return f"{self.device.prompt_name}(config)#"
+        return f"{self.device.prompt_name}{'#' if self.privileged else '>'}"
+
+    def run(self):
+        self._send(f"\r\n{self.prompt}")
+        while True:
+            line = self._read_line()
+            if line is None:
+                return
+            if not self._execute(line.strip()):
+                return
+            # The line end was already echoed
+            self._send(self.prompt)
+
+    def _read_line(self, echo: bool = True) -> Optional[str]:
+        """Next input line, echoed as the device reads it, like a terminal would"""
+        while True:
+            for index, char in enumerate(self._pending):
+                if char in '\r\n':
+                    line = self._pending[:index]
+                    rest = self._pending[index + 1:]
+                    if char == '\r' and rest.startswith('\n'):
+                        rest = rest[1:]
+                    self._pending = rest
+                    if echo:
+                        self._send(line + '\r\n')
+                    return line
+            data = self.channel.recv(4096)
+            if not data:
+                return None
+            self._pending += data.decode('utf-8', errors='replace')
+
+    def _execute(self, line: str) -> bool:
+        """Run one command line; False once the session should end"""
+        words = line.lower().split()
+        if not words:
+            return True
+        self.server.stats.add(commands=1)
+        command = ' '.join(words)
+
+        if words[0] in ('exit', 'quit', 'logout') and not self.config_mode:
+            return False
+        if self.config_mode:
+            if words[0] in ('end', 'exit'):
+                self.config_mode = False
+            return True
+        if len(words) >= 2 and 'terminal'.startswith(words[0]) and words[0].startswith('te'):
+            if 'length'.startswith(words[1]) and len(words) > 2 and words[2].isdigit():
+                self.terminal_length = int(words[2])
+            return True
+        if command in ('enable', 'en'):
+            return self._enable()
+        if command == 'disable':
+            self.privileged = self.nxos
+            return True
+        if command in ('configure terminal', 'conf t', 'config t') and self.privileged:
+            self.config_mode = True
+            return True
+
+        output = None
+        if self.privileged or 'running-config' not in command:
+            output = self.server.fixtures.output(self.device, line)
+        if output is None:
+            marker = "Invalid command" if self.nxos else "Invalid input detected"
+            self._send(f"{' ' * (len(self.prompt) - 1)}^\r\n% {marker} at '^' marker.\r\n\r\n")
+            return True
+        return self._respond(output)
+
+    def _enable(self) -> bool:
+        if self.privileged:
+            return True
+        self._send("Password: ")
+        password = self._read_line(echo=False)
+        if password is None:
+            return False
+        self._send("\r\n")
+        credentials = self.server.credentials
+        if credentials is None or password == credentials[1]:
+            self.privileged = True
+        else:
+            self._send("% Access denied\r\n\r\n")
+        return True
+
+    def _respond(self, output: str) -> bool:
+        """Send a command's output with the configured latency, paging and faults"""
+        faults = self.server.faults
+        delay = faults.latency + (self.rng.uniform(-faults.jitter, faults.jitter) if faults.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        if faults.hang_rate and self.rng.random() < faults.hang_rate:
+            self.server.stats.add(hung=1)
+            # Say nothing until the client closes the session
+            while self.channel.recv(4096):
+                pass
+            return False
+
+        lines = output.replace('\r\n', '\n').split('\n')
+        if lines and lines[-1] == '':
+            lines.pop()
+        drop_at = None
+        if faults.drop_rate and self.rng.random() < faults.drop_rate:
+            drop_at = self.rng.randrange(len(lines) + 1)
+
+        page = self.terminal_length if self.terminal_length > 0 else len(lines) + 1
+        position = 0
+        while position < len(lines):
+            chunk = lines[position:position + page]
+            if drop_at is not None and position + len(chunk) > drop_at:
+                self._send(''.join(line + '\r\n' for line in lines[position:drop_at]))
+                self.server.stats.add(dropped=1)
+                return False
+            self._send(''.join(line + '\r\n' for line in chunk))
+            position += len(chunk)
+            if position < len(lines):
+                self._send(self.MORE)
+                key = self.channel.recv(1)
+                self._send(self.MORE_ERASE)
+                if not key or key in (b'q', b'Q'):
+                    break
+                # Return shows one more line, anything else a full page
+                page = 1 if key in (b'\r', b'\n') else (self.terminal_length or len(lines))
+        return True
+
+    def _send(self, text: str):
+        data = text.encode('utf-8', errors='replace')
+        bandwidth = self.server.faults.bandwidth
+        if not bandwidth:
+            self.channel.sendall(data)
+        else:
+            step = max(512, bandwidth // 20)
+            for start in range(0, len(data), step):
+                chunk = data[start:start + step]
+                self.channel.sendall(chunk)
+                time.sleep(len(chunk) / bandwidth)
+        self.server.stats.add(bytes_sent=len(data))
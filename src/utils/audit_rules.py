@@ -1,3 +1,4 @@
+import re
 import yaml
 from typing import Dict, List, Optional
 from pathlib import Path
@@ -11,6 +12,10 @@ class AuditRule:
         self.severity = severity
         self.description = description
 
+def rule_matches(output: str, pattern: str) -> bool:
+    """True when a rule's pattern is found in its command's output"""
+    return re.search(pattern, output) is not None
+
 class AuditRuleManager:
     def __init__(self):
         # Get the project root directory (where main.py is located)
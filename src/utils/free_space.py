@@ -0,0 +1,222 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from ipaddress import IPv4Network
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.utils import subnet_tools
+from src.utils.route_validation import load_supernets
+
+def _block_size(prefixlen: int) -> int:
+    return 1 << (32 - prefixlen)
+
+def _to_key(network) -> Tuple[int, int]:
+    """(start, prefixlen) for a network given as a string, IPv4Network or key tuple"""
+    if isinstance(network, tuple):
+        return network
+    network = IPv4Network(network, strict=False)
+    return int(network.network_address), network.prefixlen
+
+class FreeSpaceIndex:
+    """
+    Unallocated space of one supernet, kept as maximal aligned CIDR blocks
+    bucketed by prefix length (a buddy allocator). Finding a free block of
+    a given size looks at no more than 33 buckets, allocating splits a
+    block in at most 32 steps and releasing merges buddies back.
+    """
+
+    def __init__(self, supernet, allocations: Iterable = ()):
+        self.supernet = IPv4Network(supernet)
+        self.first = int(self.supernet.network_address)
+        self.last = int(self.supernet.broadcast_address)
+        # prefixlen -> sorted block starts
+        self._free: List[List[int]] = [[] for _ in range(33)]
+        # (start, prefixlen) -> number of times allocated
+        self._allocations: Counter = Counter()
+        self._allocation_keys: List[Tuple[int, int]] = []
+        self._build(allocations)
+
+    def find_free(self, prefixlen: int) -> Optional[IPv4Network]:
+        """
+        Free block of the requested size, taken from the smallest free block
+        that fits (the lowest-addressed one of that size), so larger blocks
+        stay whole
+        """
+        if prefixlen < self.supernet.prefixlen or prefixlen > 32:
+            return None
+        for length in range(prefixlen, self.supernet.prefixlen - 1, -1):
+            if self._free[length]:
+                return IPv4Network((self._free[length][0], prefixlen))
+        return None
+
+    def free_blocks(self, max_prefixlen: int = 32) -> List[IPv4Network]:
+        """All free blocks at least as large as max_prefixlen, sorted by address"""
+        blocks = [(start, length) for length in range(self.supernet.prefixlen, max_prefixlen + 1)
+                  for start in self._free[length]]
+        return [IPv4Network(block) for block in sorted(blocks)]
+
+    def free_addresses(self) -> int:
+        return sum(len(starts) * _block_size(length) for length, starts in enumerate(self._free))
+
+    def allocate(self, network) -> bool:
+        """
+        Mark a network as allocated
+        Returns: False if it lies outside this supernet
+        """
+        key = self._clip(_to_key(network))
+        if key is None:
+            return False
+        if not self._allocations[key]:
+            insort(self._allocation_keys, key)
+        self._allocations[key] += 1
+        self._carve(*key)
+        return True
+
+    def release(self, network) -> bool:
+        """
+        Return a network to the free pool, keeping space still covered by
+        other allocations
+        Returns: False if the network was not allocated
+        """
+        key = self._clip(_to_key(network))
+        if key is None or not self._allocations[key]:
+            return False
+        self._allocations[key] -= 1
+        if self._allocations[key]:
+            return True
+        del self._allocations[key]
+        del self._allocation_keys[bisect_left(self._allocation_keys, key)]
+
+        start, prefixlen = key
+        # Still covered by a wider allocation
+        for length in range(prefixlen - 1, self.supernet.prefixlen - 1, -1):
+            if self._allocations.get(((start >> (32 - length)) << (32 - length), length)):
+                return True
+
+        # Free the gaps between the top-level allocations nested inside it
+        end = start + _block_size(prefixlen) - 1
+        cursor = start
+        low = bisect_left(self._allocation_keys, (start, 0))
+        high = bisect_right(self._allocation_keys, (end, 33))
+        for inner_start, inner_length in self._allocation_keys[low:high]:
+            if inner_start >= cursor:
+                self._free_range(cursor, inner_start - 1)
+                cursor = inner_start + _block_size(inner_length)
+            else:
+                cursor = max(cursor, inner_start + _block_size(inner_length))
+        self._free_range(cursor, end)
+        return True
+
+    def _build(self, allocations: Iterable):
+        """Bulk load: free space is the supernet minus the merged allocations"""
+        starts, ends = [], []
+        for network in allocations:
+            key = self._clip(_to_key(network))
+            if key is None:
+                continue
+            self._allocations[key] += 1
+            starts.append(key[0])
+            ends.append(key[0] + _block_size(key[1]) - 1)
+        self._allocation_keys = sorted(self._allocations)
+
+        merged_starts, merged_ends = subnet_tools.merge_ranges(
+            np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+        gap_starts = np.concatenate(([self.first], merged_ends + 1))
+        gap_ends = np.concatenate((merged_starts - 1, [self.last]))
+        keep = gap_starts <= gap_ends
+        block_starts, block_sizes = subnet_tools.ranges_to_cidrs(gap_starts[keep], gap_ends[keep])
+        lengths = 32 - np.log2(block_sizes).astype(np.int64)
+        for start, length in zip(block_starts.tolist(), lengths.tolist()):
+            self._free[length].append(start)
+
+    def _clip(self, key: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Restrict an allocation to this supernet, None if they do not overlap"""
+        start, prefixlen = key
+        if start > self.last or start + _block_size(prefixlen) - 1 < self.first:
+            return None
+        if prefixlen < self.supernet.prefixlen:
+            return self.first, self.supernet.prefixlen
+        return key
+
+    def _carve(self, start: int, prefixlen: int):
+        """Remove [start, start + size) from the free pool"""
+        # Free block containing the allocation: split it down to size
+        for length in range(prefixlen, self.supernet.prefixlen - 1, -1):
+            block = (start >> (32 - length)) << (32 - length)
+            if self._remove_free(block, length):
+                for split_length in range(length + 1, prefixlen + 1):
+                    half = _block_size(split_length)
+                    block_half = (start >> (32 - split_length)) << (32 - split_length)
+                    insort(self._free[split_length], block_half ^ half)
+                return
+
+        # Otherwise free blocks may sit inside the allocation
+        end = start + _block_size(prefixlen) - 1
+        for length in range(prefixlen + 1, 33):
+            starts = self._free[length]
+            del starts[bisect_left(starts, start):bisect_right(starts, end)]
+
+    def _free_range(self, start: int, end: int):
+        """Add an inclusive address range to the free pool, merging buddies"""
+        if start > end:
+            return
+        block_starts, block_sizes = subnet_tools.ranges_to_cidrs(
+            np.array([start], dtype=np.int64), np.array([end], dtype=np.int64))
+        for block, size in zip(block_starts.tolist(), block_sizes.tolist()):
+            length = 32 - (size.bit_length() - 1)
+            while length > self.supernet.prefixlen:
+                buddy = block ^ _block_size(length)
+                if not self._remove_free(buddy, length):
+                    break
+                block = min(block, buddy)
+                length -= 1
+            insort(self._free[length], block)
+
+    def _remove_free(self, start: int, length: int) -> bool:
+        starts = self._free[length]
+        index = bisect_left(starts, start)
+        if index < len(starts) and starts[index] == start:
+            del starts[index]
+            return True
+        return False
+
+class FreeSpaceFinder:
+    """Free-space indexes for every supernet in config/supernets.yaml"""
+
+    def __init__(self, supernets: Optional[Iterable] = None, allocations: Iterable = ()):
+        """allocations may be networks, strings or (start, prefixlen) tuples"""
+        if supernets is None:
+            supernets = load_supernets()
+        allocations = [_to_key(network) for network in allocations]
+        self.indexes: Dict[IPv4Network, FreeSpaceIndex] = {}
+        for supernet in supernets:
+            supernet = IPv4Network(supernet)
+            self.indexes[supernet] = FreeSpaceIndex(supernet, allocations)
+
+    def find_free(self, prefixlen: int, supernet=None) -> Optional[IPv4Network]:
+        """Next free block of the given size, in one supernet or the first that has room"""
+        for index in self._select(supernet):
+            block = index.find_free(prefixlen)
+            if block:
+                return block
+        return None
+
+    def allocate(self, network) -> bool:
+        return any([index.allocate(network) for index in self._select(None)])
+
+    def release(self, network) -> bool:
+        return any([index.release(network) for index in self._select(None)])
+
+    def apply_changes(self, changes):
+        """Apply an IpamMirror sync result"""
+        for network in changes.removed:
+            self.release(network)
+        for network in changes.added:
+            self.allocate(network)
+
+    def _select(self, supernet) -> List[FreeSpaceIndex]:
+        if supernet is None:
+            return list(self.indexes.values())
+        supernet = IPv4Network(supernet)
+        if supernet not in self.indexes:
+            raise ValueError(f"{supernet} is not a configured supernet")
+        return [self.indexes[supernet]]
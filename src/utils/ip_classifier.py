@@ -0,0 +1,223 @@
+import argparse
+import csv
+import sys
+import time
+import warnings
+from ipaddress import IPv4Address, IPv4Network
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from src.utils.lpm import flatten_prefixes
+
+CHUNK_BYTES = 16 * 1024 * 1024
+INVALID = -1
+
+class PrefixLabeler:
+    """Most-specific-prefix lookup for arrays of addresses via searchsorted"""
+
+    def __init__(self, prefixes: Iterable):
+        keys = []
+        for prefix in prefixes:
+            if isinstance(prefix, tuple):
+                keys.append(prefix)
+            else:
+                network = IPv4Network(prefix, strict=False)
+                keys.append((int(network.network_address), network.prefixlen))
+        starts, owners = flatten_prefixes(keys)
+        self.starts = np.array(starts, dtype=np.int64)
+        # Last label is the "no match" entry
+        self.no_match = len(keys)
+        self.owners = np.array([owner if owner >= 0 else self.no_match for owner in owners],
+                               dtype=np.int64)
+        self.labels = np.array([str(IPv4Network(key)) for key in keys] + [''], dtype=object)
+
+    def classify(self, addresses: np.ndarray) -> np.ndarray:
+        """Index into self.labels for every address (invalid addresses -> no match)"""
+        owners = self.owners[np.searchsorted(self.starts, addresses, side='right') - 1]
+        return np.where(addresses < 0, self.no_match, owners)
+
+class IpClassifier:
+    """Maps addresses to their Micetro range, allowed-subnet zone and supernet"""
+
+    CATEGORIES = ("range", "zone", "supernet")
+
+    def __init__(self, ranges: Iterable = (), zones: Iterable = (), supernets: Iterable = ()):
+        self.labelers = {
+            "range": PrefixLabeler(ranges),
+            "zone": PrefixLabeler(zones),
+            "supernet": PrefixLabeler(supernets)
+        }
+
+    @classmethod
+    def from_config(cls, micetro_url: Optional[str] = None) -> 'IpClassifier':
+        """Build from supernets.yaml, network_boundaries.yaml and the IPAM mirror of micetro_url"""
+        from src.utils.ipam_mirror import IpamMirror
+        from src.utils.network_validator import NetworkValidator
+        from src.utils.route_validation import load_supernets
+
+        ranges = []
+        mirror = IpamMirror.synced(micetro_url)
+        if mirror:
+            ranges = mirror.prefixes()
+            mirror.close()
+        return cls(ranges, NetworkValidator().allowed_subnets, load_supernets())
+
+    def classify(self, addresses: np.ndarray) -> Dict[str, np.ndarray]:
+        """Label indices per category for an array of integer addresses"""
+        return {name: labeler.classify(addresses) for name, labeler in self.labelers.items()}
+
+    def labels(self, category: str, indices: np.ndarray) -> np.ndarray:
+        return self.labelers[category].labels[indices]
+
+    def classify_file(self, input_path: str, output_path: Optional[str] = None,
+                      column: Optional[int] = None,
+                      on_chunk: Optional[Callable[[int], None]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Stream a file of addresses through the classifier
+        Writes ip,range,zone,supernet rows to output_path if given
+        on_chunk is called with the running address count after every chunk
+        Returns: per category, the number of addresses for each label
+        """
+        totals = {name: np.zeros(len(labeler.labels), dtype=np.int64)
+                  for name, labeler in self.labelers.items()}
+        output = open(output_path, 'w', newline='') if output_path else None
+        try:
+            if output:
+                output.write("ip," + ",".join(self.CATEGORIES) + "\n")
+            for lines, addresses in read_address_chunks(input_path, column):
+                indices = self.classify(addresses)
+                for name, index in indices.items():
+                    totals[name] += np.bincount(index, minlength=len(totals[name]))
+                if output:
+                    columns = [self.labels(name, indices[name]) for name in self.CATEGORIES]
+                    output.write("\n".join(map(",".join, zip(lines, *columns))) + "\n")
+                if on_chunk:
+                    on_chunk(int(totals["supernet"].sum()))
+        finally:
+            if output:
+                output.close()
+
+        return {name: {str(label) or "unmatched": int(count)
+                       for label, count in zip(self.labelers[name].labels, totals[name]) if count}
+                for name in self.CATEGORIES}
+
+def _well_formed(text: str, count: int) -> bool:
+    """
+    True if text is count space-separated dotted quads: digits and dots only,
+    three dots per entry, no empty octets. Otherwise the tokens of one entry
+    could be read as octets of its neighbours.
+    """
+    try:
+        data = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return False
+    if not len(data):
+        return False
+    is_dot = data == ord('.')
+    is_space = data == ord(' ')
+    is_digit = (data >= ord('0')) & (data <= ord('9'))
+    if not (is_dot | is_space | is_digit).all():
+        return False
+    boundaries = np.flatnonzero(is_space)
+    if len(boundaries) != count - 1:
+        return False
+    separator = is_dot | is_space
+    if separator[0] or separator[-1] or (separator[1:] & separator[:-1]).any():
+        return False
+    # Dots before each entry's end, from which the dots per entry
+    dots_before = np.searchsorted(np.flatnonzero(is_dot), np.append(boundaries, len(data)))
+    return bool((np.diff(dots_before, prepend=0) == 3).all())
+
+def _parse_octets(lines: List[str]) -> Optional[np.ndarray]:
+    """Parse a block of dotted quads in one numpy call, None if any entry is malformed"""
+    text = " ".join(lines)
+    if not _well_formed(text, len(lines)):
+        return None
+    try:
+        with warnings.catch_warnings():
+            # Older numpy warns and stops at the first unreadable token, newer raises
+            warnings.simplefilter('ignore')
+            octets = np.fromstring(text.replace('.', ' '), dtype=np.int64, sep=' ')
+    except ValueError:
+        return None
+    if len(octets) != 4 * len(lines) or octets.min() < 0 or octets.max() > 255:
+        return None
+    octets = octets.reshape(-1, 4)
+    return (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+
+def parse_addresses(lines: List[str]) -> np.ndarray:
+    """
+    Vectorized dotted-quad parsing. A block with malformed entries is
+    halved until the bad lines are isolated; those come back as -1.
+    """
+    if not lines:
+        return np.array([], dtype=np.int64)
+    addresses = _parse_octets(lines)
+    if addresses is not None:
+        return addresses
+    if len(lines) > 64:
+        middle = len(lines) // 2
+        return np.concatenate((parse_addresses(lines[:middle]), parse_addresses(lines[middle:])))
+
+    addresses = np.empty(len(lines), dtype=np.int64)
+    for i, line in enumerate(lines):
+        try:
+            addresses[i] = int(IPv4Address(line))
+        except ValueError:
+            addresses[i] = INVALID
+    return addresses
+
+def read_address_chunks(filepath: str, column: Optional[int] = None,
+                        chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Read a file of addresses in large chunks split on line boundaries
+    column selects a CSV column; otherwise each line is one address.
+    A header line (not starting with a digit) is skipped.
+    Yields: (address strings, integer addresses)
+    """
+    with open(filepath, 'r', newline='') as f:
+        remainder = ''
+        first_chunk = True
+        while True:
+            block = f.read(chunk_bytes)
+            if not block and not remainder:
+                break
+            text = remainder + block
+            if block:
+                cut = text.rfind('\n') + 1
+                text, remainder = text[:cut], text[cut:]
+            else:
+                remainder = ''
+
+            if column is not None:
+                lines = [row[column].strip() if len(row) > column else ''
+                         for row in csv.reader(text.splitlines())]
+            else:
+                lines = text.split()
+            if first_chunk and lines and not lines[0][:1].isdigit():
+                lines = lines[1:]
+            first_chunk = False
+            if lines:
+                yield lines, parse_addresses(lines)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Classify IPv4 addresses by Micetro range, allowed-subnet zone and supernet")
+    parser.add_argument("input", help="File with one address per line, or a CSV (see --column)")
+    parser.add_argument("-o", "--output", help="Write ip,range,zone,supernet rows to this CSV")
+    parser.add_argument("-c", "--column", type=int, help="Zero-based CSV column holding the address")
+    parser.add_argument("--micetro-url", help="Micetro server whose synced ranges to use (default: $MICETRO_URL)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary = IpClassifier.from_config(args.micetro_url).classify_file(args.input, args.output, args.column)
+    elapsed = time.perf_counter() - started
+
+    for category, counts in summary.items():
+        print(f"== {category} ==")
+        for label, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"{count:>12}  {label}")
+    total = sum(summary["supernet"].values())
+    print(f"Classified {total} addresses in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from ipaddress import IPv4Address, IPv4Network
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+# Micetro server whose mirror features read when none is given
+MICETRO_URL_ENV = 'MICETRO_URL'
+MIRROR_DIR = Path.home() / '.networktools'
+
+# lastModified formats besides ISO 8601
+TIMESTAMP_FORMATS = ('%b %d, %Y %H:%M:%S', '%b %d, %Y %I:%M:%S %p', '%Y-%m-%d %H:%M:%S')
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """A lastModified value as a naive UTC datetime, None if unparseable"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        for fmt in TIMESTAMP_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def mirror_name(base_url: str) -> str:
+    """Mirror file name part for a Micetro server"""
+    return hashlib.sha1(base_url.rstrip('/').encode()).hexdigest()[:12]
+
+@dataclass
+class MirrorChanges:
+    added: List[IPv4Network] = field(default_factory=list)
+    removed: List[IPv4Network] = field(default_factory=list)
+    blocks_checked: int = 0
+    blocks_changed: int = 0
+    # Mirror generation these changes produced (0 if nothing changed)
+    generation: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed)
+
+class IpamMirror:
+    """Local on-disk copy of one Micetro server's ranges, indexed by prefix"""
+
+    # Ranges are checksummed in blocks of this prefix length, by where they start
+    BLOCK_PREFIXLEN = 16
+    # Timestamp syncs cannot see every deletion; list everything at least this often
+    FULL_SYNC_INTERVAL = timedelta(hours=24)
+
+    # Called with (mirror path, MirrorChanges) after a sync in this process changed something
+    _listeners: List[Callable[[Path, MirrorChanges], None]] = []
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ranges (
+            ref TEXT PRIMARY KEY,
+            network INTEGER NOT NULL,
+            prefixlen INTEGER NOT NULL,
+            last_modified TEXT
+        );
+        CREATE INDEX IF NOT EXISTS ranges_prefix ON ranges (network, prefixlen);
+        CREATE TABLE IF NOT EXISTS blocks (
+            block INTEGER PRIMARY KEY,
+            checksum TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, name: str = 'default', path: Optional[Path] = None):
+        self.logger = logging.getLogger(__name__)
+        if path is None:
+            MIRROR_DIR.mkdir(exist_ok=True)
+            path = MIRROR_DIR / f'ipam_mirror_{name}.db'
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+
+    @classmethod
+    def for_server(cls, base_url: str, directory: Optional[Path] = None) -> 'IpamMirror':
+        """Open (or create) the mirror of the Micetro server at base_url"""
+        name = mirror_name(base_url)
+        mirror = cls(name, Path(directory) / f'ipam_mirror_{name}.db' if directory else None)
+        with mirror._lock, mirror._conn:
+            mirror._set_meta('server', base_url.rstrip('/'))
+        return mirror
+
+    @classmethod
+    def synced(cls, base_url: Optional[str] = None, directory: Optional[Path] = None) -> Optional['IpamMirror']:
+        """
+        Open the mirror of base_url (default: $MICETRO_URL), None if that
+        server has not been synced. With no server named, the mirror is used
+        only if there is exactly one, so another server's ranges are never
+        picked up by accident.
+        """
+        directory = Path(directory) if directory else MIRROR_DIR
+        base_url = base_url or os.environ.get(MICETRO_URL_ENV)
+        if base_url:
+            path = directory / f'ipam_mirror_{mirror_name(base_url)}.db'
+            return cls(path=path) if path.exists() else None
+        mirrors = list(directory.glob('ipam_mirror_*.db'))
+        if len(mirrors) > 1:
+            logging.getLogger(__name__).warning(
+                f"Mirrors of {len(mirrors)} Micetro servers found; set {MICETRO_URL_ENV} to pick one")
+        return cls(path=mirrors[0]) if len(mirrors) == 1 else None
+
+    @classmethod
+    def add_listener(cls, callback: Callable[[Path, MirrorChanges], None]):
+        """Be told about the changes of every sync made in this process (on the syncing thread)"""
+        cls._listeners.append(callback)
+
+    @classmethod
+    def remove_listener(cls, callback: Callable[[Path, MirrorChanges], None]):
+        if callback in cls._listeners:
+            cls._listeners.remove(callback)
+
+    @property
+    def server(self) -> Optional[str]:
+        """URL of the Micetro server mirrored, if recorded"""
+        with self._lock:
+            return self._get_meta('server')
+
+    @staticmethod
+    def block_checksum(entries: List[Tuple[str, IPv4Network, Optional[str]]]) -> str:
+        """Stable checksum of a block of (ref, network, lastModified), the fields the mirror keeps"""
+        return hashlib.sha1(json.dumps([(ref, str(network), modified) for ref, network, modified in entries])
+                            .encode()).hexdigest()
+
+    @staticmethod
+    def record_key(record: Dict) -> Optional[Tuple[str, IPv4Network]]:
+        """Return (ref, network) for a range record, None if it is not a valid subnet"""
+        try:
+            network = IPv4Network(f"{record['from']}/{record['netmask']}")
+        except (KeyError, ValueError):
+            return None
+        return record.get('ref') or str(network), network
+
+    def networks(self) -> List[IPv4Network]:
+        """All mirrored networks, sorted by address then prefix length"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT network, prefixlen FROM ranges ORDER BY network, prefixlen").fetchall()
+        return [IPv4Network((network, prefixlen)) for network, prefixlen in rows]
+
+    def prefixes(self) -> List[Tuple[int, int]]:
+        """All mirrored networks as (network address, prefixlen) integer pairs"""
+        with self._lock:
+            return self._conn.execute("SELECT network, prefixlen FROM ranges").fetchall()
+
+    def contains(self, network: IPv4Network) -> bool:
+        """Exact prefix lookup"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM ranges WHERE network = ? AND prefixlen = ? LIMIT 1",
+                (int(network.network_address), network.prefixlen)).fetchone()
+        return row is not None
+
+    def covering(self, address: str) -> List[IPv4Network]:
+        """All mirrored networks that contain an address, most specific first"""
+        ip = int(IPv4Address(address))
+        candidates = [((ip >> (32 - length)) << (32 - length) if length else 0, length)
+                      for length in range(32, -1, -1)]
+        with self._lock:
+            found = []
+            for network, prefixlen in candidates:
+                row = self._conn.execute(
+                    "SELECT 1 FROM ranges WHERE network = ? AND prefixlen = ? LIMIT 1",
+                    (network, prefixlen)).fetchone()
+                if row:
+                    found.append(IPv4Network((network, prefixlen)))
+        return found
+
+    def records(self, refs: List[str]) -> Optional[List[Dict]]:
+        """
+        Mirrored ranges as range records (ref, from, netmask, lastModified), in refs order
+        Returns: None if any of refs is not mirrored
+        """
+        rows = {}
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters
+            for i in range(0, len(refs), 500):
+                chunk = refs[i:i + 500]
+                rows.update((ref, row) for ref, *row in self._conn.execute(
+                    f"SELECT ref, network, prefixlen, last_modified FROM ranges "
+                    f"WHERE ref IN ({','.join('?' * len(chunk))})", chunk))
+        if len(rows) < len(set(refs)):
+            return None
+        return [{'ref': ref, 'from': str(IPv4Address(rows[ref][0])), 'netmask': rows[ref][1],
+                 'lastModified': rows[ref][2]} for ref in refs]
+
+    def generation(self) -> int:
+        """Number of syncs that changed the mirror"""
+        with self._lock:
+            return int(self._get_meta('generation') or 0)
+
+    def snapshot(self) -> Tuple[int, List[Tuple[int, int]]]:
+        """(generation, prefixes()) read together"""
+        with self._lock, self._conn:
+            # One read transaction, so no sync can land between the two
+            self._conn.execute("BEGIN")
+            generation = int(self._get_meta('generation') or 0)
+            prefixes = self._conn.execute("SELECT network, prefixlen FROM ranges").fetchall()
+        return generation, prefixes
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ranges").fetchone()[0]
+
+    def get_watermark(self) -> Optional[str]:
+        """Latest lastModified value seen in a sync, as the server wrote it"""
+        with self._lock:
+            return self._get_meta('watermark')
+
+    def full_sync_due(self, now: Optional[datetime] = None) -> bool:
+        """True if no full listing has been applied within FULL_SYNC_INTERVAL"""
+        with self._lock:
+            last = parse_timestamp(self._get_meta('full_sync'))
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        return last is None or now - last >= self.FULL_SYNC_INTERVAL
+
+    def upsert(self, records: Iterable[Dict]) -> MirrorChanges:
+        """Insert or update individual records (used by timestamp syncs)"""
+        changes = MirrorChanges()
+        with self._lock, self._conn:
+            self._upsert(records, changes)
+            self._next_generation(changes)
+        self._notify(changes)
+        return changes
+
+    def apply_listing(self, records: Iterable[Dict]) -> MirrorChanges:
+        """
+        Apply a full listing of the server's ranges
+
+        Ranges are grouped into blocks by the /16 they start in and only
+        blocks whose checksum changed are written, so an insertion or
+        deletion touches its own block however the server paged the listing.
+        Ranges missing from the listing are deleted.
+        Returns: MirrorChanges describing what was added and removed
+        """
+        blocks: Dict[int, List[Tuple[str, IPv4Network, Dict]]] = {}
+        for record in records:
+            key = self.record_key(record)
+            if key is None:
+                self.logger.warning(f"Skipping invalid range record: {record}")
+                continue
+            ref, network = key
+            block = int(network.network_address) >> (32 - self.BLOCK_PREFIXLEN)
+            blocks.setdefault(block, []).append((ref, network, record))
+
+        changes = MirrorChanges(blocks_checked=len(blocks))
+        with self._lock, self._conn:
+            stored = dict(self._conn.execute("SELECT block, checksum FROM blocks"))
+            listed: Set[str] = set()
+            changed_records: List[Dict] = []
+            for block, entries in blocks.items():
+                entries.sort(key=lambda entry: entry[0])
+                listed.update(ref for ref, _, _ in entries)
+                checksum = self.block_checksum([(ref, network, record.get('lastModified'))
+                                                for ref, network, record in entries])
+                if stored.pop(block, None) == checksum:
+                    continue
+                changes.blocks_changed += 1
+                changed_records.extend(record for _, _, record in entries)
+                self._conn.execute("INSERT OR REPLACE INTO blocks (block, checksum) VALUES (?, ?)",
+                                   (block, checksum))
+
+            # Blocks left in stored have no ranges any more
+            changes.blocks_changed += len(stored)
+            self._conn.executemany("DELETE FROM blocks WHERE block = ?", [(block,) for block in stored])
+            mirrored = {ref for ref, in self._conn.execute("SELECT ref FROM ranges")}
+            self._delete(mirrored - listed, changes)
+            self._upsert(changed_records, changes)
+            self._set_meta('full_sync', datetime.now(timezone.utc).replace(tzinfo=None).isoformat())
+            self._next_generation(changes)
+        self._notify(changes)
+        return changes
+
+    def clear(self):
+        """Drop all mirrored data, forcing a full sync next time"""
+        with self._lock, self._conn:
+            for table in ('ranges', 'blocks', 'meta'):
+                self._conn.execute(f"DELETE FROM {table}")
+
+    def close(self):
+        self._conn.close()
+
+    def _upsert(self, records: Iterable[Dict], changes: MirrorChanges):
+        watermark = self._get_meta('watermark')
+        latest = parse_timestamp(watermark)
+        for record in records:
+            key = self.record_key(record)
+            if key is None:
+                self.logger.warning(f"Skipping invalid range record: {record}")
+                continue
+            ref, network = key
+            row = self._conn.execute(
+                "SELECT network, prefixlen FROM ranges WHERE ref = ?", (ref,)).fetchone()
+            current = IPv4Network(row) if row else None
+            if current != network:
+                if current is not None:
+                    changes.removed.append(current)
+                changes.added.append(network)
+            modified = record.get('lastModified')
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ranges (ref, network, prefixlen, last_modified) VALUES (?, ?, ?, ?)",
+                (ref, int(network.network_address), network.prefixlen, modified))
+            # Compared as times: the server's format need not sort as text
+            parsed = parse_timestamp(modified)
+            if parsed is not None and (latest is None or parsed > latest):
+                latest, watermark = parsed, str(modified)
+        if watermark:
+            self._set_meta('watermark', watermark)
+
+    def _next_generation(self, changes: MirrorChanges):
+        if changes:
+            changes.generation = int(self._get_meta('generation') or 0) + 1
+            self._set_meta('generation', str(changes.generation))
+
+    def _notify(self, changes: MirrorChanges):
+        if not changes:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(self.path, changes)
+            except Exception:
+                self.logger.exception("IPAM mirror listener failed")
+
+    def _delete(self, refs: Set[str], changes: MirrorChanges):
+        for ref in refs:
+            row = self._conn.execute(
+                "SELECT network, prefixlen FROM ranges WHERE ref = ?", (ref,)).fetchone()
+            if row:
+                changes.removed.append(IPv4Network(row))
+                self._conn.execute("DELETE FROM ranges WHERE ref = ?", (ref,))
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
@@ -0,0 +1,102 @@
+from bisect import bisect_right
+from ipaddress import IPv4Address
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.route_validation import Route
+
+def flatten_prefixes(prefixes: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """
+    Turn (start, prefixlen) prefixes into sorted, non-overlapping intervals
+    Returns: (interval starts, index of the most specific prefix covering
+    each interval or -1); the first interval always starts at 0.0.0.0
+    """
+    starts = [0]
+    owners = [-1]
+
+    def emit(position: int, owner: int):
+        if starts[-1] == position:
+            owners[-1] = owner
+        else:
+            starts.append(position)
+            owners.append(owner)
+
+    def close_until(position: int):
+        # Pop prefixes that end before position, handing back to the enclosing one
+        while stack and stack[-1][0] < position:
+            last, _, _ = stack.pop()
+            emit(last + 1, stack[-1][2] if stack else -1)
+
+    # Outer prefixes sort before the prefixes nested in them
+    stack = []
+    for index in sorted(range(len(prefixes)), key=prefixes.__getitem__):
+        first, prefixlen = prefixes[index]
+        if stack and stack[-1][1] == (first, prefixlen):
+            continue  # duplicate prefix, the first one wins
+        close_until(first)
+        emit(first, index)
+        stack.append((first + (1 << (32 - prefixlen)) - 1, (first, prefixlen), index))
+    close_until(1 << 32)
+    return starts, owners
+
+class LpmTable:
+    """
+    Longest-prefix-match table for one device
+
+    CIDR prefixes are either nested or disjoint, so the table is flattened
+    into sorted, non-overlapping address intervals, each mapped to the most
+    specific route covering it. A lookup is then a single bisect.
+    """
+
+    def __init__(self, routes: Iterable[Route]):
+        # network -> all paths (ECMP) for that prefix
+        self.prefixes: Dict = {}
+        for route in routes:
+            self.prefixes.setdefault(route.network, []).append(route)
+        self._starts: List[int] = []
+        self._paths: List[Optional[List[Route]]] = []
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.prefixes)
+
+    def lookup(self, address) -> Optional[List[Route]]:
+        """Return the paths of the longest matching prefix, None if nothing matches"""
+        return self._paths[bisect_right(self._starts, int(IPv4Address(address))) - 1]
+
+    def lookup_many(self, addresses: List[int]) -> List[Optional[List[Route]]]:
+        """Batch lookup of integer addresses"""
+        starts, paths = self._starts, self._paths
+        return [paths[bisect_right(starts, address) - 1] for address in addresses]
+
+    def _build(self):
+        networks = list(self.prefixes)
+        starts, owners = flatten_prefixes(
+            [(int(network.network_address), network.prefixlen) for network in networks])
+        self._starts = starts
+        self._paths = [self.prefixes[networks[owner]] if owner >= 0 else None for owner in owners]
+
+class LpmService:
+    """Per-device LPM tables built from collected routing tables"""
+
+    def __init__(self):
+        self.tables: Dict[str, LpmTable] = {}
+
+    def load(self, hostname: str, routes: Iterable[Route]):
+        """Replace the table for a device"""
+        self.tables[hostname] = LpmTable(routes)
+
+    def clear(self):
+        self.tables.clear()
+
+    def query(self, destinations: Iterable[str]) -> Dict[str, Dict[str, Optional[List[Route]]]]:
+        """
+        Find the route every device uses for each destination
+        Returns: {destination: {hostname: paths or None}}
+        """
+        destinations = list(destinations)
+        addresses = [int(IPv4Address(destination)) for destination in destinations]
+        hostnames = list(self.tables)
+        columns = [self.tables[hostname].lookup_many(addresses) for hostname in hostnames]
+        if not columns:
+            return {destination: {} for destination in destinations}
+        return {destination: dict(zip(hostnames, row))
+                for destination, row in zip(destinations, zip(*columns))}
@@ -0,0 +1,256 @@
+"""
+Run timings: latency histograms and byte counts per device, command and feature
+
+Instrumented code records into the process-wide `metrics` registry; export()
+writes a Prometheus textfile (for node_exporter's textfile collector) and a
+JSON summary of the run.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PREFIX = 'networktools_'
+
+# Upper bounds in seconds; commands over SSH take from tens of ms to minutes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    'connect_seconds': "SSH connect and login (create_connection)",
+    'enable_seconds': "Entering enable mode after login",
+    'command_seconds': "send_command latency",
+    'parse_seconds': "Parsing command output",
+    'command_output_bytes_total': "Bytes of command output received",
+    'failures_total': "Timed operations that raised",
+}
+
+METRICS_DIR_ENV = 'NETWORKTOOLS_METRICS_DIR'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Bucketed latency distribution, Prometheus style (le is inclusive)"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One extra slot for values above the last bucket (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'Histogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket, capped at the observed max"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (self.max,), self.counts):
+            if count and seen + count >= rank:
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = upper
+        return self.max
+
+class MetricsRegistry:
+    """Thread-safe store of histograms and counters keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = datetime.now()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def reset(self):
+        with self._lock:
+            self.started = datetime.now()
+            self._histograms.clear()
+            self._counters.clear()
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timed(self, name: str, **labels: str) -> Iterator[None]:
+        """Observe the block's duration; if it raises, also count a failure"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc('failures_total', operation=name.replace('_seconds', ''),
+                     device=labels.get('device', ''))
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Tuple[Dict[Tuple[str, Labels], Histogram], Dict[Tuple[str, Labels], float]]:
+        """Copies of the histograms and counters"""
+        with self._lock:
+            histograms = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.merge(histogram)
+                histograms[key] = copy
+            return histograms, dict(self._counters)
+
+    def to_prometheus(self) -> str:
+        """Text exposition format"""
+        histograms, counters = self.snapshot()
+        lines = []
+        for name in sorted({name for name, _ in histograms}):
+            lines += [f"# HELP {PREFIX}{name} {HELP.get(name, name)}", f"# TYPE {PREFIX}{name} histogram"]
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for upper, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels, le=_number(upper))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {histogram.count}")
+        for name in sorted({name for name, _ in counters}):
+            lines += [f"# HELP {PREFIX}{name} {HELP.get(name, name)}", f"# TYPE {PREFIX}{name} counter"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top: int = 20) -> Dict:
+        """
+        Per-device totals, the most expensive commands and parse times
+        Commands are aggregated over devices and sorted by total time.
+        """
+        histograms, counters = self.snapshot()
+        devices: Dict[str, Dict] = {}
+        commands: Dict[Tuple[str, str], Histogram] = {}
+        command_bytes: Dict[Tuple[str, str], float] = {}
+        parsers: Dict[Tuple[str, str], Histogram] = {}
+
+        def device_entry(hostname: str) -> Dict:
+            return devices.setdefault(hostname, {
+                'connect_seconds': 0.0, 'enable_seconds': 0.0, 'commands': 0,
+                'command_seconds': 0.0, 'slowest_command_seconds': 0.0,
+                'output_bytes': 0, 'failures': 0
+            })
+
+        for (name, labels), histogram in histograms.items():
+            label = dict(labels)
+            if name in ('connect_seconds', 'enable_seconds'):
+                device_entry(label.get('device', ''))[name] += histogram.sum
+            elif name == 'command_seconds':
+                entry = device_entry(label.get('device', ''))
+                entry['commands'] += histogram.count
+                entry['command_seconds'] += histogram.sum
+                entry['slowest_command_seconds'] = max(entry['slowest_command_seconds'], histogram.max)
+                key = (label.get('command', ''), label.get('feature', ''))
+                commands.setdefault(key, Histogram(histogram.buckets)).merge(histogram)
+            elif name == 'parse_seconds':
+                key = (label.get('parser', ''), label.get('feature', ''))
+                parsers.setdefault(key, Histogram(histogram.buckets)).merge(histogram)
+
+        for (name, labels), value in counters.items():
+            label = dict(labels)
+            if name == 'command_output_bytes_total':
+                device_entry(label.get('device', ''))['output_bytes'] += int(value)
+                key = (label.get('command', ''), label.get('feature', ''))
+                command_bytes[key] = command_bytes.get(key, 0) + value
+            elif name == 'failures_total' and label.get('device'):
+                device_entry(label['device'])['failures'] += int(value)
+
+        def row(histogram: Histogram) -> Dict:
+            return {
+                'count': histogram.count,
+                'total_seconds': round(histogram.sum, 4),
+                'mean_seconds': round(histogram.sum / histogram.count, 4) if histogram.count else 0.0,
+                'p50_seconds': round(histogram.quantile(0.5), 4),
+                'p95_seconds': round(histogram.quantile(0.95), 4),
+                'max_seconds': round(histogram.max, 4)
+            }
+
+        slowest_commands = sorted(commands.items(), key=lambda item: item[1].sum, reverse=True)[:top]
+        busiest_devices = sorted(devices, key=lambda hostname: devices[hostname]['connect_seconds']
+                                 + devices[hostname]['command_seconds'], reverse=True)[:top]
+        return {
+            'started': self.started.isoformat(),
+            'exported': datetime.now().isoformat(),
+            'devices': {hostname: {key: round(value, 4) if isinstance(value, float) else value
+                                   for key, value in entry.items()}
+                        for hostname, entry in sorted(devices.items())},
+            'slowest_devices': busiest_devices,
+            'slowest_commands': [
+                {'command': command, 'feature': feature, **row(histogram),
+                 'output_bytes': int(command_bytes.get((command, feature), 0))}
+                for (command, feature), histogram in slowest_commands
+            ],
+            'parsing': [
+                {'parser': parser, 'feature': feature, **row(histogram)}
+                for (parser, feature), histogram in sorted(parsers.items(), key=lambda item: -item[1].sum)
+            ]
+        }
+
+    def export(self, directory: Optional[str] = None) -> Tuple[Path, Path]:
+        """
+        Write networktools.prom and run_<start time>.json
+        The directory defaults to $NETWORKTOOLS_METRICS_DIR, else ~/.networktools/metrics.
+        Returns: (textfile path, summary path)
+        """
+        directory = Path(directory or os.environ.get(METRICS_DIR_ENV)
+                         or Path.home() / '.networktools' / 'metrics')
+        directory.mkdir(parents=True, exist_ok=True)
+        textfile = directory / 'networktools.prom'
+        summary_file = directory / f"run_{self.started.strftime('%Y%m%d_%H%M%S')}.json"
+        # Write then rename, so the collector never reads a partial file
+        _write_atomic(textfile, self.to_prometheus())
+        _write_atomic(summary_file, json.dumps(self.summary(), indent=2))
+        return textfile, summary_file
+
+def _labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (f'{key}="{_escape(value)}"' for key, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def _write_atomic(path: Path, text: str):
+    temp = path.with_name(path.name + '.tmp')
+    with open(temp, 'w') as f:
+        f.write(text)
+    os.replace(temp, path)
+
+metrics = MetricsRegistry()
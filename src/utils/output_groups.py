@@ -0,0 +1,66 @@
+import difflib
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Lines that differ between otherwise identical outputs (timestamps, uptimes, sizes)
+VOLATILE_PATTERNS = [
+    r'^Building configuration',
+    r'^Current configuration\s*:',
+    r'^!\s*(Last configuration change|NVRAM config last updated|No configuration change)',
+    r'^!\s*Time:',
+    r'^ntp clock-period',
+    r'\buptime is\b',
+    r'^System (restarted|returned to ROM)',
+    r'^Load for ',
+    r'^Time source is',
+    r'^\*?\d{1,2}:\d{2}:\d{2}\.\d+ \S+ \w{3} \w{3} +\d+ \d{4}$',
+]
+VOLATILE_LINE = re.compile('|'.join(VOLATILE_PATTERNS))
+
+@dataclass
+class OutputGroup:
+    """Devices whose normalized output is identical"""
+    fingerprint: str
+    hostnames: List[str] = field(default_factory=list)
+
+    @property
+    def representative(self) -> str:
+        return self.hostnames[0]
+
+def normalize_output(output: str, hostname: Optional[str] = None) -> str:
+    """
+    Drop volatile lines, trailing whitespace and blank lines, and replace
+    the device's own hostname so per-device config lines compare equal
+    """
+    if hostname:
+        names = {hostname, hostname.split('.')[0]}
+        pattern = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        output = re.sub(pattern, '<hostname>', output, flags=re.IGNORECASE)
+    lines = (line.rstrip() for line in output.splitlines())
+    return "\n".join(line for line in lines if line and not VOLATILE_LINE.search(line))
+
+def fingerprint(output: str, hostname: Optional[str] = None) -> str:
+    return hashlib.sha1(normalize_output(output, hostname).encode('utf-8', errors='replace')).hexdigest()
+
+def group_by_fingerprint(fingerprints: Iterable[Tuple[str, str]]) -> List[OutputGroup]:
+    """
+    Group (hostname, fingerprint) pairs
+    Returns: groups, largest first (the usual baseline)
+    """
+    groups: Dict[str, OutputGroup] = {}
+    for hostname, digest in fingerprints:
+        groups.setdefault(digest, OutputGroup(digest)).hostnames.append(hostname)
+    return sorted(groups.values(), key=lambda group: len(group.hostnames), reverse=True)
+
+def diff_against(baseline: str, output: str, baseline_name: str, name: str,
+                 baseline_host: Optional[str] = None, host: Optional[str] = None) -> List[str]:
+    """Unified diff of two normalized outputs"""
+    return list(difflib.unified_diff(
+        normalize_output(baseline, baseline_host).splitlines(),
+        normalize_output(output, host).splitlines(),
+        fromfile=baseline_name,
+        tofile=name,
+        lineterm=''
+    ))
@@ -0,0 +1,120 @@
+import re
+from array import array
+from typing import Dict, Hashable, List, Optional
+import numpy as np
+
+class OutputIndex:
+    """
+    Case-insensitive substring search over many command outputs
+
+    Every distinct (lower-cased) line is stored once, UTF-8 encoded, in a
+    single growing buffer; a dict of line hashes finds repeats, so the text
+    itself is held only there. Each output is kept as its distinct line ids
+    with repeat counts, appended to flat arrays as it arrives, so adding
+    never rebuilds anything. A query scans the distinct lines, and
+    per-output counts come from one vectorized gather and reduceat over all
+    outputs' line ids. A query that extends the previous one (typing
+    further) only rechecks the lines that matched. Matches never span lines.
+
+    The distinct lines stay in memory, so the index costs roughly the size
+    of the outputs' distinct text; the full outputs stay in the OutputStore.
+    """
+    # Above this many hits, counting per line beats collecting regex matches
+    DENSE_HITS = 100_000
+    # Refine from the previous query's lines only if there are fewer than this
+    REFINE_LIMIT = 200_000
+
+    def __init__(self):
+        self.documents: List[Hashable] = []
+        # Distinct lines, each followed by a newline, and where each starts
+        self._corpus = bytearray()
+        self._line_starts = array('q')
+        # hash(line) -> line id; a line whose hash is already taken goes in _collisions
+        self._line_ids: Dict[int, int] = {}
+        self._collisions: Dict[bytes, int] = {}
+        # Per output: distinct line ids and how often each occurs, concatenated
+        self._all_lines = array('q')
+        self._all_repeats = array('q')
+        self._doc_starts = array('q')
+        self._last_query: Optional[bytes] = None
+        self._last_hits: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, key: Hashable, text: str):
+        """Index one output under key (e.g. (hostname, command))"""
+        lines = text.lower().encode('utf-8', errors='replace').split(b'\n')
+        corpus, starts, ids = self._corpus, self._line_starts, self._line_ids
+        line_ids = []
+        for line in lines:
+            # Looked up per line, so a new line repeated within this output is stored once
+            line_hash = hash(line)
+            line_id = ids.get(line_hash)
+            if line_id is None:
+                line_id = ids[line_hash] = self._append_line(line)
+            else:
+                # Same hash; check it is the same line
+                start = starts[line_id]
+                end = starts[line_id + 1] if line_id + 1 < len(starts) else len(corpus)
+                if end - start != len(line) + 1 or not corpus.startswith(line, start):
+                    line_id = self._collisions.get(line)
+                    if line_id is None:
+                        line_id = self._collisions[line] = self._append_line(line)
+            line_ids.append(line_id)
+        distinct, repeats = np.unique(np.array(line_ids, dtype=np.int64), return_counts=True)
+        self.documents.append(key)
+        self._doc_starts.append(len(self._all_lines))
+        self._all_lines.frombytes(distinct.tobytes())
+        self._all_repeats.frombytes(repeats.tobytes())
+        self._last_query = self._last_hits = None
+
+    def _append_line(self, line: bytes) -> int:
+        self._line_starts.append(len(self._corpus))
+        self._corpus += line
+        self._corpus.append(10)
+        return len(self._line_starts) - 1
+
+    def search(self, query: str) -> Dict[Hashable, int]:
+        """
+        Count (non-overlapping) occurrences of query in every output
+        Returns: {key: count} for the outputs that contain it
+        """
+        query = query.lower()
+        if not query or '\n' in query or not self.documents:
+            return {}
+        needle = query.encode('utf-8', errors='replace')
+        corpus = self._corpus
+        # Copies, so the arrays stay free to grow
+        starts = np.array(self._line_starts, dtype=np.int64)
+        # A line's end here is the next line's start; the query has no newline to cross it
+        ends = np.append(starts[1:], len(corpus))
+
+        previous = self._last_hits
+        if (previous is not None and self._last_query in needle
+                and len(previous) < self.REFINE_LIMIT):
+            counts = np.fromiter((corpus.count(needle, start, end)
+                                  for start, end in zip(starts[previous].tolist(), ends[previous].tolist())),
+                                 dtype=np.int64, count=len(previous))
+            keep = counts > 0
+            hits, occurrences = previous[keep], counts[keep]
+        elif corpus.count(needle) > self.DENSE_HITS:
+            counts = np.fromiter((corpus.count(needle, start, end)
+                                  for start, end in zip(starts.tolist(), ends.tolist())),
+                                 dtype=np.int64, count=len(starts))
+            hits = np.flatnonzero(counts)
+            occurrences = counts[hits]
+        else:
+            positions = np.fromiter((match.start() for match in re.finditer(re.escape(needle), corpus)),
+                                    dtype=np.int64)
+            line_ids = np.searchsorted(starts, positions, side='right') - 1
+            hits, occurrences = np.unique(line_ids, return_counts=True)
+        self._last_query, self._last_hits = needle, hits
+
+        weights = np.zeros(len(starts), dtype=np.int64)
+        weights[hits] = occurrences
+        all_lines = np.array(self._all_lines, dtype=np.int64)
+        all_repeats = np.array(self._all_repeats, dtype=np.int64)
+        # Every output has at least one line, so reduceat segments are never empty
+        per_document = np.add.reduceat(weights[all_lines] * all_repeats, np.array(self._doc_starts, dtype=np.int64))
+        return {self.documents[i]: int(per_document[i]) for i in np.flatnonzero(per_document).tolist()}
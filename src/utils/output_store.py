@@ -0,0 +1,128 @@
+import csv
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+@dataclass
+class OutputRecord:
+    """Where one compressed output lives in the data file"""
+    offset: int
+    size: int
+    length: int
+    error: bool = False
+
+class OutputStore:
+    """
+    Command outputs spilled to disk as they arrive
+
+    Each output is zlib-compressed on its own and appended to a single data
+    file, so only the (hostname, command) -> OutputRecord index stays in
+    memory. Reads go through a read-only memory map of the data file.
+    Safe to fill from several worker threads. The files are removed by
+    close(), or when the store is garbage collected.
+    """
+    COMPRESS_LEVEL = 1
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or tempfile.mkdtemp(prefix='networktools_outputs_'))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / 'outputs.dat'
+        self.records: Dict[Tuple[str, str], OutputRecord] = {}
+        # hostname -> commands in arrival order
+        self._commands: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'ab', buffering=0)
+        self._size = self._file.tell()
+        self._map: Optional[mmap.mmap] = None
+        self._finalizer = weakref.finalize(self, OutputStore._remove, self._file, self.directory)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self.records
+
+    @property
+    def raw_bytes(self) -> int:
+        """Uncompressed size of everything stored"""
+        return sum(record.length for record in self.records.values())
+
+    @property
+    def disk_bytes(self) -> int:
+        return self._size
+
+    def put(self, hostname: str, command: str, output: str, error: bool = False):
+        """Compress and append one output, replacing any earlier one for the pair"""
+        raw = output.encode('utf-8', errors='replace')
+        data = zlib.compress(raw, self.COMPRESS_LEVEL)
+        with self._lock:
+            offset = self._size
+            self._file.write(data)
+            self._size += len(data)
+            if (hostname, command) not in self.records:
+                self._commands.setdefault(hostname, []).append(command)
+            self.records[(hostname, command)] = OutputRecord(offset, len(data), len(raw), error)
+
+    def get(self, hostname: str, command: str) -> Optional[str]:
+        record = self.records.get((hostname, command))
+        if record is None:
+            return None
+        return zlib.decompress(self._read(record.offset, record.size)).decode('utf-8', errors='replace')
+
+    def hostnames(self) -> List[str]:
+        return list(self._commands)
+
+    def commands(self, hostname: Optional[str] = None) -> List[str]:
+        """Commands run on one device, or on any device (first seen order)"""
+        if hostname is not None:
+            return list(self._commands.get(hostname, []))
+        return list(dict.fromkeys(command for commands in self._commands.values() for command in commands))
+
+    def has_errors(self, hostname: str) -> bool:
+        return any(self.records[(hostname, command)].error for command in self._commands.get(hostname, []))
+
+    def iter_outputs(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield (hostname, command, output), decompressing one output at a time"""
+        for hostname, commands in list(self._commands.items()):
+            for command in commands:
+                yield hostname, command, self.get(hostname, command)
+
+    def export_csv(self, filepath: str):
+        """Stream every output to a Hostname,Command,Output CSV"""
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Hostname', 'Command', 'Output'])
+            for row in self.iter_outputs():
+                writer.writerow(row)
+
+    def close(self):
+        """Delete the stored outputs"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self.records.clear()
+            self._commands.clear()
+        self._finalizer()
+
+    def _read(self, offset: int, size: int) -> bytes:
+        with self._lock:
+            if self._map is None or len(self._map) < offset + size:
+                # The data file grew since it was mapped
+                if self._map is not None:
+                    self._map.close()
+                with open(self.path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + size]
+
+    @staticmethod
+    def _remove(file, directory: Path):
+        file.close()
+        shutil.rmtree(directory, ignore_errors=True)
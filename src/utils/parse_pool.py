@@ -0,0 +1,115 @@
+"""
+Process pool for parsing large command outputs
+
+Parsing on the threads that read from SSH sessions holds the GIL and
+stalls every other session's reads. parse() hands outputs over
+OFFLOAD_BYTES to worker processes instead: the text is copied once into a
+shared-memory block that the worker decodes in place, and the calling
+thread waits without holding the GIL. Smaller outputs are parsed inline,
+where the round trip would cost more than the parse.
+
+Parsers (and codecs) must be module-level functions so workers can import
+them. Results come back pickled; a codec's encode runs in the worker and
+its decode in the caller, for results that are cheaper to rebuild from a
+compact form than to unpickle (e.g. a million IPv4Network objects).
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+# (encode in the worker, decode in the caller)
+Codec = Tuple[Callable[[Any], Any], Callable[[Any], Any]]
+
+# Number of worker processes, 0 to parse everything inline
+WORKERS_ENV = 'NETWORKTOOLS_PARSE_WORKERS'
+# Outputs smaller than this are parsed on the calling thread
+OFFLOAD_BYTES = 256 * 1024
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+def worker_count() -> int:
+    """$NETWORKTOOLS_PARSE_WORKERS, else one per core beyond the first, up to 4"""
+    configured = os.environ.get(WORKERS_ENV)
+    if configured:
+        return max(0, int(configured))
+    return min(4, (os.cpu_count() or 1) - 1)
+
+def parse(parser: Callable[..., T], output: str, *args, codec: Optional[Codec] = None) -> T:
+    """parser(output, *args), in a worker process when output is large"""
+    if len(output) < OFFLOAD_BYTES:
+        return parser(output, *args)
+    pool = _get_pool()
+    if pool is None:
+        return parser(output, *args)
+
+    data = output.encode('utf-8', errors='surrogateescape')
+    size = len(data)
+    block = shared_memory.SharedMemory(create=True, size=max(1, size))
+    try:
+        block.buf[:size] = data
+        del data
+        encode = codec[0] if codec else None
+        try:
+            result = pool.submit(_parse_shared, block.name, size, parser, args, encode).result()
+        except BrokenProcessPool:
+            logger.warning("Parse pool stopped, parsing inline")
+            _reset_pool(pool)
+            return parser(output, *args)
+    finally:
+        block.close()
+        block.unlink()
+    return codec[1](result) if codec else result
+
+def shutdown():
+    """Stop the worker processes; the next large parse starts new ones"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    with _lock:
+        if _pool is None:
+            workers = worker_count()
+            if workers <= 0:
+                return None
+            # Forking a process with running threads (Tk, SSH sessions) can deadlock the child
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _parse_shared(name: str, size: int, parser: Callable, args: tuple, encode: Optional[Callable]):
+    """Worker side: decode the shared block, parse, encode the result"""
+    # Spawned workers share the caller's resource tracker, which already
+    # knows the block; the caller unlinks it once the result is back
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        view = block.buf[:size]
+        try:
+            output = str(view, 'utf-8', 'surrogateescape')
+        finally:
+            view.release()
+    finally:
+        block.close()
+    result = parser(output, *args)
+    return encode(result) if encode else result
+
+atexit.register(shutdown)
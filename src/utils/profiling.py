@@ -0,0 +1,143 @@
+"""
+Opt-in profiling of feature runs
+
+A RunProfile covers one run: cProfile on every thread that does the run's
+work, a sampler that records collapsed stacks of all threads (for
+flamegraph.pl / speedscope) and a tracemalloc snapshot at the end. save()
+writes them to ~/.networktools/profiles/<feature>_<time>/.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+PROFILE_ENV = 'NETWORKTOOLS_PROFILE'
+
+_enabled = os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+def is_enabled() -> bool:
+    return _enabled
+
+def set_enabled(enabled: bool):
+    """Profile every following run (GUI toggle, CLI --profile)"""
+    global _enabled
+    _enabled = enabled
+
+class RunProfile:
+    # Seconds between stack samples
+    SAMPLE_INTERVAL = 0.005
+    # Allocation sites listed in memory.txt
+    MEMORY_TOP = 25
+    # Frames kept per allocation traceback
+    MEMORY_FRAMES = 10
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = datetime.now()
+        self.elapsed = 0.0
+        self._profiles: List[cProfile.Profile] = []
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak = 0
+        self._own_tracemalloc = False
+        self._start_time = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.MEMORY_FRAMES)
+            self._own_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._start_time = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name='profile-sampler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self._start_time
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if tracemalloc.is_tracing():
+            # Leave out the sampler's own bookkeeping
+            self._snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, tracemalloc.__file__)
+            ])
+            self._peak = tracemalloc.get_traced_memory()[1]
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """cProfile the block; use once per thread taking part in the run"""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def _sample(self):
+        names = {}
+        me = threading.get_ident()
+        while not self._stop.wait(self.SAMPLE_INTERVAL):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{getattr(code, 'co_qualname', code.co_name)} "
+                                 f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[';'.join(reversed(stack))] += 1
+
+    def save(self, directory: Optional[str] = None) -> Path:
+        """
+        Write profile.pstats, profile.txt (top functions), stacks.collapsed and memory.txt
+        Returns: the run's directory
+        """
+        base = Path(directory) if directory else Path.home() / '.networktools' / 'profiles'
+        path = base / f"{self.name}_{self.started.strftime('%Y%m%d_%H%M%S')}"
+        path.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            profiles = list(self._profiles)
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(str(path / 'profile.pstats'))
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats('cumulative').print_stats(40)
+            (path / 'profile.txt').write_text(text.getvalue())
+
+        with open(path / 'stacks.collapsed', 'w') as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        with open(path / 'memory.txt', 'w') as f:
+            f.write(f"Run: {self.name}, {self.elapsed:.2f}s, peak traced memory {self._peak / 1024 / 1024:.1f} MiB\n\n")
+            if self._snapshot is not None:
+                for index, stat in enumerate(self._snapshot.statistics('traceback')[:self.MEMORY_TOP], 1):
+                    f.write(f"#{index}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                    for line in stat.traceback.format(most_recent_first=True):
+                        f.write(f"  {line}\n")
+        return path
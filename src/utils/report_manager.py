@@ -32,11 +32,14 @@ class Report:
             'device_info': self.device_info
         }
 
+# Overrides the reports directory, e.g. for scheduled CLI runs or benchmarks
+REPORTS_DIR_ENV = 'NETWORKTOOLS_REPORTS_DIR'
+
 class ReportManager:
     def __init__(self):
         self.project_root = Path(__file__).parent.parent.parent
-        self.reports_dir = self.project_root / 'reports'
-        self.reports_dir.mkdir(exist_ok=True)
+        self.reports_dir = Path(os.environ.get(REPORTS_DIR_ENV) or self.project_root / 'reports')
+        self.reports_dir.mkdir(parents=True, exist_ok=True)
 
     def save_report(self, report: Report):
         """Save a report to file"""
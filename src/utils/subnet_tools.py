@@ -0,0 +1,191 @@
+import csv
+from dataclasses import dataclass
+from ipaddress import IPv4Network
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+
+ADDRESS_SPACE = 1 << 32
+
+@dataclass
+class PrefixArray:
+    """Prefixes held as parallel numpy arrays of first/last address"""
+    starts: np.ndarray
+    ends: np.ndarray
+    labels: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_networks(cls, networks: Iterable, labels: Optional[List[str]] = None) -> 'PrefixArray':
+        starts, ends = [], []
+        for network in networks:
+            network = IPv4Network(network, strict=False)
+            starts.append(int(network.network_address))
+            ends.append(int(network.broadcast_address))
+        return cls(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64), labels)
+
+    def prefixlens(self) -> np.ndarray:
+        """Prefix length of every entry (entries must be CIDR blocks)"""
+        sizes = self.ends - self.starts + 1
+        return 32 - np.log2(sizes).astype(np.int64)
+
+    def to_strings(self) -> List[str]:
+        return [f"{address}/{length}"
+                for address, length in zip(format_addresses(self.starts), self.prefixlens())]
+
+def format_addresses(addresses: np.ndarray) -> List[str]:
+    """Dotted-quad strings for an array of integer addresses"""
+    octets = (addresses[:, None] >> np.array([24, 16, 8, 0])) & 0xFF
+    return ['.'.join(map(str, row)) for row in octets.tolist()]
+
+def ranges_to_cidrs(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split inclusive address ranges into the minimal list of CIDR blocks
+    Returns: (block starts, block sizes), sorted by start
+    """
+    out_starts, out_sizes = [], []
+    starts = starts.astype(np.int64)
+    ends = ends.astype(np.int64)
+    while len(starts):
+        remaining = ends - starts + 1
+        # Largest block allowed by the start alignment...
+        align = np.where(starts == 0, ADDRESS_SPACE, starts & -starts)
+        # ...and by the remaining length (highest power of two not above it)
+        fit = np.left_shift(1, np.floor(np.log2(remaining)).astype(np.int64))
+        fit = np.where(fit > remaining, fit >> 1, fit)
+        sizes = np.minimum(align, fit)
+        out_starts.append(starts)
+        out_sizes.append(sizes)
+        starts = starts + sizes
+        keep = starts <= ends
+        starts, ends = starts[keep], ends[keep]
+
+    if not out_starts:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    block_starts = np.concatenate(out_starts)
+    block_sizes = np.concatenate(out_sizes)
+    order = np.argsort(block_starts, kind='stable')
+    return block_starts[order], block_sizes[order]
+
+def merge_ranges(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge overlapping or adjacent inclusive ranges"""
+    if not len(starts):
+        return starts, ends
+    order = np.lexsort((-ends, starts))
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    # A new run begins where a start is past everything seen so far (+1 merges adjacency)
+    new_run = np.empty(len(starts), dtype=bool)
+    new_run[0] = True
+    new_run[1:] = starts[1:] > reach[:-1] + 1
+    run_ids = np.cumsum(new_run) - 1
+    merged_starts = starts[new_run]
+    merged_ends = np.zeros(len(merged_starts), dtype=np.int64)
+    np.maximum.at(merged_ends, run_ids, ends)
+    return merged_starts, merged_ends
+
+def collapse(prefixes: PrefixArray) -> PrefixArray:
+    """Summarize a prefix list into the minimal set of covering CIDR blocks"""
+    starts, ends = merge_ranges(prefixes.starts, prefixes.ends)
+    block_starts, block_sizes = ranges_to_cidrs(starts, ends)
+    return PrefixArray(block_starts, block_starts + block_sizes - 1)
+
+def find_overlaps(prefixes: PrefixArray) -> List[Tuple[int, int]]:
+    """
+    Find prefixes that overlap an earlier (wider or equal) prefix
+    Returns: List of (index, overlapped index) into the input
+    """
+    if len(prefixes) < 2:
+        return []
+    order = np.lexsort((-prefixes.ends, prefixes.starts))
+    starts, ends = prefixes.starts[order], prefixes.ends[order]
+    reach = np.maximum.accumulate(ends)
+    # Position (in sorted order) of the entry that holds the running maximum
+    positions = np.arange(len(ends))
+    holder = np.maximum.accumulate(np.where(ends == reach, positions, 0))
+    overlapping = np.nonzero(starts[1:] <= reach[:-1])[0] + 1
+    return list(zip(order[overlapping].tolist(), order[holder[overlapping - 1]].tolist()))
+
+def split(network, new_prefix: int, limit: int = 1_000_000) -> PrefixArray:
+    """Split a network into subnets of new_prefix"""
+    network = IPv4Network(network, strict=False)
+    if new_prefix < network.prefixlen or new_prefix > 32:
+        raise ValueError(f"Cannot split {network} into /{new_prefix}")
+    count = 1 << (new_prefix - network.prefixlen)
+    if count > limit:
+        raise ValueError(f"Splitting {network} into /{new_prefix} gives {count} subnets (limit {limit})")
+    size = 1 << (32 - new_prefix)
+    starts = int(network.network_address) + np.arange(count, dtype=np.int64) * size
+    return PrefixArray(starts, starts + size - 1)
+
+def hosts_to_prefixlen(hosts: np.ndarray) -> np.ndarray:
+    """Smallest prefix length holding the requested hosts plus network/broadcast"""
+    needed = np.maximum(hosts.astype(np.int64) + 2, 4)
+    return 32 - np.ceil(np.log2(needed)).astype(np.int64)
+
+def allocate_vlsm(supernet, prefixlens: np.ndarray, labels: Optional[List[str]] = None) -> PrefixArray:
+    """
+    Allocate blocks largest-first, back to back, inside a supernet
+    Sizes are powers of two sorted descending, so every cumulative offset
+    is already aligned to the block placed there. A prefix length outside
+    supernet's length..32 raises ValueError naming the request.
+    Returns: PrefixArray in input order
+    """
+    supernet = IPv4Network(supernet, strict=False)
+    prefixlens = np.asarray(prefixlens, dtype=np.int64)
+    bad = np.flatnonzero((prefixlens < supernet.prefixlen) | (prefixlens > 32))
+    if len(bad):
+        index = int(bad[0])
+        prefixlen = int(prefixlens[index])
+        name = f"Request {index + 1}" + (f" ({labels[index]})" if labels and labels[index] else '')
+        if prefixlen > 32:
+            raise ValueError(f"{name}: /{prefixlen} is longer than /32")
+        raise ValueError(f"{name} needs {1 << (32 - prefixlen)} addresses but {supernet} only has "
+                         f"{supernet.num_addresses}")
+    sizes = np.left_shift(1, 32 - prefixlens)
+    order = np.argsort(-sizes, kind='stable')
+    offsets = np.zeros(len(sizes), dtype=np.int64)
+    offsets[order] = np.concatenate(([0], np.cumsum(sizes[order])[:-1]))
+    total = int(sizes.sum())
+    if total > supernet.num_addresses:
+        raise ValueError(
+            f"Requests need {total} addresses but {supernet} only has {supernet.num_addresses}")
+    starts = int(supernet.network_address) + offsets
+    return PrefixArray(starts, starts + sizes - 1, labels)
+
+def read_prefix_file(filepath: str) -> Tuple[List[str], List[str]]:
+    """
+    Read a CSV or plain list of prefixes / VLSM requests
+    Returns: (values, labels), taking the network/prefix/subnet/hosts/size
+    column (else the last column) as value and the 'name' column as label
+    """
+    values, labels = [], []
+    with open(filepath, 'r', newline='') as f:
+        first_cell = f.readline().split(',')[0].strip()
+        f.seek(0)
+        # A header row starts with a column name rather than an address or size
+        if first_cell and not first_cell[0].isdigit() and not first_cell.startswith(('/', '#')):
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames or []
+            value_field = next((name for name in fields if name.lower() in
+                                ('network', 'prefix', 'subnet', 'hosts', 'size')), fields[-1])
+            label_field = next((name for name in fields if name.lower() == 'name'), None)
+            for row in reader:
+                if row.get(value_field):
+                    values.append(row[value_field].strip())
+                    labels.append(row[label_field].strip() if label_field else '')
+        else:
+            for line in f:
+                value = line.split(',')[0].strip()
+                if value and not value.startswith('#'):
+                    values.append(value)
+                    labels.append('')
+    return values, labels
+
+def write_rows(filepath: str, header: List[str], rows: Iterable[Iterable]):
+    """Write result rows to CSV"""
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
@@ -1,6 +1,118 @@
-from concurrent.futures import ThreadPoolExecutor
-from typing import Callable, List
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional
+from src.utils.metrics import metrics
 
-def run_threaded_operation(operation: Callable, items: List, max_workers: int = 10):
+# Devices a job works on at once unless told otherwise
+DEFAULT_WORKERS = 10
+
+class OperationCancelled(BaseException):
+    """
+    Raised in worker threads once a job is cancelled
+    Derives from BaseException so the broad `except Exception` blocks in
+    device workers do not swallow it.
+    """
+
+class Job:
+    """
+    Handle given to background work. Status, progress and results are
+    posted to an event queue for the owner to drain; cancellation is a
+    flag checked before every device command.
+    """
+
+    def __init__(self, events: Optional[queue.Queue] = None, feature: str = '',
+                 max_workers: int = DEFAULT_WORKERS):
+        self.events = events if events is not None else queue.Queue()
+        # Label for the timings recorded through this job
+        self.feature = feature
+        # Default concurrency of map(), e.g. DeviceManager.max_workers
+        self.max_workers = max_workers
+        # RunProfile when profiling is on; worker threads profile themselves into it
+        self.profile = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Raise OperationCancelled if cancellation was requested"""
+        if self._cancel.is_set():
+            raise OperationCancelled()
+
+    def status(self, message: str):
+        self.events.put(("status", message))
+
+    def progress(self, value: float):
+        self.events.put(("progress", value))
+
+    def result(self, text: str):
+        self.events.put(("result", text))
+
+    def call(self, callback: Callable, *args):
+        """Run callback on the owner's (GUI) thread"""
+        self.events.put(("call", (callback, args)))
+
+    def send_command(self, device, command: str, **kwargs) -> str:
+        """
+        send_command on the device's connection, unless the job was cancelled
+        Latency and output size are recorded per device, command and feature.
+        """
+        self.check()
+        with metrics.timed('command_seconds', device=device.hostname, command=command,
+                           feature=self.feature):
+            output = device.connection.send_command(command, **kwargs)
+        if isinstance(output, str):
+            metrics.inc('command_output_bytes_total', len(output.encode('utf-8', errors='replace')),
+                        device=device.hostname, command=command, feature=self.feature)
+        return output
+
+    def timed_parse(self, parser: str):
+        """Context manager timing a parse of command output"""
+        return metrics.timed('parse_seconds', parser=parser, feature=self.feature)
+
+    def map(self, operation: Callable, items: List, max_workers: Optional[int] = None,
+            report_progress: bool = True) -> List:
+        return run_threaded_operation(operation, items, max_workers or self.max_workers, job=self,
+                                      report_progress=report_progress)
+
+def run_threaded_operation(operation: Callable, items: List, max_workers: int = DEFAULT_WORKERS,
+                           job: Optional[Job] = None, report_progress: bool = False) -> List[Any]:
+    """
+    Run operation over items on a thread pool, results in input order
+    With a job, items not yet started are skipped once it is cancelled and
+    OperationCancelled is raised after the in-flight ones return.
+    """
+    if job is None:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(operation, items))
+
+    def guarded(item):
+        job.check()
+        if job.profile is not None:
+            with job.profile.thread():
+                return operation(item)
+        return operation(item)
+
+    items = list(items)
+    results: List[Any] = [None] * len(items)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        return list(executor.map(operation, items))
\ No newline at end of file
+        futures = {executor.submit(guarded, item): index for index, item in enumerate(items)}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    results[futures[future]] = future.result()
+                except OperationCancelled:
+                    pass
+                if report_progress:
+                    job.progress(done * 100 / len(items))
+        finally:
+            if job.cancelled:
+                for future in futures:
+                    future.cancel()
+    job.check()
+    return results
@@ -0,0 +1,174 @@
+import threading
+import time
+import pytest
+from src.core.broker import (
+    BrokerError, CANCELLED, DONE, FAILED, JobBroker, PENDING, SKIPPED, network_filesystem
+)
+from src.core.broker_http import BrokerServer, RemoteBroker, open_broker, parse_listen
+from src.core.distributed import BrokerWorker
+from src.utils.threader import Job
+
+def task(hostname, region=None, **payload):
+    return {'hostname': hostname, 'region': region, 'payload': payload}
+
+@pytest.fixture
+def broker(tmp_path):
+    broker = JobBroker(str(tmp_path / 'jobs.db'))
+    yield broker
+    broker.close()
+
+@pytest.fixture
+def remote(broker):
+    server = BrokerServer(broker, port=0, token='secret')
+    server.start()
+    yield RemoteBroker(server.url, 'secret')
+    server.shutdown()
+
+def test_submit_deduplicates_hostnames(broker):
+    run_id = broker.create_run('crawl')
+    assert broker.submit(run_id, 'crawl', [task('a'), task('b'), task('a')]) == [True, True, False]
+    assert broker.submit(run_id, 'crawl', [task('b'), task('c')], state=SKIPPED) == [False, True]
+    assert broker.progress(run_id) == {PENDING: 2, SKIPPED: 1}
+
+def test_claim_complete_and_follow(broker):
+    run_id = broker.create_run('vlans')
+    broker.submit(run_id, 'vlans', [task('a'), task('b')])
+    claimed = broker.claim('w1', limit=5)
+    assert [t.hostname for t in claimed] == ['a', 'b']
+    assert broker.claim('w2', limit=5) == []
+    broker.complete(claimed[1], {'output': 'B'})
+    broker.complete(claimed[0], {'output': 'A'})
+    finished = broker.finished(run_id)
+    assert [(t.hostname, t.result['output']) for t in finished] == [('b', 'B'), ('a', 'A')]
+    assert broker.finished(run_id, after=finished[0].finished_seq)[0].hostname == 'a'
+    assert broker.is_done(run_id)
+
+def test_failures_retry_then_fail(tmp_path):
+    broker = JobBroker(str(tmp_path / 'jobs.db'), max_attempts=2)
+    run_id = broker.create_run('connect')
+    broker.submit(run_id, 'connect', [task('a')])
+    broker.fail(broker.claim('w1')[0], "Connection Failed")
+    assert broker.progress(run_id) == {PENDING: 1}
+    broker.fail(broker.claim('w2')[0], "Connection Failed")
+    (failed,) = broker.finished(run_id)
+    assert failed.state == FAILED and failed.error == "Connection Failed"
+
+def test_release_does_not_count_an_attempt(tmp_path):
+    broker = JobBroker(str(tmp_path / 'jobs.db'), max_attempts=1)
+    run_id = broker.create_run('connect')
+    broker.submit(run_id, 'connect', [task('a')])
+    broker.release(broker.claim('w1')[0])
+    claimed = broker.claim('w1')[0]
+    assert claimed.attempts == 1
+    broker.complete(claimed, {'output': 'Connected'})
+    assert broker.progress(run_id) == {DONE: 1}
+
+def test_region_filter(broker):
+    run_id = broker.create_run('vlans')
+    broker.submit(run_id, 'vlans', [task('east1', 'east'), task('west1', 'west'), task('any')])
+    assert {t.hostname for t in broker.claim('e', limit=5, region='east')} == {'east1', 'any'}
+    assert [t.hostname for t in broker.claim('x', limit=5)] == ['west1']
+
+def test_cancel(broker):
+    run_id = broker.create_run('vlans')
+    broker.submit(run_id, 'vlans', [task('a'), task('b')])
+    claimed = broker.claim('w1')[0]
+    broker.cancel(run_id)
+    assert broker.claim('w1', limit=5) == []
+    assert not broker.is_done(run_id)
+    broker.complete(claimed, {'output': ''})
+    assert broker.progress(run_id) == {DONE: 1, CANCELLED: 1}
+    assert broker.is_done(run_id)
+
+def test_network_filesystem_is_refused(tmp_path, monkeypatch):
+    mounts = tmp_path / 'mounts'
+    mounts.write_text(f"/dev/sda1 / ext4 rw 0 0\nfiler:/vol {tmp_path}/share nfs4 rw 0 0\n")
+    assert network_filesystem(str(tmp_path / 'share' / 'jobs.db'), str(mounts)) == 'nfs4'
+    assert network_filesystem(str(tmp_path / 'shared' / 'jobs.db'), str(mounts)) is None
+    monkeypatch.setattr('src.core.broker.MOUNTS_FILE', str(mounts))
+    (tmp_path / 'share').mkdir()
+    with pytest.raises(BrokerError):
+        JobBroker(str(tmp_path / 'share' / 'jobs.db'))
+
+def test_remote_broker_round_trip(broker, remote):
+    run_id = remote.create_run('crawl')
+    assert remote.submit(run_id, 'crawl', [task('a', depth=1), task('a')]) == [True, False]
+    (claimed,) = remote.claim('w1', limit=5)
+    assert claimed.payload == {'depth': 1}
+    assert remote.heartbeat([claimed]) == []
+    remote.complete(claimed, {'edges': [['a', 'b']]})
+    (finished,) = remote.finished(run_id)
+    assert finished.result == {'edges': [['a', 'b']]} and finished.worker == 'w1'
+    assert remote.is_done(run_id) and broker.is_done(run_id)
+
+def test_remote_broker_rejects_bad_token(remote):
+    with pytest.raises(BrokerError, match='401'):
+        RemoteBroker(remote.url, 'wrong').create_run('vlans')
+    with pytest.raises(BrokerError):
+        RemoteBroker(remote.url, '')
+
+def test_open_broker_and_listen(tmp_path):
+    assert isinstance(open_broker('http://host:8765', token='t'), RemoteBroker)
+    assert isinstance(open_broker(str(tmp_path / 'jobs.db')), JobBroker)
+    assert parse_listen('0.0.0.0:9000') == ('0.0.0.0', 9000)
+    assert parse_listen(':9000') == ('127.0.0.1', 9000)
+    assert parse_listen('10.0.0.1') == ('10.0.0.1', 8765)
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out(tmp_path):
+    broker = JobBroker(str(tmp_path / 'jobs.db'), lease=0.05, max_attempts=2)
+    run_id = broker.create_run('vlans')
+    broker.submit(run_id, 'vlans', [task('a')])
+    first = broker.claim('w1')[0]
+    time.sleep(0.1)
+    second = broker.claim('w2')[0]
+    assert second.attempts == 2
+    # The first worker's late result is dropped
+    broker.complete(first, {'output': 'late'})
+    assert broker.finished(run_id) == []
+    time.sleep(0.1)
+    assert broker.claim('w3') == []
+    (failed,) = broker.finished(run_id)
+    assert failed.state == FAILED and 'Lease expired' in failed.error
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    broker = JobBroker(str(tmp_path / 'jobs.db'), lease=0.2)
+    run_id = broker.create_run('vlans')
+    broker.submit(run_id, 'vlans', [task('a'), task('b')])
+    held, dropped = broker.claim('w1', limit=2)
+    for _ in range(4):
+        time.sleep(0.1)
+        assert broker.heartbeat([held]) == []
+    assert [t.hostname for t in broker.claim('w2', limit=2)] == ['b']
+    assert broker.heartbeat([held, dropped]) == [dropped.id]
+
+class FakeConnection:
+    def disconnect(self):
+        pass
+
+class FakeDeviceManager:
+    def connect_devices(self, devices, max_workers=10):
+        for device in devices:
+            device.connection = FakeConnection()
+        return devices
+
+def test_worker_renews_leases_of_slow_tasks(broker, tmp_path):
+    broker.lease = 0.3
+    run_id = broker.create_run('connect')
+    broker.submit(run_id, 'connect', [task('slow', device={'hostname': 'slow', 'ip': '10.0.0.1',
+                                                           'device_type': 'cisco_ios', 'port': None})])
+    worker = BrokerWorker(broker, FakeDeviceManager(), 'user', 'password', name='w1',
+                          validator=object(), heartbeat=0.05)
+
+    def slow_connect(job, device, task):
+        time.sleep(1)
+        return {'output': "Connected"}
+
+    worker.handlers['connect'] = slow_connect
+    thread = threading.Thread(target=worker.run, args=(Job(), 2, 0.05, 0.5))
+    thread.start()
+    time.sleep(0.6)
+    other = JobBroker(broker.path, lease=0.3)
+    assert other.claim('w2') == []
+    thread.join()
+    (done,) = broker.finished(run_id)
+    assert done.state == DONE and done.worker == 'w1' and done.attempts == 1
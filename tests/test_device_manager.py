@@ -0,0 +1,71 @@
+import threading
+import time
+from src.core import operations
+from src.core.device import Device
+from src.core.device_manager import DeviceManager
+from src.utils.threader import DEFAULT_WORKERS, Job
+
+def test_concurrency_covers_every_shard_thread(monkeypatch):
+    monkeypatch.delenv('NETWORKTOOLS_SESSION_SHARDS', raising=False)
+    assert DeviceManager().max_workers == DEFAULT_WORKERS
+    sharded = DeviceManager(shards=4)
+    assert sharded.max_workers == 4 * sharded.shards.threads
+    # Nothing was started, so closing is a no-op
+    sharded.close()
+
+def test_job_map_uses_the_job_concurrency():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    Job(max_workers=25).map(work, list(range(50)), report_progress=False)
+    assert peak[0] > DEFAULT_WORKERS
+
+CDP = """Device ID: b
+  IP address: 10.0.0.2
+Platform: cisco WS-C3850,  Capabilities: Switch
+Device ID: c
+  IP address: 10.0.0.3
+Platform: cisco WS-C3850,  Capabilities: Switch
+"""
+
+class FakeConnection:
+    def __init__(self, output=''):
+        self.output = output
+
+    def send_command(self, command, **kwargs):
+        return self.output
+
+    def enable(self):
+        raise OSError("enable refused")
+
+class AllowAll:
+    def is_allowed(self, ip, hostname):
+        return True, ''
+
+def test_connect_devices_logs_instead_of_printing(monkeypatch, capsys, caplog):
+    device_manager = DeviceManager(shards=0)
+    monkeypatch.setattr(device_manager, 'open_connection', lambda params: FakeConnection())
+    (device,) = device_manager.connect_devices([Device(hostname='a', ip='10.0.0.1', device_type='cisco_ios')])
+    assert device.connection is None
+    assert capsys.readouterr().out == ''
+    assert "Error connecting to a: enable refused" in caplog.text
+
+def test_crawl_records_unreachable_devices(monkeypatch):
+    device_manager = DeviceManager(shards=0)
+    # b answers with no neighbors, c refuses the connection
+    connections = {'b': FakeConnection()}
+    monkeypatch.setattr(device_manager, 'open_connection', lambda params: connections.get(params['hostname']))
+    root = Device(hostname='a', ip='10.0.0.1', device_type='cisco_ios')
+    root.connection = FakeConnection(CDP)
+    failures = []
+    edges = operations.crawl_topology(Job(), device_manager, root, 2, AllowAll(), failures=failures)
+    assert edges == [('a', 'b'), ('a', 'c')]
+    assert failures == ['c: Connection Failed']
@@ -0,0 +1,48 @@
+import random
+from ipaddress import IPv4Network
+from src.utils.free_space import FreeSpaceFinder, FreeSpaceIndex
+from src.utils.ipam_mirror import MirrorChanges
+
+def test_build_and_find():
+    index = FreeSpaceIndex('10.0.0.0/16', ['10.0.0.0/24', '10.0.2.0/23', '192.0.2.0/24'])
+    assert index.find_free(24) == IPv4Network('10.0.1.0/24')
+    assert index.find_free(23) == IPv4Network('10.0.4.0/23')
+    assert index.free_addresses() == 65536 - 256 - 512
+    assert index.find_free(15) is None
+
+def test_find_prefers_the_tightest_fit_over_the_lowest_address():
+    # Free: 10.0.0.0/23 (lower, larger) and 10.0.2.128/25 (higher, exact fit)
+    index = FreeSpaceIndex('10.0.0.0/22', ['10.0.2.0/25', '10.0.3.0/24'])
+    assert index.find_free(25) == IPv4Network('10.0.2.128/25')
+    assert index.find_free(24) == IPv4Network('10.0.0.0/24')
+
+def test_allocate_release_matches_rebuild():
+    rng = random.Random(0)
+    index = FreeSpaceIndex('10.0.0.0/16')
+    live = []
+    for _ in range(400):
+        if live and rng.random() < 0.4:
+            index.release(live.pop(rng.randrange(len(live))))
+        else:
+            network = IPv4Network((0x0A000000 + rng.getrandbits(16), rng.randint(18, 30)), strict=False)
+            index.allocate(network)
+            live.append(network)
+        rebuilt = FreeSpaceIndex('10.0.0.0/16', live)
+        assert index.free_blocks() == rebuilt.free_blocks()
+
+def test_release_keeps_space_of_other_allocations():
+    index = FreeSpaceIndex('10.0.0.0/16', ['10.0.0.0/22', '10.0.1.0/24', '10.0.1.0/24'])
+    assert index.release('10.0.0.0/22')
+    assert index.release('10.0.1.0/24')
+    assert IPv4Network('10.0.1.0/24') not in index.free_blocks()
+    assert index.release('10.0.1.0/24')
+    assert index.free_addresses() == 65536
+    assert not index.release('10.0.1.0/24')
+
+def test_finder_apply_changes():
+    finder = FreeSpaceFinder(['10.0.0.0/16', '172.16.0.0/16'], ['10.0.0.0/24'])
+    finder.apply_changes(MirrorChanges(added=[IPv4Network('10.0.1.0/24')],
+                                       removed=[IPv4Network('10.0.0.0/24')]))
+    assert finder.find_free(24) == IPv4Network('10.0.0.0/24')
+    assert finder.find_free(24, '172.16.0.0/16') == IPv4Network('172.16.0.0/24')
+    assert finder.find_free(16) == IPv4Network('172.16.0.0/16')
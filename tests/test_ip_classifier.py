@@ -0,0 +1,26 @@
+import random
+from ipaddress import IPv4Address
+from src.utils.ip_classifier import INVALID, IpClassifier, parse_addresses
+
+def test_parse_matches_ipaddress():
+    rng = random.Random(0)
+    lines = [str(IPv4Address(rng.getrandbits(32))) for _ in range(5000)]
+    assert parse_addresses(lines).tolist() == [int(IPv4Address(line)) for line in lines]
+
+def test_malformed_lines_do_not_borrow_octets():
+    assert parse_addresses(['10.0.0', '1.2.3.4.5']).tolist() == [INVALID, INVALID]
+    assert parse_addresses(['1.2.3.4 5', '1..2.3']).tolist() == [INVALID, INVALID]
+    assert parse_addresses(['.1.2.3', '4.5.6.7.']).tolist() == [INVALID, INVALID]
+
+def test_bad_lines_are_isolated():
+    lines = ['10.0.0.1'] * 100 + ['', '10.0.0', '300.1.1.1', 'host'] + ['8.8.8.8'] * 100
+    addresses = parse_addresses(lines).tolist()
+    assert addresses[100:104] == [INVALID] * 4
+    assert addresses[:100] == [int(IPv4Address('10.0.0.1'))] * 100
+    assert addresses[104:] == [int(IPv4Address('8.8.8.8'))] * 100
+
+def test_classify_most_specific():
+    classifier = IpClassifier(ranges=['10.0.0.0/8', '10.1.0.0/16'], supernets=['10.0.0.0/8'])
+    addresses = parse_addresses(['10.1.2.3', '10.2.0.1', '192.0.2.1', 'bad'])
+    ranges = classifier.labels('range', classifier.classify(addresses)['range']).tolist()
+    assert ranges == ['10.1.0.0/16', '10.0.0.0/8', '', '']
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+from ipaddress import IPv4Network
+from src.utils.ipam_mirror import IpamMirror, parse_timestamp
+
+def record(ref, network, modified=None):
+    network = IPv4Network(network)
+    return {'ref': ref, 'from': str(network.network_address), 'netmask': network.prefixlen,
+            'lastModified': modified}
+
+def test_listing_adds_changes_and_deletes(tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    changes = mirror.apply_listing([record('a', '10.0.0.0/24'), record('b', '10.1.0.0/24'),
+                                    record('c', '10.2.0.0/24')])
+    assert len(changes.added) == 3 and changes.blocks_changed == 3
+    changes = mirror.apply_listing([record('a', '10.0.0.0/24'), record('c', '10.2.0.0/25')])
+    assert changes.removed == [IPv4Network('10.1.0.0/24'), IPv4Network('10.2.0.0/24')]
+    assert changes.added == [IPv4Network('10.2.0.0/25')]
+    assert mirror.networks() == [IPv4Network('10.0.0.0/24'), IPv4Network('10.2.0.0/25')]
+
+def test_insertion_only_touches_its_block(tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    listing = [record(f'r{i}', f'10.{i}.0.0/24') for i in range(0, 200, 2)]
+    mirror.apply_listing(listing)
+    # Server order differs and a range is inserted near the start
+    changes = mirror.apply_listing([record('new', '10.1.0.0/24')] + listing[::-1])
+    assert changes.blocks_changed == 1 and changes.blocks_checked == 101
+    assert changes.added == [IPv4Network('10.1.0.0/24')] and not changes.removed
+
+def test_deletion_of_whole_block(tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    mirror.apply_listing([record('a', '10.0.0.0/24'), record('b', '10.1.0.0/24')])
+    changes = mirror.apply_listing([record('a', '10.0.0.0/24')])
+    assert changes.removed == [IPv4Network('10.1.0.0/24')] and changes.blocks_changed == 1
+    assert mirror.count() == 1
+
+def test_watermark_compares_times_not_text(tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    mirror.upsert([record('a', '10.0.0.0/24', 'Sep 30, 2024 10:00:00'),
+                   record('b', '10.1.0.0/24', 'Oct 1, 2024 09:00:00')])
+    assert mirror.get_watermark() == 'Oct 1, 2024 09:00:00'
+    mirror.upsert([record('c', '10.2.0.0/24', 'Sep 30, 2024 23:00:00')])
+    assert mirror.get_watermark() == 'Oct 1, 2024 09:00:00'
+    assert parse_timestamp('2024-10-01T11:00:00+02:00') == datetime(2024, 10, 1, 9)
+    assert parse_timestamp('2024-10-01T09:00:00Z') == parse_timestamp('Oct 1, 2024 09:00:00')
+    assert parse_timestamp('yesterday') is None
+
+def test_full_sync_due(tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    assert mirror.full_sync_due()
+    mirror.apply_listing([])
+    assert not mirror.full_sync_due()
+    assert mirror.full_sync_due(datetime.now(timezone.utc).replace(tzinfo=None) + IpamMirror.FULL_SYNC_INTERVAL + timedelta(minutes=1))
+
+def test_mirrors_are_keyed_by_server(tmp_path, monkeypatch):
+    monkeypatch.delenv('MICETRO_URL', raising=False)
+    assert IpamMirror.synced(directory=tmp_path) is None
+    first = IpamMirror.for_server('https://ipam-a/', tmp_path)
+    first.apply_listing([record('a', '10.0.0.0/24')])
+    assert first.server == 'https://ipam-a'
+    only = IpamMirror.synced(directory=tmp_path)
+    assert only.server == 'https://ipam-a'
+    second = IpamMirror.for_server('https://ipam-b', tmp_path)
+    second.apply_listing([record('b', '10.1.0.0/24')])
+    # Newer, but not the server asked for
+    assert IpamMirror.synced('https://ipam-a', tmp_path).networks() == [IPv4Network('10.0.0.0/24')]
+    assert IpamMirror.synced(directory=tmp_path) is None
+    monkeypatch.setenv('MICETRO_URL', 'https://ipam-b')
+    assert IpamMirror.synced(directory=tmp_path).server == 'https://ipam-b'
+    assert IpamMirror.synced('https://ipam-c', tmp_path) is None
+
+def test_generations_and_listeners(tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    seen = []
+    listener = lambda path, changes: seen.append((path, changes.generation))
+    IpamMirror.add_listener(listener)
+    try:
+        mirror.apply_listing([record('a', '10.0.0.0/24')])
+        mirror.apply_listing([record('a', '10.0.0.0/24')])
+        mirror.upsert([record('b', '10.1.0.0/24')])
+    finally:
+        IpamMirror.remove_listener(listener)
+    # The unchanged listing is not a new generation
+    assert seen == [(mirror.path, 1), (mirror.path, 2)]
+    generation, prefixes = mirror.snapshot()
+    assert generation == 2 and sorted(prefixes) == [(0x0A000000, 24), (0x0A010000, 24)]
@@ -0,0 +1,71 @@
+import random
+from ipaddress import IPv4Address, IPv4Network
+from src.utils.lpm import LpmService, LpmTable, flatten_prefixes
+from src.utils.route_validation import Route
+from src.utils.threader import Job
+
+def route(network, next_hop='', protocol='S', interface=''):
+    return Route(IPv4Network(network), protocol, next_hop, interface)
+
+def test_flatten_nested_prefixes():
+    prefixes = [(int(IPv4Address('10.0.0.0')), 8), (int(IPv4Address('10.1.0.0')), 16)]
+    starts, owners = flatten_prefixes(prefixes)
+    assert [str(IPv4Address(start)) for start in starts] == ['0.0.0.0', '10.0.0.0', '10.1.0.0',
+                                                            '10.2.0.0', '11.0.0.0']
+    assert owners == [-1, 0, 1, 0, -1]
+
+def test_longest_prefix_wins():
+    table = LpmTable([route('0.0.0.0/0', '192.0.2.1'), route('10.0.0.0/8', '192.0.2.2'),
+                      route('10.1.0.0/16', '192.0.2.3'), route('10.1.2.3/32', '192.0.2.4')])
+    assert table.lookup('10.1.2.3')[0].next_hop == '192.0.2.4'
+    assert table.lookup('10.1.2.4')[0].next_hop == '192.0.2.3'
+    assert table.lookup('10.255.255.255')[0].next_hop == '192.0.2.2'
+    assert table.lookup('11.0.0.0')[0].next_hop == '192.0.2.1'
+    assert table.lookup('255.255.255.255')[0].next_hop == '192.0.2.1'
+
+def test_no_match_and_ecmp():
+    table = LpmTable([route('10.0.0.0/24', '192.0.2.1'), route('10.0.0.0/24', '192.0.2.2')])
+    assert len(table) == 1
+    assert [path.next_hop for path in table.lookup('10.0.0.7')] == ['192.0.2.1', '192.0.2.2']
+    assert table.lookup('10.0.1.0') is None
+    assert table.lookup('9.255.255.255') is None
+
+def test_matches_a_linear_scan():
+    rng = random.Random(7)
+    networks = {IPv4Network((rng.getrandbits(32), prefixlen), strict=False)
+                for prefixlen in (8, 12, 16, 20, 24, 28, 32) for _ in range(40)}
+    table = LpmTable(route(network) for network in networks)
+    for _ in range(2000):
+        address = IPv4Address(rng.getrandbits(32))
+        covering = [network for network in networks if address in network]
+        expected = max(covering, key=lambda network: network.prefixlen) if covering else None
+        paths = table.lookup(address)
+        assert (paths[0].network if paths else None) == expected
+
+def test_service_query_per_device():
+    service = LpmService()
+    service.load('r1', [route('10.0.0.0/8', '192.0.2.1')])
+    service.load('r2', [route('10.1.0.0/16', '192.0.2.2')])
+    result = service.query(['10.1.0.1', '10.2.0.1'])
+    assert result['10.1.0.1']['r1'][0].next_hop == '192.0.2.1'
+    assert result['10.1.0.1']['r2'][0].next_hop == '192.0.2.2'
+    assert result['10.2.0.1']['r2'] is None
+    # Reloading replaces the device's table
+    service.load('r1', [])
+    assert service.query(['10.1.0.1'])['10.1.0.1']['r1'] is None
+    service.clear()
+    assert service.query(['10.1.0.1']) == {'10.1.0.1': {}}
+
+def test_lookup_rows():
+    from src.features.route_analyzer import lookup_rows
+    service = LpmService()
+    service.load('r1', [route('10.0.0.0/8', '192.0.2.1', 'O', 'Gi0/1'),
+                        route('10.0.0.0/8', '192.0.2.2', 'O', 'Gi0/2')])
+    job = Job()
+    count, rows = lookup_rows(job, service, ['10.0.0.1', '10.0.0.1, dup', 'bogus', '', '11.0.0.1'])
+    assert count == 2
+    assert rows == [
+        (('10.0.0.1', 'r1'), ('10.0.0.1', 'r1', '10.0.0.0/8', 'O', '192.0.2.1, 192.0.2.2', 'Gi0/1, Gi0/2')),
+        (('11.0.0.1', 'r1'), ('11.0.0.1', 'r1', 'No route', '', '', '')),
+    ]
+    assert job.events.get_nowait() == ('result', "Skipping invalid destination: bogus")
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ipaddress import IPv4Network
+from urllib.parse import parse_qs, urlparse
+import pytest
+from src.core.micetro_client import MicetroClient, TruncatedResponse
+from src.utils.ipam_mirror import IpamMirror, parse_timestamp
+
+def ranges(count, modified='2024-10-01T09:00:00Z'):
+    return [{'ref': f'r{i}', 'name': f'range {i}', 'from': f'10.{i // 256}.{i % 256}.0',
+             'to': f'10.{i // 256}.{i % 256}.255', 'netmask': 24, 'lastModified': modified, 'extra': 'x'}
+            for i in range(count)]
+
+class MockMicetro:
+    """Serves /api/v1/ranges with offset paging, ETags and optional truncation"""
+
+    def __init__(self, records):
+        self.records = records
+        self.include_total = True
+        # Offsets whose body is cut short (the connection closes mid-array)
+        self.truncate = set()
+        self.requests = []
+        self.not_modified = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def page(self, params):
+        records = self.records
+        if 'filter' in params:
+            since = parse_timestamp(params['filter'].split('>=', 1)[1].strip('"'))
+            records = [r for r in records if parse_timestamp(r['lastModified']) >= since]
+        offset, limit = int(params['offset']), int(params['limit'])
+        result = {'ranges': records[offset:offset + limit]}
+        if self.include_total:
+            result['totalResults'] = len(records)
+        return json.dumps({'result': result}).encode()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                body = mock.page(params)
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                mock.requests.append((int(params['offset']), self.headers.get('If-None-Match')))
+                if self.headers.get('If-None-Match') == etag:
+                    mock.not_modified += 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('ETag', etag)
+                if int(params['offset']) in mock.truncate:
+                    # No length: the client only sees the connection close
+                    self.end_headers()
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    mock = MockMicetro(ranges(2500))
+    yield mock
+    mock.close()
+
+def client_for(server, tmp_path, **kwargs):
+    return MicetroClient(server.url, 'api', 'secret', page_size=1000, cache_dir=tmp_path / 'cache', **kwargs)
+
+def expected(records):
+    return [{k: r[k] for k in MicetroClient.RANGE_FIELDS} for r in records]
+
+def test_pages_in_order(server, tmp_path):
+    client = client_for(server, tmp_path)
+    assert client.get_ranges() == expected(server.records)
+    assert sorted(offset for offset, _ in server.requests) == [0, 1000, 2000]
+
+def test_paging_without_total(server, tmp_path):
+    server.include_total = False
+    client = client_for(server, tmp_path, max_workers=2)
+    assert client.get_ranges() == expected(server.records)
+
+def test_unchanged_pages_revalidate_from_the_mirror(server, tmp_path):
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    first = client_for(server, tmp_path)
+    first.sync_mirror(mirror)
+    first.close()
+    # A new client revalidates from the on-disk validators and reads unchanged pages from the mirror
+    client = client_for(server, tmp_path)
+    changes = client.sync_mirror(mirror)
+    assert server.not_modified == 3 and not changes
+    server.records[1500]['netmask'] = 25
+    changes = client.sync_mirror(mirror)
+    assert server.not_modified == 5
+    assert changes.added == [IPv4Network('10.5.220.0/25')] and changes.blocks_changed == 1
+    # Ranges the mirror lost are fetched in full again
+    mirror.clear()
+    server.requests.clear()
+    client.sync_mirror(mirror)
+    assert mirror.count() == 2500
+    assert sorted(offset for offset, etag in server.requests if etag is None) == [0, 1000, 2000]
+
+def test_cache_keeps_only_validators_of_the_listing(server, tmp_path):
+    client = client_for(server, tmp_path)
+    client.session.cookies.set('session', 'secret-cookie')
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    client.sync_mirror(mirror)
+    client.sync_mirror(mirror, use_timestamps=True)
+    # Plain reads, timestamp filters and the total probe are not cached
+    client.get_ranges()
+    text = client.cache_file.read_text()
+    assert 'secret-cookie' not in text and 'range 1' not in text
+    cache = json.loads(text)
+    assert sorted(cache['pages']) == ['0', '1000', '2000']
+    assert cache['pages']['2000']['refs'] == [f'r{i}' for i in range(2000, 2500)]
+    # Pages past the end of a shorter listing are dropped
+    del server.records[1000:]
+    client.sync_mirror(mirror)
+    assert sorted(json.loads(client.cache_file.read_text())['pages']) == ['0']
+
+def test_truncated_page_raises_and_is_not_cached(server, tmp_path):
+    server.truncate = {1000}
+    client = client_for(server, tmp_path)
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    with pytest.raises(TruncatedResponse):
+        client.sync_mirror(mirror)
+    assert mirror.count() == 0 and not client._cache['pages']
+    server.truncate.clear()
+    server.requests.clear()
+    client.sync_mirror(mirror)
+    assert mirror.count() == 2500
+    assert (1000, None) in server.requests
+
+def test_stream_split_inside_multibyte_text(tmp_path):
+    client = MicetroClient('http://unused', 'api', 'secret', cache_dir=tmp_path)
+    body = json.dumps({'result': {'ranges': [{'ref': 'r1', 'name': 'Zürich'}], 'totalResults': 1}},
+                      ensure_ascii=False).encode()
+    tail = []
+    items = list(client._iter_array_items([body[i:i + 3] for i in range(0, len(body), 3)], tail))
+    assert items == [{'ref': 'r1', 'name': 'Zürich'}]
+    assert json.loads(''.join(tail)) == {'result': {'ranges': [], 'totalResults': 1}}
+    with pytest.raises(TruncatedResponse):
+        list(client._iter_array_items([body[:30]], []))
+
+def test_timestamp_sync_falls_back_to_listing_on_deletion(server, tmp_path):
+    client = client_for(server, tmp_path)
+    mirror = IpamMirror(path=tmp_path / 'mirror.db')
+    client.sync_mirror(mirror)
+    assert mirror.count() == 2500 and mirror.get_watermark() == '2024-10-01T09:00:00Z'
+
+    server.records[10] = dict(server.records[10], netmask=25, lastModified='2024-10-02T09:00:00Z')
+    changes = client.sync_mirror(mirror, use_timestamps=True)
+    assert changes.added == [IPv4Network('10.0.10.0/25')] and changes.blocks_checked == 0
+    assert mirror.get_watermark() == '2024-10-02T09:00:00Z'
+
+    del server.records[20]
+    changes = client.sync_mirror(mirror, use_timestamps=True)
+    assert changes.removed == [IPv4Network('10.0.20.0/24')]
+    assert mirror.count() == 2499
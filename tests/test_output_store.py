@@ -0,0 +1,61 @@
+from src.utils.output_search import OutputIndex
+from src.utils.output_store import OutputStore
+
+def test_store_round_trip(tmp_path):
+    store = OutputStore(str(tmp_path / 'outputs'))
+    store.put('sw1', 'show version', "IOS 15.2")
+    store.put('sw2', 'show version', "Error: timed out", error=True)
+    store.put('sw1', 'show clock', "12:00")
+    store.put('sw1', 'show version', "IOS 15.9")
+    assert store.get('sw1', 'show version') == "IOS 15.9"
+    assert store.commands('sw1') == ['show version', 'show clock']
+    assert store.commands() == ['show version', 'show clock']
+    assert store.has_errors('sw2') and not store.has_errors('sw1')
+    path = tmp_path / 'out.csv'
+    store.export_csv(str(path))
+    assert path.read_text().splitlines()[0] == 'Hostname,Command,Output'
+    store.close()
+    assert not (tmp_path / 'outputs').exists()
+
+def test_index_counts_per_output():
+    index = OutputIndex()
+    index.add(('sw1', 'show int'), "Gi1/0/1 is up\nGi1/0/2 is DOWN\nGi1/0/1 is up")
+    index.add(('sw2', 'show int'), "Gi1/0/1 is down")
+    index.add(('sw3', 'show int'), "")
+    assert index.search('gi1/0/1') == {('sw1', 'show int'): 2, ('sw2', 'show int'): 1}
+    assert index.search('down') == {('sw1', 'show int'): 1, ('sw2', 'show int'): 1}
+    # Refined from the previous hits
+    assert index.search('down\n') == {}
+    assert index.search('is down') == {('sw1', 'show int'): 1, ('sw2', 'show int'): 1}
+    assert index.search('') == {}
+
+def test_index_stores_each_line_once():
+    index = OutputIndex()
+    for hostname in ('sw1', 'sw2', 'sw3'):
+        index.add((hostname, 'show run'), "hostname x\nno ip http server\n")
+    assert bytes(index._corpus) == b"hostname x\nno ip http server\n\n"
+
+def test_index_stores_lines_repeated_within_an_output_once():
+    index = OutputIndex()
+    index.add(('sw1', 'show run'), "!\nhostname sw1\n!\n\ninterface Gi1\n!\n\n!")
+    assert bytes(index._corpus) == b"!\nhostname sw1\n\ninterface gi1\n"
+    assert len(index._line_starts) == 4
+    assert index.search('!') == {('sw1', 'show run'): 4}
+
+def test_index_adds_after_search_and_non_ascii():
+    index = OutputIndex()
+    index.add('a', "Straße 1")
+    assert index.search('STRASSE') == {}
+    assert index.search('straße') == {'a': 1}
+    index.add('b', "straße straße")
+    assert index.search('straße') == {'a': 1, 'b': 2}
+
+def test_index_dense_and_colliding_lines():
+    index = OutputIndex()
+    index.DENSE_HITS = 2
+    index.add('a', "x\nxx\ny")
+    # Another line claiming the same hash is told apart by its text
+    index._line_ids[hash(b'z')] = 0
+    index.add('b', "z\nx")
+    assert index.search('x') == {'a': 3, 'b': 1}
+    assert index.search('z') == {'b': 1}
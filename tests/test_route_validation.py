@@ -0,0 +1,23 @@
+from ipaddress import IPv4Network
+from src.utils.route_validation import (
+    RouteValidationState, STATUS_MISSING, STATUS_OUTSIDE, STATUS_VALID, load_supernets
+)
+
+def test_load_supernets_returns_the_list():
+    supernets = load_supernets()
+    assert isinstance(supernets, list)
+    assert all(IPv4Network(supernet) for supernet in supernets)
+
+def test_load_supernets_empty_file(tmp_path):
+    path = tmp_path / 'supernets.yaml'
+    path.write_text("")
+    assert load_supernets(path) == []
+
+def test_update_with_shipped_supernets():
+    networks = [IPv4Network('10.1.0.0/24'), IPv4Network('10.2.0.0/24'), IPv4Network('8.8.8.0/24')]
+    routes = {'router1': [IPv4Network('10.1.0.0/24')]}
+    delta = RouteValidationState().update(networks, routes, load_supernets())
+    statuses = {network: status for network, _, status in delta.newly_valid + delta.newly_missing + delta.changed}
+    assert statuses[IPv4Network('10.1.0.0/24')] == STATUS_VALID
+    assert statuses[IPv4Network('10.2.0.0/24')] == STATUS_MISSING
+    assert statuses[IPv4Network('8.8.8.0/24')] == STATUS_OUTSIDE
@@ -0,0 +1,51 @@
+import random
+from ipaddress import IPv4Network, collapse_addresses
+import numpy as np
+import pytest
+from src.utils import subnet_tools
+from src.utils.subnet_tools import PrefixArray
+
+def test_collapse_matches_ipaddress():
+    rng = random.Random(0)
+    networks = [IPv4Network((rng.getrandbits(32), rng.randint(8, 30)), strict=False) for _ in range(500)]
+    collapsed = subnet_tools.collapse(PrefixArray.from_networks(networks))
+    assert collapsed.to_strings() == [str(network) for network in collapse_addresses(networks)]
+
+def test_find_overlaps():
+    prefixes = PrefixArray.from_networks(['10.0.0.0/24', '10.0.0.0/16', '192.0.2.0/24', '10.0.1.128/25'])
+    assert sorted(subnet_tools.find_overlaps(prefixes)) == [(0, 1), (3, 1)]
+    assert subnet_tools.find_overlaps(PrefixArray.from_networks(['10.0.0.0/24'])) == []
+
+def test_split():
+    assert subnet_tools.split('10.0.0.0/24', 26).to_strings() == [
+        '10.0.0.0/26', '10.0.0.64/26', '10.0.0.128/26', '10.0.0.192/26']
+    with pytest.raises(ValueError):
+        subnet_tools.split('10.0.0.0/24', 23)
+    with pytest.raises(ValueError):
+        subnet_tools.split('10.0.0.0/8', 32, limit=1000)
+
+def test_hosts_to_prefixlen():
+    assert subnet_tools.hosts_to_prefixlen(np.array([0, 2, 3, 254, 255])).tolist() == [30, 30, 29, 24, 23]
+
+def test_allocate_vlsm_largest_first_in_input_order():
+    allocated = subnet_tools.allocate_vlsm('10.0.0.0/24', np.array([26, 25, 27]), ['a', 'b', 'c'])
+    assert allocated.to_strings() == ['10.0.0.128/26', '10.0.0.0/25', '10.0.0.192/27']
+    with pytest.raises(ValueError):
+        subnet_tools.allocate_vlsm('10.0.0.0/24', np.array([25, 25, 26]))
+    with pytest.raises(ValueError):
+        subnet_tools.allocate_vlsm('10.0.0.0/24', np.array([23]))
+
+def test_allocate_vlsm_rejects_prefix_lengths_out_of_range():
+    with pytest.raises(ValueError, match=r'Request 2 \(b\): /33'):
+        subnet_tools.allocate_vlsm('10.0.0.0/24', np.array([26, 33]), ['a', 'b'])
+    # More hosts than IPv4 has
+    prefixlens = subnet_tools.hosts_to_prefixlen(np.array([10, 1 << 32]))
+    with pytest.raises(ValueError, match=r'Request 2 needs 8589934592 addresses'):
+        subnet_tools.allocate_vlsm('0.0.0.0/0', prefixlens)
+
+def test_read_prefix_file(tmp_path):
+    path = tmp_path / 'requests.csv'
+    path.write_text("name,hosts\nusers,200\nvoice,/26\n")
+    assert subnet_tools.read_prefix_file(str(path)) == (['200', '/26'], ['users', 'voice'])
+    path.write_text("10.0.0.0/24\n# comment\n10.1.0.0/16,core\n")
+    assert subnet_tools.read_prefix_file(str(path)) == (['10.0.0.0/24', '10.1.0.0/16'], ['', ''])